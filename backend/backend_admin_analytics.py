@@ -1,109 +1,102 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from database import db
 from backend_auth_service import get_current_admin
 from backend_models_user import User
+from backend_loaders import DocumentLoader, get_users_by_email
+from backend_indexes import register_index, register_hot_query
+from backend_rollups import active_users, revenue_by_day, window_days
+from backend_trends import bucket_series
+import asyncio
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin/analytics", tags=["admin-analytics"])
 
+# --- Indexes for the queries below ---
+
+register_index("purchases", [("status", 1), ("purchase_date", -1)])
+register_index("listings", [("created_at", -1)])
+register_index("users", [("created_at", -1)])
+
+register_hot_query("completed purchases in range", "purchases",
+                   {"status": "completed", "purchase_date": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}})
+register_hot_query("listings created in range", "listings",
+                   {"created_at": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}})
+register_hot_query("recent transactions", "purchases", {"status": "completed"}, [("purchase_date", -1)])
+
+INR_PER_USD = 83
+
+
+def to_usd(amount: float, currency: str) -> float:
+    return amount / INR_PER_USD if currency == "INR" else amount
+
+
+def growth(current: float, previous: float) -> float:
+    if previous > 0:
+        return ((current - previous) / previous) * 100
+    return 100 if current > 0 else 0
+
+
 @router.get("/overview")
 async def get_admin_analytics_overview(current_user: User = Depends(get_current_admin)):
     """
     Get platform-wide analytics overview with growth metrics.
     """
     try:
-        # Calculate date ranges for comparison
+        # Last 30 days (including today) against the 30 days before, read
+        # from the daily rollups and active user sketches
         now = datetime.now(timezone.utc)
-        thirty_days_ago = now - timedelta(days=30)
-        sixty_days_ago = now - timedelta(days=60)
-        
-        # 1. TOTAL REVENUE
-        # Current period (last 30 days)
-        current_purchases = await db.purchases.find({
-            "status": "completed",
-            "purchase_date": {"$gte": thirty_days_ago.isoformat()}
-        }).to_list(None)
-        
+        current_start, today = window_days(30, now)
+        previous_start = current_start - timedelta(days=30)
+        previous_end = current_start - timedelta(days=1)
+
+        # 1. Both windows at once
+        days, current_users, previous_users, total_users = await asyncio.gather(
+            revenue_by_day(previous_start, today + timedelta(days=1)),
+            active_users(current_start, today),
+            active_users(previous_start, previous_end),
+            db.users.count_documents({}),
+        )
+
+        # 2. TOTAL REVENUE
         current_revenue = 0
-        for p in current_purchases:
-            amount = p.get("price_paid", 0)
-            if p.get("currency") == "INR":
-                amount = amount / 83  # Convert to USD
-            current_revenue += amount
-        
-        # Previous period (30-60 days ago)
-        previous_purchases = await db.purchases.find({
-            "status": "completed",
-            "purchase_date": {
-                "$gte": sixty_days_ago.isoformat(),
-                "$lt": thirty_days_ago.isoformat()
-            }
-        }).to_list(None)
-        
         previous_revenue = 0
-        for p in previous_purchases:
-            amount = p.get("price_paid", 0)
-            if p.get("currency") == "INR":
-                amount = amount / 83
-            previous_revenue += amount
-        
-        # Calculate revenue growth
-        revenue_growth = 0
-        if previous_revenue > 0:
-            revenue_growth = ((current_revenue - previous_revenue) / previous_revenue) * 100
-        elif current_revenue > 0:
-            revenue_growth = 100
-        
-        # 2. ACTIVE USERS
-        # Users who made purchases or created listings in last 30 days
-        active_buyer_emails = set([p.get("buyer_email") for p in current_purchases if p.get("buyer_email")])
-        
-        recent_listings = await db.listings.find({
-            "created_at": {"$gte": thirty_days_ago.isoformat()}
-        }).to_list(None)
-        active_seller_emails = set([l.get("seller_email") for l in recent_listings if l.get("seller_email")])
-        
-        current_active_users = len(active_buyer_emails | active_seller_emails)
-        
-        # Previous period active users
-        prev_listings = await db.listings.find({
-            "created_at": {
-                "$gte": sixty_days_ago.isoformat(),
-                "$lt": thirty_days_ago.isoformat()
-            }
-        }).to_list(None)
-        prev_active_buyer_emails = set([p.get("buyer_email") for p in previous_purchases if p.get("buyer_email")])
-        prev_active_seller_emails = set([l.get("seller_email") for l in prev_listings if l.get("seller_email")])
-        previous_active_users = len(prev_active_buyer_emails | prev_active_seller_emails)
-        
-        # Calculate user growth
-        user_growth = 0
-        if previous_active_users > 0:
-            user_growth = ((current_active_users - previous_active_users) / previous_active_users) * 100
-        elif current_active_users > 0:
-            user_growth = 100
-        
-        # 3. CONVERSION RATE
+        for row in days:
+            amount = to_usd(row["gross"], row["currency"])
+            if row["day"] >= current_start:
+                current_revenue += amount
+            else:
+                previous_revenue += amount
+        revenue_growth = growth(current_revenue, previous_revenue)
+
+        # 3. ACTIVE USERS
+        # Users who made purchases or created listings in the window
+        current_active_users = current_users["users"]
+        previous_active_users = previous_users["users"]
+        user_growth = growth(current_active_users, previous_active_users)
+        active_buyers = current_users["buyers"]
+        prev_active_buyers = previous_users["buyers"]
+
+        # 4. CONVERSION RATE
         # Total unique visitors (we'll use total users as proxy since we don't track sessions)
-        total_users = await db.users.count_documents({})
         conversion_rate = 0
         if total_users > 0:
-            conversion_rate = (len(active_buyer_emails) / total_users) * 100
+            conversion_rate = (active_buyers / total_users) * 100
         
         # Previous conversion rate
         prev_conversion_rate = 0
         if total_users > 0:
-            prev_conversion_rate = (len(prev_active_buyer_emails) / total_users) * 100
+            prev_conversion_rate = (prev_active_buyers / total_users) * 100
         
         conversion_growth = 0
         if prev_conversion_rate > 0:
             conversion_growth = ((conversion_rate - prev_conversion_rate) / prev_conversion_rate) * 100
         
-        # 4. AVERAGE GROWTH (average of revenue and user growth)
+        # 5. AVERAGE GROWTH (average of revenue and user growth)
         avg_growth = (revenue_growth + user_growth) / 2
         
         return {
@@ -129,94 +122,63 @@ async def get_admin_analytics_overview(current_user: User = Depends(get_current_
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Legacy `period` values -> (granularity, default span)
+TREND_PERIODS = {
+    "daily": ("day", timedelta(days=13)),
+    "weekly": ("week", timedelta(weeks=11)),
+    "monthly": ("month", timedelta(days=365)),
+}
+MAX_TREND_RANGE = timedelta(days=3660)
+
+
 @router.get("/performance-trend")
 async def get_performance_trend(
     period: str = Query("weekly", regex="^(daily|weekly|monthly)$"),
+    granularity: Optional[str] = Query(None, pattern="^(day|week|month)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
     current_user: User = Depends(get_current_admin)
 ):
     """
-    Get performance trend data for charts.
-    Period can be: daily, weekly, monthly
+    Get performance trend data for charts: revenue (USD) and orders per
+    day, week or month between `start` and `end`, inclusive. Without them
+    `period` (daily, weekly, monthly) picks the granularity and a window
+    ending today.
     """
+    default_granularity, span = TREND_PERIODS[period]
+    granularity = granularity or default_granularity
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - span
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if end - start > MAX_TREND_RANGE:
+        raise HTTPException(status_code=400, detail="Date range too long")
+
     try:
-        now = datetime.now(timezone.utc)
-        
-        # Determine date range and grouping based on period
-        if period == "daily":
-            days_back = 14
-            date_format = "%Y-%m-%d"
-        elif period == "weekly":
-            days_back = 84  # 12 weeks
-            date_format = "%Y-W%W"
-        else:  # monthly
-            days_back = 365  # 12 months
-            date_format = "%Y-%m"
-        
-        start_date = now - timedelta(days=days_back)
-        
-        # Fetch all purchases in the period
-        purchases = await db.purchases.find({
-            "status": "completed",
-            "purchase_date": {"$gte": start_date.isoformat()}
-        }).to_list(None)
-        
-        # Group by period
-        revenue_by_period = {}
-        
-        for p in purchases:
-            purchase_date_str = p.get("purchase_date")
-            if isinstance(purchase_date_str, str):
-                try:
-                    p_date = datetime.fromisoformat(purchase_date_str.replace('Z', '+00:00'))
-                    
-                    # Format based on period
-                    if period == "daily":
-                        key = p_date.strftime("%Y-%m-%d")
-                        label = p_date.strftime("%b %d")
-                    elif period == "weekly":
-                        # Get week number
-                        week_num = p_date.isocalendar()[1]
-                        key = f"{p_date.year}-W{week_num:02d}"
-                        label = f"Week {week_num}"
-                    else:  # monthly
-                        key = p_date.strftime("%Y-%m")
-                        label = p_date.strftime("%b %Y")
-                    
-                    if key not in revenue_by_period:
-                        revenue_by_period[key] = {"label": label, "amount": 0}
-                    
-                    amount = p.get("price_paid", 0)
-                    if p.get("currency") == "INR":
-                        amount = amount / 83
-                    revenue_by_period[key]["amount"] += amount
-                except Exception as e:
-                    logger.warning(f"Error parsing date {purchase_date_str}: {e}")
-        
-        # Convert to list and sort
-        trend_data = []
-        for key in sorted(revenue_by_period.keys()):
-            trend_data.append({
-                "period": revenue_by_period[key]["label"],
-                "revenue": round(revenue_by_period[key]["amount"], 2)
-            })
-        
-        # If we have fewer data points, fill in zeros for missing periods
-        if period == "weekly" and len(trend_data) < 12:
-            # Generate last 12 weeks
-            all_weeks = []
-            for i in range(11, -1, -1):
-                week_date = now - timedelta(weeks=i)
-                week_num = week_date.isocalendar()[1]
-                all_weeks.append({"period": f"Week {week_num}", "revenue": 0})
-            
-            # Merge with actual data
-            for item in trend_data:
-                for week in all_weeks:
-                    if week["period"] == item["period"]:
-                        week["revenue"] = item["revenue"]
-            trend_data = all_weeks[-10:]  # Show last 10 weeks
-        
-        return {"data": trend_data, "period": period}
+        # Daily rollups for the range (one row per day and currency)
+        rows = await revenue_by_day(
+            datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+            datetime(end.year, end.month, end.day, tzinfo=timezone.utc) + timedelta(days=1),
+        )
+        days = np.array([r["day"].replace(tzinfo=None) for r in rows], dtype="datetime64[D]")
+        gross = np.array([r["gross"] for r in rows], dtype=float)
+        inr = np.array([r["currency"] == "INR" for r in rows], dtype=bool)
+        values = {
+            "revenue": np.where(inr, gross / INR_PER_USD, gross),
+            "orders": np.array([r["orders"] for r in rows], dtype=np.int64),
+        }
+
+        trend_data = bucket_series(days, values, start, end, granularity)
+        for bucket in trend_data:
+            bucket["revenue"] = round(bucket["revenue"], 2)
+
+        return {
+            "data": trend_data,
+            "period": period,
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+        }
     except Exception as e:
         logger.error(f"Error fetching performance trend: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -232,7 +194,7 @@ async def get_user_distribution(current_user: User = Depends(get_current_admin))
         # Get all recent purchases (last 30 days)
         thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
         purchases = await db.purchases.find({
-            "purchase_date": {"$gte": thirty_days_ago.isoformat()}
+            "purchase_date": {"$gte": thirty_days_ago}
         }).to_list(None)
         
         total = len(purchases)
@@ -281,6 +243,7 @@ async def get_recent_transactions(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
     status_filter: Optional[str] = None,
+    users: DocumentLoader = Depends(get_users_by_email),
     current_user: User = Depends(get_current_admin)
 ):
     """
@@ -303,14 +266,13 @@ async def get_recent_transactions(
             .limit(limit)\
             .to_list(limit)
         
+        # Get buyer info (one batched lookup for the page)
+        buyers = await users.load_many(p.get("buyer_email") for p in purchases)
+        
         # Format transactions
         transactions = []
         for p in purchases:
-            # Get buyer info
-            buyer = await db.users.find_one(
-                {"email": p.get("buyer_email")},
-                {"name": 1, "email": 1, "_id": 0}
-            )
+            buyer = buyers.get(p.get("buyer_email"))
             
             transaction_id = p.get("id", "N/A")
             if not transaction_id or transaction_id == "N/A":
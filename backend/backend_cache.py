@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+import os
+import time
+
+
+class LRUCache:
+    """
+    Bounded LRU cache with a per-entry TTL.
+
+    Entries are evicted least-recently-used first once `maxsize` is reached
+    and treated as misses once older than `ttl` seconds. The TTL bounds how
+    stale another worker's copy can get, since invalidation is in-process.
+    An entry may also carry a `version` (e.g. the ETag it was served under);
+    a get() with a different version is a miss, so another worker's writes,
+    which move the shared version on, are seen at once.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Optional[Hashable] = None) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, entry_version, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        if entry_version != version:
+            del self._entries[key]
+            self.stale += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, version: Optional[Hashable] = None):
+        self._entries[key] = (self._clock() + self.ttl, version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """
+        Drop every entry whose key satisfies `predicate`.
+        """
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale": self.stale,
+        }
+
+
+# Listing detail, keyed by listing id.
+listing_cache = LRUCache(
+    maxsize=int(os.environ.get("LISTING_CACHE_SIZE", "5000")),
+    ttl=float(os.environ.get("LISTING_CACHE_TTL_SECONDS", "60")),
+)
+
+# Browse pages (GET /listings without search), keyed by the normalized
+# filters, page size and cursor.
+browse_cache = LRUCache(
+    maxsize=int(os.environ.get("BROWSE_CACHE_SIZE", "512")),
+    ttl=float(os.environ.get("BROWSE_CACHE_TTL_SECONDS", "30")),
+)
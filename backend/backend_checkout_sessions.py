@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional
+import hashlib
+import json
+import os
+
+from database import db
+from backend_indexes import register_index
+
+# Reuse of provider checkout sessions. Opening checkout again for the same
+# user, listings, currency and prices returns the session created a moment
+# ago instead of asking the provider for a new one. Entries live for
+# CHECKOUT_SESSION_REUSE_SECONDS, which must stay below the provider's own
+# session expiry, and are dropped as soon as their checkout is paid.
+
+REUSE_WINDOW = timedelta(seconds=float(os.environ.get("CHECKOUT_SESSION_REUSE_SECONDS", "900")))
+
+register_index("checkout_sessions", [("expires_at", 1)], expireAfterSeconds=0)
+register_index("checkout_sessions", [("checkout_id", 1)])
+
+
+def checkout_key(user_email: str, listings: List[dict], currency: str, amount: int) -> str:
+    """
+    Hash of everything that shapes the provider session.
+    """
+    raw = json.dumps({
+        "user": user_email,
+        "currency": currency,
+        "amount": amount,
+        "listings": sorted(
+            [l["id"], l.get("price_usd"), l.get("price_inr")] for l in listings
+        ),
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def reuse_or_create_session(key: str, user_email: str, create: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+    """
+    Return the live session stored under `key`, or call `create` and store
+    what it returns ({"checkout_url", "id"}).
+    """
+    now = datetime.now(timezone.utc)
+    # The TTL monitor only runs once a minute, so check expiry here too
+    cached = await db.checkout_sessions.find_one({"_id": key, "expires_at": {"$gt": now}})
+    if cached:
+        return {"checkout_url": cached["checkout_url"], "id": cached["checkout_id"]}
+
+    session = await create()
+    if session:
+        await db.checkout_sessions.replace_one(
+            {"_id": key},
+            {
+                "checkout_url": session["checkout_url"],
+                "checkout_id": session["id"],
+                "user_email": user_email,
+                "created_at": now,
+                "expires_at": now + REUSE_WINDOW,
+            },
+            upsert=True,
+        )
+    return session
+
+
+async def forget_checkout_session(checkout_id: Optional[str]):
+    """
+    Stop offering a checkout session once it has been paid.
+    """
+    await forget_checkout_sessions([checkout_id])
+
+
+async def forget_checkout_sessions(checkout_ids: List[Optional[str]]):
+    checkout_ids = [c for c in checkout_ids if c]
+    if checkout_ids:
+        await db.checkout_sessions.delete_many({"checkout_id": {"$in": checkout_ids}})
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from typing import Annotated, Any, Optional
+
+from pydantic import BeforeValidator
+
+# Timestamps are stored as native BSON dates. Motor hands them back as naive
+# datetimes in UTC, and documents written before the migration may still
+# carry ISO strings; the codec below accepts both so read paths never need
+# to parse rows by hand.
+
+# Every timestamp field per collection, used by the migration in
+# backend_migrations.migrate_datetimes.
+DATETIME_FIELDS = {
+    "listings": ["created_at", "featured_until", "auction_end_time"],
+    "purchases": ["purchase_date"],
+    "project_requests": ["created_at"],
+    "proposals": ["submitted_at"],
+    "submissions": ["submitted_at", "reviewed_at"],
+    "reviews": ["created_at"],
+    "messages": ["created_at"],
+    "bids": ["timestamp"],
+}
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """
+    Normalize a stored timestamp to an aware UTC datetime.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# Use in models in place of `datetime` for any field read back from Mongo.
+MongoDateTime = Annotated[datetime, BeforeValidator(parse_datetime)]
@@ -0,0 +1,59 @@
+from typing import List, Optional
+import hashlib
+import json
+
+from fastapi import Request, Response
+from pymongo import UpdateOne
+
+from database import db
+
+# Version counters live in Mongo so every worker sees the same ETag. Scopes
+# are either a collection name ("listings") or a single document
+# ("listing:<id>", "user:<id>"); writers bump the scopes they change.
+
+
+async def bump_versions(*scopes: str):
+    """
+    Invalidate ETags derived from the given scopes.
+    """
+    if not scopes:
+        return
+    await db.collection_versions.bulk_write(
+        [UpdateOne({"_id": scope}, {"$inc": {"v": 1}}, upsert=True) for scope in scopes],
+        ordered=False
+    )
+
+
+async def compute_etag(scopes: List[str], *params) -> str:
+    """
+    Strong ETag over the current versions of `scopes` plus any request
+    parameters that shape the response body.
+    """
+    docs = await db.collection_versions.find({"_id": {"$in": scopes}}).to_list(len(scopes))
+    versions = {doc["_id"]: doc["v"] for doc in docs}
+    raw = json.dumps([[scope, versions.get(scope, 0)] for scope in scopes] + list(params), default=str)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+async def conditional_response(request: Request, response: Response, scopes: List[str], *params) -> Optional[Response]:
+    """
+    Set the ETag on `response` and return a 304 when the client's
+    If-None-Match already has it. Handlers return the 304 as-is, before
+    touching any documents. `params` covers state that shapes the body but
+    lives outside the scopes; it must be the same on every worker.
+    """
+    etag = await compute_etag(scopes, request.url.path, sorted(request.query_params.multi_items()), *params)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
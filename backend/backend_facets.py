@@ -0,0 +1,162 @@
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Set
+
+# Listing fields exposed as sidebar facets. Multi-valued fields (the *_tags
+# lists) contribute one posting per tag.
+FACET_FIELDS = (
+    "category",
+    "difficulty",
+    "license_type",
+    "platform_tags",
+    "tech_stack_tags",
+    "use_case_tags",
+)
+
+
+def _values(value) -> List[str]:
+    if value is None:
+        return []
+    if not isinstance(value, (list, tuple, set)):
+        value = [value]
+    return [v.value if isinstance(v, Enum) else str(v) for v in value if v]
+
+
+def facet_values(doc: dict, fields: Iterable[str] = FACET_FIELDS) -> Dict[str, List[str]]:
+    return {field: _values(doc.get(field)) for field in fields}
+
+
+def filters_match(filters: Dict[str, List[str]], values: Dict[str, List[str]], misses: int = 0) -> bool:
+    """
+    Whether a document with facet `values` passes `filters` (OR within a
+    facet, AND across facets) with at most `misses` facets failing.
+    """
+    failing = 0
+    for field, selected in filters.items():
+        if selected and not set(selected).intersection(values.get(field, ())):
+            failing += 1
+            if failing > misses:
+                return False
+    return True
+
+
+class FacetIndex:
+    """
+    Bitmap posting lists per facet value.
+
+    Each indexed document gets a bit position; every facet value keeps a
+    Python int with the bits of the documents carrying it. Filters are
+    OR within a facet and AND across facets, so a filter is a handful of
+    big-int ORs/ANDs and a facet count is a popcount.
+    """
+
+    def __init__(self, fields: Iterable[str] = FACET_FIELDS):
+        self.fields = tuple(fields)
+        self.clear()
+
+    def clear(self):
+        self._bits: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._all = 0
+        self._postings: Dict[str, Dict[str, int]] = {f: {} for f in self.fields}
+        self._doc_values: Dict[str, Dict[str, List[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    def add(self, doc: dict):
+        doc_id = doc["id"]
+        self.remove(doc_id)
+
+        if self._free:
+            bit = self._free.pop()
+            self._ids[bit] = doc_id
+        else:
+            bit = len(self._ids)
+            self._ids.append(doc_id)
+        self._bits[doc_id] = bit
+        flag = 1 << bit
+        self._all |= flag
+
+        values = facet_values(doc, self.fields)
+        for field, field_values in values.items():
+            postings = self._postings[field]
+            for value in field_values:
+                postings[value] = postings.get(value, 0) | flag
+        self._doc_values[doc_id] = values
+
+    def remove(self, doc_id: str):
+        bit = self._bits.pop(doc_id, None)
+        if bit is None:
+            return
+        flag = 1 << bit
+        self._all &= ~flag
+        for field, field_values in self._doc_values.pop(doc_id).items():
+            postings = self._postings[field]
+            for value in field_values:
+                remaining = postings.get(value, 0) & ~flag
+                if remaining:
+                    postings[value] = remaining
+                else:
+                    postings.pop(value, None)
+        self._ids[bit] = None
+        self._free.append(bit)
+
+    def values_of(self, doc_id: str) -> Optional[Dict[str, List[str]]]:
+        """
+        The indexed facet values of a document, or None if it is not indexed.
+        """
+        return self._doc_values.get(doc_id)
+
+    def mask_of(self, doc_ids: Iterable[str]) -> int:
+        mask = 0
+        for doc_id in doc_ids:
+            bit = self._bits.get(doc_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def match(self, filters: Dict[str, List[str]], exclude: Optional[str] = None) -> int:
+        """
+        Bitmap of documents matching every facet filter except `exclude`.
+        """
+        mask = self._all
+        for field, selected in filters.items():
+            if field == exclude or not selected:
+                continue
+            postings = self._postings.get(field, {})
+            field_mask = 0
+            for value in selected:
+                field_mask |= postings.get(value, 0)
+            mask &= field_mask
+        return mask
+
+    def ids(self, mask: int) -> Set[str]:
+        found = set()
+        while mask:
+            low = mask & -mask
+            found.add(self._ids[low.bit_length() - 1])
+            mask ^= low
+        return found
+
+    def counts(self, filters: Dict[str, List[str]], base: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Per-value document counts for every facet.
+
+        A facet's counts apply the other facets' filters but not its own, so
+        the sidebar still shows how many results each alternative would add.
+        """
+        base = self._all if base is None else base
+        result = {}
+        for field in self.fields:
+            scope = self.match(filters, exclude=field) & base
+            field_counts = {}
+            for value, posting in self._postings[field].items():
+                count = (posting & scope).bit_count()
+                if count:
+                    field_counts[value] = count
+            result[field] = dict(sorted(field_counts.items(), key=lambda item: (-item[1], item[0])))
+        return result
+
+
+listing_facet_index = FacetIndex()
@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from backend_indexes import register_index
+from backend_codecs import parse_datetime
+
+# Idempotency-Key support for endpoints that create payments or purchases.
+# The first request with a key inserts an in-progress record into
+# db.idempotency_keys and runs; its response (or 4xx error) is stored on
+# the record. Later requests with the same key get the stored response.
+# Duplicates that arrive while the first is still running wait for it: on
+# the same worker through a shared future, on other workers by polling the
+# record. Server errors delete the record so the client can retry.
+#
+# Record: {_id: "<scope>:<key>", fingerprint, status (in_progress|done),
+#          owner, locked_until, status_code, body, expires_at}
+
+KEY_TTL = timedelta(hours=float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24")))
+LOCK_TIMEOUT = timedelta(seconds=float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "60")))
+WAIT_TIMEOUT = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "30"))
+POLL_INTERVAL = 0.1
+MAX_KEY_LENGTH = 255
+
+register_index("idempotency_keys", [("expires_at", 1)], expireAfterSeconds=0)
+
+# Requests running on this worker, by record id
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def request_fingerprint(payload: Any) -> str:
+    raw = json.dumps(jsonable_encoder(payload), sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _replay(record: dict):
+    if record["status_code"] >= 400:
+        raise HTTPException(status_code=record["status_code"], detail=record["body"])
+    return record["body"]
+
+
+async def _wait_for_other(record_id: str, fingerprint: str):
+    """
+    Wait until the request that owns `record_id` finishes, then replay its
+    response. Returns None when the caller should try to claim the key
+    again: the owner released it, or its lock expired.
+    """
+    local = _in_flight.get(record_id)
+    if local is not None:
+        try:
+            outcome = await asyncio.wait_for(asyncio.shield(local), timeout=WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        if outcome is not None:
+            return _replay(outcome)
+        # The first attempt failed and released the key
+        return None
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + WAIT_TIMEOUT
+    while loop.time() < deadline:
+        record = await db.idempotency_keys.find_one({"_id": record_id})
+        if record is None:
+            return None
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if record["status"] == "done":
+            return _replay(record)
+        if parse_datetime(record["locked_until"]) < datetime.now(timezone.utc):
+            return None
+        await asyncio.sleep(POLL_INTERVAL)
+    raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+
+async def _acquire(record_id: str, fingerprint: str, owner: str) -> Optional[dict]:
+    """
+    Claim the key. Returns None when claimed, else the existing record.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        await db.idempotency_keys.insert_one({
+            "_id": record_id,
+            "fingerprint": fingerprint,
+            "status": "in_progress",
+            "owner": owner,
+            "locked_until": now + LOCK_TIMEOUT,
+            "expires_at": now + KEY_TTL,
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+
+    # Take over a request whose owner died without finishing
+    taken = await db.idempotency_keys.find_one_and_update(
+        {"_id": record_id, "fingerprint": fingerprint, "status": "in_progress", "locked_until": {"$lt": now}},
+        {"$set": {"owner": owner, "locked_until": now + LOCK_TIMEOUT}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if taken is not None:
+        return None
+    record = await db.idempotency_keys.find_one({"_id": record_id})
+    # Expired between the insert and the read: claim again
+    return record if record is not None else await _acquire(record_id, fingerprint, owner)
+
+
+async def run_idempotent(
+    key: Optional[str],
+    scope: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Run `handler` at most once per (scope, key) and replay its response for
+    repeats. `payload` is the request body; reusing a key with a different
+    body is rejected. Without a key the handler simply runs.
+    """
+    if not key:
+        return await handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+    record_id = f"{scope}:{key}"
+    fingerprint = request_fingerprint(payload)
+    owner = str(uuid.uuid4())
+
+    while True:
+        record = await _acquire(record_id, fingerprint, owner)
+        if record is None:
+            break
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if record["status"] == "done":
+            return _replay(record)
+        replayed = await _wait_for_other(record_id, fingerprint)
+        if replayed is not None:
+            return replayed
+
+    # We own the key
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[record_id] = future
+    outcome = None
+    try:
+        try:
+            result = await handler()
+        except HTTPException as e:
+            if e.status_code >= 500:
+                raise
+            outcome = {"status_code": e.status_code, "body": e.detail}
+            raise
+        outcome = {"status_code": 200, "body": jsonable_encoder(result)}
+        return result
+    finally:
+        # Local waiters first, then the record other workers poll
+        _in_flight.pop(record_id, None)
+        future.set_result(outcome)
+        if outcome is not None:
+            await db.idempotency_keys.update_one(
+                {"_id": record_id, "owner": owner},
+                {"$set": {"status": "done", **outcome}, "$unset": {"locked_until": ""}},
+            )
+        else:
+            # Server error: release the key so a retry runs again
+            await db.idempotency_keys.delete_one({"_id": record_id, "owner": owner})
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Declarative index registry. Modules that own a query declare the index it
+# needs next to the query with register_index(), and the hot queries that
+# must never scan a whole collection with register_hot_query(). The app
+# applies the indexes at startup; `python manage.py indexes --check` also
+# explains every hot query and fails on a COLLSCAN.
+
+Keys = List[Tuple[str, int]]
+
+_indexes: List[Tuple[str, Keys, Dict[str, Any]]] = []
+_hot_queries: List[Dict[str, Any]] = []
+
+
+def register_index(collection: str, keys: Keys, **options):
+    _indexes.append((collection, list(keys), options))
+
+
+def register_hot_query(name: str, collection: str, filter: Dict[str, Any], sort: Optional[Keys] = None):
+    """
+    Register a representative query (with sample values) for the explain check.
+    """
+    _hot_queries.append({"name": name, "collection": collection, "filter": filter, "sort": sort})
+
+
+async def apply_indexes(database=db) -> List[str]:
+    """
+    Create every registered index. Existing identical indexes are a no-op,
+    so this is safe to run on every startup.
+    """
+    by_collection: Dict[str, List[IndexModel]] = {}
+    for collection, keys, options in _indexes:
+        by_collection.setdefault(collection, []).append(IndexModel(keys, **options))
+
+    created = []
+    for collection, models in by_collection.items():
+        for model in models:
+            try:
+                created += await database[collection].create_indexes([model])
+            except OperationFailure as e:
+                # e.g. a unique index over legacy duplicates; keep serving
+                logger.error(f"Could not create index {model.document['key']} on {collection}: {e}")
+    logger.info(f"Ensured {len(created)} indexes across {len(by_collection)} collections")
+    return created
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages += _plan_stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return [s for s in stages if s]
+
+
+async def check_hot_queries(database=db) -> List[Dict[str, Any]]:
+    """
+    Explain every registered hot query and report its winning plan stages.
+    """
+    results = []
+    for query in _hot_queries:
+        find = {"find": query["collection"], "filter": query["filter"], "limit": 1}
+        if query["sort"]:
+            find["sort"] = dict(query["sort"])
+        explain = await database.command({"explain": find, "verbosity": "queryPlanner"})
+        stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+        results.append({
+            "name": query["name"],
+            "collection": query["collection"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return results
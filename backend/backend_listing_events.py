@@ -0,0 +1,122 @@
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from database import db
+from backend_models_order_review import StatusEnum
+from backend_search import listing_search_index, SEARCH_FIELDS
+from backend_facets import listing_facet_index, facet_values, filters_match, FACET_FIELDS
+from backend_suggest import listing_suggest_index, SUGGEST_TAG_FIELDS
+from backend_cache import listing_cache, browse_cache
+from backend_etag import bump_versions
+from backend_seller_stats import refresh_active_listing_count
+from backend_view_buffer import listing_view_buffer
+from backend_trending import listing_trending_index
+from backend_rollups import record_active_user
+from backend_codecs import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# Keeps the in-process listing indexes and caches in step with db.listings.
+# Write paths that create a listing call listing_created(), those that
+# change one call listing_saved(); writes that only touch cached fields call
+# invalidate_listing().
+
+INDEX_PROJECTION = {
+    "_id": 0, "id": 1, "status": 1, "seller_email": 1,
+    **{field: 1 for field in SEARCH_FIELDS},
+    **{field: 1 for field in FACET_FIELDS},
+    **{field: 1 for field in SUGGEST_TAG_FIELDS},
+    "views": 1, "sales_count": 1,
+}
+
+
+def browse_key(
+    filters: Dict[str, List[str]], facets: bool, limit: int, cursor: Optional[str], ranking_version: Optional[int]
+) -> Tuple:
+    """
+    browse_cache key of a listings page; filters are facet fields.
+    """
+    return (
+        tuple(sorted((field, tuple(sorted(values))) for field, values in filters.items())),
+        facets, limit, cursor, ranking_version
+    )
+
+
+def _evict_browse_pages(listing_values: List[Dict[str, List[str]]]):
+    # A listing shows on pages whose filters it passes, and its facet values
+    # count on pages whose filters it passes for all but one facet
+    def shows(key: Tuple) -> bool:
+        filters, facets = dict(key[0]), key[1]
+        return any(filters_match(filters, values, misses=1 if facets else 0) for values in listing_values)
+
+    browse_cache.invalidate_where(shows)
+
+
+async def invalidate_listing(listing_id: str, doc: Optional[dict] = None):
+    """
+    Drop cached copies of a listing and of the browse pages it was or (given
+    its new stored `doc`) will be on, and move their ETags on. Call before
+    the listing is re-indexed.
+    """
+    listing_cache.invalidate(listing_id)
+    listing_values = []
+    indexed = listing_facet_index.values_of(listing_id)
+    if indexed is not None:
+        listing_values.append(indexed)
+    if doc and doc.get("status") == StatusEnum.ACTIVE:
+        listing_values.append(facet_values(doc))
+    if listing_values:
+        _evict_browse_pages(listing_values)
+    await bump_versions("listings", f"listing:{listing_id}")
+
+
+async def listing_saved(listing_id: str, doc: Optional[dict] = None):
+    """
+    Refresh the indexes for one listing after it was written.
+    Pass the stored document when the caller already has it.
+    """
+    if doc is None:
+        doc = await db.listings.find_one({"id": listing_id}, INDEX_PROJECTION)
+
+    await invalidate_listing(listing_id, doc)
+
+    if doc and doc.get("status") == StatusEnum.ACTIVE:
+        listing_search_index.add(doc)
+        listing_facet_index.add(doc)
+        listing_suggest_index.add(doc)
+    else:
+        listing_search_index.remove(listing_id)
+        listing_facet_index.remove(listing_id)
+        listing_suggest_index.remove(listing_id)
+        listing_trending_index.remove(listing_id)
+
+    if doc:
+        listing_view_buffer.add_known(listing_id)
+        await refresh_active_listing_count(doc.get("seller_email"))
+
+
+async def listing_created(doc: dict):
+    """
+    listing_saved() for a newly inserted listing; also counts its seller
+    as active that day.
+    """
+    record_active_user(doc.get("seller_email"), parse_datetime(doc.get("created_at")))
+    await listing_saved(doc["id"], doc)
+
+
+async def rebuild_listing_indexes():
+    """
+    Rebuild every in-process listing index from the database.
+    """
+    listing_cache.clear()
+    browse_cache.clear()
+    await bump_versions("listings")
+    listing_search_index.clear()
+    listing_facet_index.clear()
+    listing_view_buffer.reset_known([doc["id"] async for doc in db.listings.find({}, {"_id": 0, "id": 1})])
+    docs = await db.listings.find({"status": StatusEnum.ACTIVE}, INDEX_PROJECTION).to_list(None)
+    for doc in docs:
+        listing_search_index.add(doc)
+        listing_facet_index.add(doc)
+    listing_suggest_index.build(docs)
+    logger.info(f"Indexed {len(listing_search_index)} active listings for search")
@@ -0,0 +1,69 @@
+from typing import Dict
+from pymongo import UpdateMany, UpdateOne
+import logging
+
+from database import db
+from backend_codecs import DATETIME_FIELDS, parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# One-shot data migrations. Each is idempotent and safe to re-run; they are
+# exposed on the command line through manage.py.
+
+
+async def backfill_seller_ids(batch_size: int = 500) -> int:
+    """
+    Write seller_id into legacy listings that only carry seller_email so
+    listing reads never need a users lookup.
+    """
+    emails = await db.listings.distinct(
+        "seller_email", {"seller_id": None, "seller_email": {"$ne": None}}
+    )
+
+    updated = 0
+    for start in range(0, len(emails), batch_size):
+        batch = emails[start:start + batch_size]
+        users = await db.users.find(
+            {"email": {"$in": batch}}, {"_id": 0, "email": 1, "id": 1}
+        ).to_list(len(batch))
+
+        ops = [
+            UpdateMany({"seller_email": u["email"], "seller_id": None}, {"$set": {"seller_id": u["id"]}})
+            for u in users
+        ]
+        if ops:
+            result = await db.listings.bulk_write(ops, ordered=False)
+            updated += result.modified_count
+        logger.info(f"Backfilled seller_id for {start + len(batch)}/{len(emails)} sellers")
+
+    return updated
+
+
+async def migrate_datetimes(batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Convert ISO-string timestamps to native BSON dates so range filters
+    compare dates and can use indexes. Returns converted counts per field.
+    """
+    converted = {}
+    for collection, fields in DATETIME_FIELDS.items():
+        for field in fields:
+            key = f"{collection}.{field}"
+            converted[key] = 0
+            ops = []
+            async for doc in db[collection].find({field: {"$type": "string"}}, {field: 1}).batch_size(batch_size):
+                try:
+                    value = parse_datetime(doc[field])
+                except ValueError:
+                    logger.warning(f"Skipping unparseable {key} on {doc['_id']}: {doc[field]!r}")
+                    continue
+                # Match on the old value so a concurrent write is never clobbered
+                ops.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+                if len(ops) >= batch_size:
+                    result = await db[collection].bulk_write(ops, ordered=False)
+                    converted[key] += result.modified_count
+                    ops = []
+            if ops:
+                result = await db[collection].bulk_write(ops, ordered=False)
+                converted[key] += result.modified_count
+            logger.info(f"Converted {converted[key]} {key} values to BSON dates")
+    return converted
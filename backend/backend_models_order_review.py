@@ -1,9 +1,11 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
 from enum import Enum
 import uuid
 
+from backend_codecs import MongoDateTime
+
 class CategoryEnum(str, Enum):
     # Core AI Tools Categories
     DESIGN = "Design"
@@ -48,13 +50,18 @@ class Purchase(BaseModel):
     platform_fee: float = 0.0 # 15% commission (deducted from seller)
     dodo_fee: float = 0.0 # ~3.5% processing fee (deducted from seller)
     status: str = "completed" # completed, refunded
-    purchase_date: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    purchase_date: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class PurchasePage(BaseModel):
+    items: List[Purchase]
+    next_cursor: Optional[str] = None
 
 class PurchaseCreate(BaseModel):
     buyer_email: EmailStr
     listing_id: str
     currency: str = "USD"
     payment_intent_id: Optional[str] = None
+    dodo_checkout_id: Optional[str] = None
     razorpay_order_id: Optional[str] = None
     razorpay_payment_id: Optional[str] = None
     razorpay_signature: Optional[str] = None
@@ -71,7 +78,7 @@ class ProjectRequest(BaseModel):
     description: str
     reference_link: Optional[str] = None
     status: str = "active"
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ProjectRequestCreate(BaseModel):
     client_name: str
@@ -83,6 +90,10 @@ class ProjectRequestCreate(BaseModel):
     description: str
     reference_link: Optional[str] = None
 
+class ProjectRequestPage(BaseModel):
+    items: List[ProjectRequest]
+    next_cursor: Optional[str] = None
+
 class Proposal(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -94,7 +105,7 @@ class Proposal(BaseModel):
     message: str
     portfolio_link: Optional[str] = None
     status: str = "pending"
-    submitted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    submitted_at: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ProposalCreate(BaseModel):
     project_id: str
@@ -110,7 +121,7 @@ class ChatMessage(BaseModel):
     sender_email: str
     receiver_email: str
     message: str
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timestamp: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_read: bool = False
 
 class Listing(BaseModel):
@@ -131,7 +142,7 @@ class Listing(BaseModel):
     seller_name: str = "Avocado Creator"
     seller_products: int = 1
     is_featured: bool = False
-    featured_until: Optional[datetime] = None
+    featured_until: Optional[MongoDateTime] = None
     is_verified: bool = True
     views: int = 0
     clicks: int = 0
@@ -145,7 +156,7 @@ class Listing(BaseModel):
     
     # Auction Fields
     listing_type: str = "fixed" # fixed, auction
-    auction_end_time: Optional[datetime] = None
+    auction_end_time: Optional[MongoDateTime] = None
     starting_bid: Optional[float] = None
     current_bid: Optional[float] = None
     bid_count: int = 0
@@ -182,7 +193,12 @@ class Listing(BaseModel):
     views: int = 0
     likes: int = 0
     
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ListingPage(BaseModel):
+    items: List[Listing]
+    next_cursor: Optional[str] = None
+    facets: Optional[Dict[str, Dict[str, int]]] = None # {facet: {value: count}}
 
 class ListingCreate(BaseModel):
     title: str
@@ -253,7 +269,7 @@ class ListingUpdate(BaseModel):
     demo_url: Optional[str] = None
     images: Optional[List[str]] = None
     listing_type: Optional[str] = None
-    auction_end_time: Optional[str] = None
+    auction_end_time: Optional[MongoDateTime] = None
     starting_bid: Optional[float] = None
     
     # Inclusions
@@ -303,12 +319,12 @@ class Submission(BaseModel):
     features: List[str] = []
     tech_stack: List[str] = []
     status: StatusEnum = StatusEnum.PENDING
-    submitted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    reviewed_at: Optional[datetime] = None
+    submitted_at: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    reviewed_at: Optional[MongoDateTime] = None
     
     # Auction Fields
     listing_type: str = "fixed"
-    auction_end_time: Optional[datetime] = None
+    auction_end_time: Optional[MongoDateTime] = None
     starting_bid: Optional[float] = None
 
 class SubmissionCreate(BaseModel):
@@ -340,7 +356,7 @@ class Review(BaseModel):
     reviewer_name: str
     rating: int = Field(..., ge=1, le=5)
     comment: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ReviewCreate(BaseModel):
     listing_id: str
@@ -354,7 +370,7 @@ class Message(BaseModel):
     sender_email: EmailStr
     sender_name: str
     content: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class MessageCreate(BaseModel):
     proposal_id: str
@@ -367,7 +383,7 @@ class Bid(BaseModel):
     bidder_email: EmailStr
     bidder_name: str
     amount: float
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timestamp: MongoDateTime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class BidCreate(BaseModel):
     listing_id: str
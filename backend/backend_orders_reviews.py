@@ -1,26 +1,63 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Header, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 from datetime import datetime, timezone
 import shutil
 import os
+import uuid
+
+from pymongo import UpdateOne
 
 from database import db
 from backend_models_user import User
 from backend_auth_service import get_current_user, get_current_admin
-from backend_models_order_review import Purchase, PurchaseCreate, Listing, Submission, SubmissionCreate, SubmissionUpdate, StatusEnum, Review, ReviewCreate
+from backend_models_order_review import Purchase, PurchaseCreate, PurchasePage, Listing, Submission, SubmissionCreate, SubmissionUpdate, StatusEnum, Review, ReviewCreate
 from backend_models_notification import Notification
+from backend_listing_events import listing_created, listing_saved, invalidate_listing
+from backend_etag import bump_versions
+from backend_codecs import parse_datetime
+from backend_indexes import register_index, register_hot_query
+from backend_purchase_events import apply_purchase_stats
+from backend_seller_stats import record_review
+from backend_trending import listing_trending_index
+from backend_loaders import get_users_by_email
+from backend_pagination import paginate, stream_ndjson, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
+# --- Indexes for the queries below ---
+
+register_index("purchases", [("id", 1)], unique=True)
+register_index("purchases", [("buyer_email", 1), ("purchase_date", -1), ("id", -1)])
+register_index("purchases", [("seller_email", 1), ("purchase_date", -1), ("id", -1)])
+register_index("purchases", [("purchase_date", -1), ("id", -1)])
+register_index("purchases", [("listing_id", 1), ("buyer_email", 1), ("status", 1)])
+register_index("submissions", [("id", 1)], unique=True)
+register_index("submissions", [("email", 1), ("submitted_at", -1)])
+register_index("submissions", [("status", 1), ("submitted_at", -1)])
+register_index("reviews", [("listing_id", 1), ("created_at", -1)])
+register_index("reviews", [("listing_id", 1), ("reviewer_email", 1)])
+register_index("messages", [("proposal_id", 1), ("created_at", 1)])
+register_index("bids", [("listing_id", 1), ("timestamp", -1)])
+
+register_hot_query("buyer purchases", "purchases", {"buyer_email": "buyer@example.com"}, [("purchase_date", -1), ("id", -1)])
+register_hot_query("seller sales", "purchases", {"seller_email": "seller@example.com"}, [("purchase_date", -1), ("id", -1)])
+register_hot_query("all purchases", "purchases", {}, [("purchase_date", -1), ("id", -1)])
+register_hot_query("listing reviews", "reviews", {"listing_id": "sample"}, [("created_at", -1)])
+register_hot_query("existing review", "reviews", {"listing_id": "sample", "reviewer_email": "buyer@example.com"})
+register_hot_query("proposal messages", "messages", {"proposal_id": "sample"}, [("created_at", 1)])
+register_hot_query("listing bids", "bids", {"listing_id": "sample"})
+register_hot_query("seller submissions", "submissions", {"email": "seller@example.com"}, [("submitted_at", -1)])
+
 # --- Purchases ---
 
-from stripe_integration import verify_payment, refund_payment
-from backend_email import send_order_confirmation, send_refund_notification, send_sale_notification
+from backend_outbox import email_message, enqueue_email, enqueue_emails
+from backend_payments import payment_gateway
+from backend_idempotency import run_idempotent
+from backend_checkout_sessions import checkout_key, reuse_or_create_session, forget_checkout_session
 import logging
 
-from dodopayments_integration import create_dodo_checkout_session, verify_dodo_payment
-
 logger = logging.getLogger(__name__)
 
 class PaymentOrderRequest(BaseModel):
@@ -31,8 +68,7 @@ class CartPaymentOrderRequest(BaseModel):
     listing_ids: List[str]
     currency: str = "INR"
 
-@router.post("/create-payment-order")
-async def create_payment_order(request: PaymentOrderRequest, current_user: User = Depends(get_current_user)):
+async def create_single_checkout(request: PaymentOrderRequest, current_user: User):
     # 1. Fetch Listing
     listing = await db.listings.find_one({"id": request.listing_id})
     if not listing:
@@ -53,19 +89,23 @@ async def create_payment_order(request: PaymentOrderRequest, current_user: User
         total_amount_usd = listing["price_usd"]
         total_amount_paise = int(total_amount_usd * 100) # Smallest unit for Dodo
         
-    # 4. Create Dodo Checkout Session
+    # 4. Create Dodo Checkout Session (or reuse the one made for this exact order)
     customer = {
         "email": current_user.email,
         "name": current_user.name
     }
     product_name = f"Purchase {listing['title']}"
     
-    checkout_session = create_dodo_checkout_session(
-        amount=total_amount_paise, 
-        currency=request.currency, 
-        customer=customer,
-        product_name=product_name,
-        listing_ids=[request.listing_id]
+    checkout_session = await reuse_or_create_session(
+        checkout_key(current_user.email, [listing], request.currency, total_amount_paise),
+        current_user.email,
+        lambda: payment_gateway.create_checkout_session(
+            amount=total_amount_paise, 
+            currency=request.currency, 
+            customer=customer,
+            product_name=product_name,
+            listing_ids=[request.listing_id]
+        )
     )
     
     if not checkout_session:
@@ -73,8 +113,18 @@ async def create_payment_order(request: PaymentOrderRequest, current_user: User
         
     return checkout_session
 
-@router.post("/create-cart-payment-order")
-async def create_cart_payment_order(request: CartPaymentOrderRequest, current_user: User = Depends(get_current_user)):
+@router.post("/create-payment-order")
+async def create_payment_order(
+    request: PaymentOrderRequest,
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    return await run_idempotent(
+        idempotency_key, f"create-payment-order:{current_user.email}", request,
+        lambda: create_single_checkout(request, current_user)
+    )
+
+async def create_cart_checkout(request: CartPaymentOrderRequest, current_user: User):
     # 1. Fetch Listings
     listings = await db.listings.find({"id": {"$in": request.listing_ids}}).to_list(100)
     if not listings:
@@ -92,19 +142,23 @@ async def create_cart_payment_order(request: CartPaymentOrderRequest, current_us
     total_with_fee = total_subtotal # Fee Waived
     total_amount_paise = int(total_with_fee * 100)
         
-    # 3. Create Dodo Checkout Session
+    # 3. Create Dodo Checkout Session (or reuse the one made for this exact cart)
     customer = {
         "email": current_user.email,
         "name": current_user.name
     }
     product_name = f"Cart Purchase ({len(listings)} items)"
     
-    checkout_session = create_dodo_checkout_session(
-        amount=total_amount_paise, 
-        currency=request.currency, 
-        customer=customer,
-        product_name=product_name,
-        listing_ids=request.listing_ids
+    checkout_session = await reuse_or_create_session(
+        checkout_key(current_user.email, listings, request.currency, total_amount_paise),
+        current_user.email,
+        lambda: payment_gateway.create_checkout_session(
+            amount=total_amount_paise, 
+            currency=request.currency, 
+            customer=customer,
+            product_name=product_name,
+            listing_ids=request.listing_ids
+        )
     )
     
     if not checkout_session:
@@ -112,6 +166,17 @@ async def create_cart_payment_order(request: CartPaymentOrderRequest, current_us
         
     return checkout_session
 
+@router.post("/create-cart-payment-order")
+async def create_cart_payment_order(
+    request: CartPaymentOrderRequest,
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    return await run_idempotent(
+        idempotency_key, f"create-cart-payment-order:{current_user.email}", request,
+        lambda: create_cart_checkout(request, current_user)
+    )
+
 @router.post("/upload")
 async def upload_image(file: UploadFile = File(...)):
     UPLOAD_DIR = "uploads"
@@ -130,34 +195,45 @@ class CartPurchaseCreate(BaseModel):
     buyer_email: EmailStr
     listing_ids: List[str]
     currency: str = "USD"
+    dodo_checkout_id: Optional[str] = None
     razorpay_order_id: Optional[str] = None
     razorpay_payment_id: Optional[str] = None
     razorpay_signature: Optional[str] = None
 
-@router.post("/cart-purchases", response_model=List[Purchase])
-async def create_cart_purchases(purchase_data: CartPurchaseCreate):
+def cart_purchase_id(checkout_ref: str, buyer_email: str, listing_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"cart:{checkout_ref}:{buyer_email}:{listing_id}"))
+
+async def record_cart_purchases(purchase_data: CartPurchaseCreate) -> List[Purchase]:
+    if not (purchase_data.dodo_checkout_id or purchase_data.razorpay_payment_id):
+        raise HTTPException(status_code=400, detail="dodo_checkout_id or razorpay_payment_id is required")
+
     # 1. Verify Payment (Once for the whole batch)
     is_verified = False
     if purchase_data.dodo_checkout_id:
-        is_verified = verify_dodo_payment(purchase_data.dodo_checkout_id)
+        is_verified = await payment_gateway.checkout_succeeded(purchase_data.dodo_checkout_id)
         if not is_verified:
              raise HTTPException(status_code=400, detail="Payment verification failed")
+        # Paid sessions must not be offered again
+        await forget_checkout_session(purchase_data.dodo_checkout_id)
     
-    # 2. Process each listing
-    purchases = []
-    listings = await db.listings.find({"id": {"$in": purchase_data.listing_ids}}).to_list(100)
+    # 2. Build every purchase up front
+    listings = await db.listings.find(
+        {"id": {"$in": purchase_data.listing_ids}}, {"_id": 0}
+    ).to_list(len(purchase_data.listing_ids))
+    
+    # Ids derive from the checkout, so a retried cart upserts the same purchases
+    checkout_ref = purchase_data.dodo_checkout_id or purchase_data.razorpay_payment_id
     
+    purchases = []
     for listing in listings:
         price_paid = listing['price_usd'] if purchase_data.currency == 'USD' else listing['price_inr']
         
-        # Email Logic (simplified for batch)
-        # In a real app, you might aggregate emails or send individual ones
-        
         # Calculate Fees (Seller-side deductions)
         platform_fee = price_paid * 0.15
         dodo_fee = price_paid * 0.035
         
-        purchase = Purchase(
+        purchases.append(Purchase(
+            id=cart_purchase_id(checkout_ref, purchase_data.buyer_email, listing['id']),
             buyer_email=purchase_data.buyer_email,
             seller_email=listing.get('seller_email', 'unknown@avocado.com'),
             listing_id=listing['id'],
@@ -168,36 +244,59 @@ async def create_cart_purchases(purchase_data: CartPurchaseCreate):
             platform_fee=platform_fee,
             dodo_fee=dodo_fee,
             status="completed"
-        )
-        
-        doc = purchase.model_dump()
-        doc['purchase_date'] = doc['purchase_date'].isoformat()
-        await db.purchases.insert_one(doc)
-        purchases.append(purchase)
-        
-        # Send notifications (Seller)
+        ))
+    if not purchases:
+        return []
+    
+    # 3. One idempotent bulk write; purchases stored by an earlier attempt are left as they were
+    docs = [{**p.model_dump(), "stats_applied": False} for p in purchases]
+    result = await db.purchases.bulk_write(
+        [UpdateOne({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True) for doc in docs],
+        ordered=False
+    )
+    if len(result.upserted_ids) < len(docs):
+        stored = await db.purchases.find(
+            {"id": {"$in": [doc["id"] for doc in docs]}}, {"_id": 0}
+        ).to_list(len(docs))
+        purchases = [Purchase(**doc) for doc in stored]
+    
+    # 4. Notify sellers of the new sales (one lookup, one insert)
+    async def notify_sellers(applied: List[dict]):
         try:
-             # Notify Seller
-            seller_user = await db.users.find_one({"email": listing.get('seller_email')})
-            if seller_user:
-                notif = Notification(
-                    user_id=seller_user['id'],
+            sellers = await get_users_by_email().load_many(doc["seller_email"] for doc in applied)
+            notifications = [
+                Notification(
+                    user_id=sellers[doc["seller_email"]]['id'],
                     type="sale",
                     title="New Sale!",
-                    message=f"You sold '{listing['title']}' for {purchase_data.currency} {price_paid}.",
+                    message=f"You sold '{doc['listing_title']}' for {doc['currency']} {doc['price_paid']}.",
                     link="/dashboard"
-                )
-                await db.notifications.insert_one(notif.model_dump())
+                ).model_dump()
+                for doc in applied if sellers.get(doc["seller_email"])
+            ]
+            if notifications:
+                await db.notifications.insert_many(notifications, ordered=False)
         except Exception as e:
-            logger.error(f"Failed to notify seller for {listing['title']}: {e}")
+            logger.error(f"Failed to notify sellers for cart {checkout_ref}: {e}")
 
     # Send ONE confirmation email to buyer (Simplified)
     # await send_cart_order_confirmation(...) 
     
+    # Stats and notifications for every purchase of this cart still owed
+    # them, including ones an earlier, failed attempt stored
+    applied = await apply_purchase_stats({"id": {"$in": [doc["id"] for doc in docs]}}, notify=notify_sellers)
+    if result.upserted_ids or applied:
+        await bump_versions("purchases")
     return purchases
 
-@router.post("/purchases", response_model=Purchase)
-async def create_purchase(purchase_data: PurchaseCreate):
+@router.post("/cart-purchases", response_model=List[Purchase])
+async def create_cart_purchases(purchase_data: CartPurchaseCreate, idempotency_key: Optional[str] = Header(None)):
+    return await run_idempotent(
+        idempotency_key, f"cart-purchases:{purchase_data.buyer_email}", purchase_data,
+        lambda: record_cart_purchases(purchase_data)
+    )
+
+async def record_purchase(purchase_data: PurchaseCreate) -> Purchase:
     # Get listing details
     listing = await db.listings.find_one({"id": purchase_data.listing_id}, {"_id": 0})
     if not listing:
@@ -210,18 +309,30 @@ async def create_purchase(purchase_data: PurchaseCreate):
     is_verified = False
     
     # Check for Dodo Payments
+    # A provider error, timeout or open circuit (HTTPException from the
+    # gateway) counts as unverified, so the order is still recorded and
+    # goes down the refund path instead of failing the request
     if purchase_data.dodo_checkout_id:
-        is_verified = verify_dodo_payment(
-            purchase_data.dodo_checkout_id
-        )
         payment_id = purchase_data.dodo_checkout_id
+        try:
+            is_verified = await payment_gateway.checkout_succeeded(payment_id)
+        except HTTPException as e:
+            logger.error(f"Dodo Payments verification for {payment_id} failed: {e.detail}")
+            is_verified = False
         
         if not is_verified:
             logger.error(f"Dodo Payments verification failed for {payment_id}")
+        else:
+            # Paid sessions must not be offered again
+            await forget_checkout_session(payment_id)
     else:
         # Fallback to Stripe Mock
         payment_id = purchase_data.payment_intent_id or f"mock_pid_{datetime.now().timestamp()}"
-        is_verified = verify_payment(payment_id)
+        try:
+            is_verified = await payment_gateway.verify_payment(payment_id)
+        except HTTPException as e:
+            logger.error(f"Payment verification for {payment_id} failed: {e.detail}")
+            is_verified = False
     
     # 2. SIMULATE DELIVERY
     # Try to "deliver" -> For now, we assume it works unless listing title contains "Buggy"
@@ -235,10 +346,14 @@ async def create_purchase(purchase_data: PurchaseCreate):
     if not is_verified or not delivery_success:
         # TRIGGER AUTO-REFUND
         logger.warning(f"Order verification/delivery failed. Initiating refund for {payment_id}")
-        refund_payment(payment_id, reason="Verification or Delivery Failed")
+        try:
+            await payment_gateway.refund(payment_id, reason="Verification or Delivery Failed")
+        except HTTPException:
+            logger.error(f"Refund for {payment_id} failed; needs manual follow-up")
         
-        # EMAIL CUSTOMER
-        await send_refund_notification(
+        # EMAIL CUSTOMER (queued; sent by the outbox worker)
+        await enqueue_email(
+            "refund_notification",
             to_email=purchase_data.buyer_email,
             order_id=payment_id,
             listing_title=listing['title'],
@@ -248,12 +363,13 @@ async def create_purchase(purchase_data: PurchaseCreate):
         status = "refunded"
     else:
         # SUCCESS
-        # Email Buyer
-        await send_order_confirmation(
+        # Email Buyer (queued; sent by the outbox worker)
+        emails = [email_message(
+            "order_confirmation",
             to_email=purchase_data.buyer_email,
             order_id=payment_id,
             listing_title=listing['title']
-        )
+        )]
         
         # Email Seller
         buyer_user = await db.users.find_one({"email": purchase_data.buyer_email})
@@ -263,17 +379,17 @@ async def create_purchase(purchase_data: PurchaseCreate):
         seller_email = listing.get('seller_email')
         
         if seller_email:
-            try:
-                await send_sale_notification(
-                    to_email=seller_email,
-                    buyer_name=buyer_name,
-                    item_title=listing['title'],
-                    amount=price_paid,
-                    currency=purchase_data.currency
-                )
-            except Exception as e:
-                logger.error(f"Failed to send sale notification: {e}")
-
+            emails.append(email_message(
+                "sale_notification",
+                to_email=seller_email,
+                buyer_name=buyer_name,
+                item_title=listing['title'],
+                amount=price_paid,
+                currency=purchase_data.currency
+            ))
+        await enqueue_emails(emails)
+        
+        if seller_email:
             # Notify Seller
             seller_user = await db.users.find_one({"email": seller_email})
             if seller_user:
@@ -305,66 +421,92 @@ async def create_purchase(purchase_data: PurchaseCreate):
     )
     
     doc = purchase.model_dump()
-    doc['purchase_date'] = doc['purchase_date'].isoformat()
+    if status == "completed":
+        doc["stats_applied"] = False
     
     await db.purchases.insert_one(doc)
+    if status == "completed":
+        await apply_purchase_stats({"id": doc["id"]})
+    await bump_versions("purchases")
     
     return purchase
 
-@router.get("/buyer/purchases", response_model=List[Purchase])
-async def get_buyer_purchases(current_user: User = Depends(get_current_user)):
-    purchases = await db.purchases.find({"buyer_email": current_user.email}, {"_id": 0}).sort("purchase_date", -1).to_list(1000)
-    
-    for purchase in purchases:
-        if isinstance(purchase.get('purchase_date'), str):
-            purchase['purchase_date'] = datetime.fromisoformat(purchase['purchase_date'])
-            
-    return purchases
+@router.post("/purchases", response_model=Purchase)
+async def create_purchase(purchase_data: PurchaseCreate, idempotency_key: Optional[str] = Header(None)):
+    return await run_idempotent(
+        idempotency_key, f"purchases:{purchase_data.buyer_email}", purchase_data,
+        lambda: record_purchase(purchase_data)
+    )
 
-@router.get("/seller/sales", response_model=List[Purchase])
-async def get_seller_sales(current_user: User = Depends(get_current_user)):
+PURCHASE_HISTORY_SORT = [("purchase_date", -1)]
+# Only the public Purchase fields, not bookkeeping such as stats_applied
+PURCHASE_PROJECTION = {"_id": 0, **{field: 1 for field in Purchase.model_fields}}
+
+async def purchase_history(query: dict, limit: int, cursor: Optional[str], format: Optional[str]):
+    """
+    One page of purchases, newest first, or with format=ndjson every
+    matching purchase streamed as newline-delimited JSON.
+    """
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_ndjson(
+                db.purchases, query, PURCHASE_HISTORY_SORT, PURCHASE_PROJECTION,
+                serialize=lambda doc: Purchase(**doc).model_dump_json()
+            ),
+            media_type="application/x-ndjson"
+        )
+    purchases, next_cursor = await paginate(
+        db.purchases, query, PURCHASE_HISTORY_SORT, limit, cursor, PURCHASE_PROJECTION
+    )
+    return {"items": purchases, "next_cursor": next_cursor}
+
+@router.get("/buyer/purchases", response_model=PurchasePage)
+async def get_buyer_purchases(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern="^ndjson$"),
+    current_user: User = Depends(get_current_user)
+):
+    return await purchase_history({"buyer_email": current_user.email}, limit, cursor, format)
+
+@router.get("/seller/sales", response_model=PurchasePage)
+async def get_seller_sales(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern="^ndjson$"),
+    current_user: User = Depends(get_current_user)
+):
     # Find purchases where seller_email matches
-    purchases = await db.purchases.find({"seller_email": current_user.email}, {"_id": 0}).sort("purchase_date", -1).to_list(1000)
-    
-    for purchase in purchases:
-        if isinstance(purchase.get('purchase_date'), str):
-            purchase['purchase_date'] = datetime.fromisoformat(purchase['purchase_date'])
-            
-    return purchases
+    return await purchase_history({"seller_email": current_user.email}, limit, cursor, format)
 
-@router.get("/admin/purchases", response_model=List[Purchase])
-async def get_purchases(current_user: User = Depends(get_current_admin)):
-    purchases = await db.purchases.find({}, {"_id": 0}).sort("purchase_date", -1).to_list(1000)
-    
-    for purchase in purchases:
-        if isinstance(purchase.get('purchase_date'), str):
-            purchase['purchase_date'] = datetime.fromisoformat(purchase['purchase_date'])
-    
-    return purchases
+@router.get("/admin/purchases", response_model=PurchasePage)
+async def get_purchases(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern="^ndjson$"),
+    current_user: User = Depends(get_current_admin)
+):
+    return await purchase_history({}, limit, cursor, format)
 
 # --- Submissions (Reviews/Seller content) ---
 
-from backend_email import send_submission_confirmation, send_submission_status_update
 from backend_models_notification import Notification
 
 @router.post("/submissions", response_model=Submission)
 async def create_submission(submission_data: SubmissionCreate):
     submission = Submission(**submission_data.model_dump())
     doc = submission.model_dump()
-    doc['submitted_at'] = doc['submitted_at'].isoformat()
     doc['reviewed_at'] = None
     
     await db.submissions.insert_one(doc)
     
-    # 1. Send Email
-    try:
-        await send_submission_confirmation(
-            to_email=submission.email, 
-            name=submission.full_name, 
-            title=submission.website_title
-        )
-    except Exception as e:
-        logger.error(f"Failed to send submission email: {e}")
+    # 1. Queue Email
+    await enqueue_email(
+        "submission_confirmation",
+        to_email=submission.email, 
+        name=submission.full_name, 
+        title=submission.website_title
+    )
 
     # 2. Create In-App Notification
     # Find user by email to get ID
@@ -384,12 +526,6 @@ async def create_submission(submission_data: SubmissionCreate):
 @router.get("/seller/submissions", response_model=List[Submission])
 async def get_seller_submissions(current_user: User = Depends(get_current_user)):
     submissions = await db.submissions.find({"email": current_user.email}, {"_id": 0}).sort("submitted_at", -1).to_list(1000)
-    
-    for submission in submissions:
-        if isinstance(submission.get('submitted_at'), str):
-            submission['submitted_at'] = datetime.fromisoformat(submission['submitted_at'])
-        if submission.get('reviewed_at') and isinstance(submission['reviewed_at'], str):
-            submission['reviewed_at'] = datetime.fromisoformat(submission['reviewed_at'])
             
     return submissions
 
@@ -401,12 +537,6 @@ async def get_submissions(status: Optional[str] = None, current_user: User = Dep
     
     submissions = await db.submissions.find(query, {"_id": 0}).sort("submitted_at", -1).to_list(1000)
     
-    for submission in submissions:
-        if isinstance(submission.get('submitted_at'), str):
-            submission['submitted_at'] = datetime.fromisoformat(submission['submitted_at'])
-        if submission.get('reviewed_at') and isinstance(submission['reviewed_at'], str):
-            submission['reviewed_at'] = datetime.fromisoformat(submission['reviewed_at'])
-    
     return submissions
 
 @router.put("/admin/submissions/{submission_id}", response_model=Submission)
@@ -420,7 +550,7 @@ async def update_submission(submission_id: str, update_data: SubmissionUpdate, c
     
     update_dict = {
         "status": update_data.status,
-        "reviewed_at": datetime.now(timezone.utc).isoformat()
+        "reviewed_at": datetime.now(timezone.utc)
     }
     
     await db.submissions.update_one(
@@ -429,24 +559,17 @@ async def update_submission(submission_id: str, update_data: SubmissionUpdate, c
     )
     
     updated_submission = await db.submissions.find_one({"id": submission_id}, {"_id": 0})
-    
-    if isinstance(updated_submission.get('submitted_at'), str):
-        updated_submission['submitted_at'] = datetime.fromisoformat(updated_submission['submitted_at'])
-    if updated_submission.get('reviewed_at') and isinstance(updated_submission['reviewed_at'], str):
-        updated_submission['reviewed_at'] = datetime.fromisoformat(updated_submission['reviewed_at'])
         
     # Send Notifications if status changed
     if status_changed:
-        # 1. Email
-        try:
-            await send_submission_status_update(
-                to_email=updated_submission['email'],
-                name=updated_submission['full_name'],
-                title=updated_submission['website_title'],
-                status=update_data.status
-            )
-        except Exception as e:
-            logger.error(f"Failed to send status update email: {e}")
+        # 1. Email (queued)
+        await enqueue_email(
+            "submission_status_update",
+            to_email=updated_submission['email'],
+            name=updated_submission['full_name'],
+            title=updated_submission['website_title'],
+            status=update_data.status
+        )
             
         # 2. In-App Notification
         user = await db.users.find_one({"email": updated_submission['email']})
@@ -485,6 +608,7 @@ async def update_submission(submission_id: str, update_data: SubmissionUpdate, c
                     images=updated_submission.get('images') if updated_submission.get('images') else ["https://images.unsplash.com/photo-1460925895917-afdab827c52f?w=800&auto=format&fit=crop&q=60"], # Default placeholder
                     status=StatusEnum.ACTIVE,
                     seller_email=updated_submission['email'],
+                    seller_id=user['id'] if user else None,
                     seller_name=updated_submission['full_name'],
                     is_verified=True,
                     
@@ -496,13 +620,9 @@ async def update_submission(submission_id: str, update_data: SubmissionUpdate, c
                 )
                 
                 doc = new_listing.model_dump()
-                doc['created_at'] = doc['created_at'].isoformat()
-                if doc.get('auction_end_time'):
-                     # Ensure it's stored as ISO string if it's a datetime
-                     if isinstance(doc['auction_end_time'], datetime):
-                        doc['auction_end_time'] = doc['auction_end_time'].isoformat()
 
                 await db.listings.insert_one(doc)
+                await listing_created(doc)
                 logger.info(f"Auto-created listing for approved submission: {updated_submission['id']}")
 
     return updated_submission
@@ -534,18 +654,15 @@ async def create_review(review_data: ReviewCreate, current_user: User = Depends(
     )
     
     doc = review.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.reviews.insert_one(doc)
+    await record_review(listing.get('seller_email'), review.rating)
+    await bump_versions("reviews")
     return review
 
 @router.get("/listings/{listing_id}/reviews", response_model=List[Review])
 async def get_listing_reviews(listing_id: str):
     reviews = await db.reviews.find({"listing_id": listing_id}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    
-    for review in reviews:
-        if isinstance(review.get('created_at'), str):
-            review['created_at'] = datetime.fromisoformat(review['created_at'])
             
     return reviews
 
@@ -584,6 +701,7 @@ async def accept_proposal(proposal_id: str, current_user: User = Depends(get_cur
         {"project_id": project['id'], "id": {"$ne": proposal_id}},
         {"$set": {"status": "rejected"}}
     )
+    await bump_versions("project_requests")
     
     return {"message": "Proposal accepted successfully"}
 
@@ -602,10 +720,6 @@ async def get_messages(proposal_id: str, current_user: User = Depends(get_curren
         raise HTTPException(status_code=403, detail="Not authorized to view messages")
         
     messages = await db.messages.find({"proposal_id": proposal_id}, {"_id": 0}).sort("created_at", 1).to_list(1000)
-    
-    for msg in messages:
-         if isinstance(msg.get('created_at'), str):
-            msg['created_at'] = datetime.fromisoformat(msg['created_at'])
             
     return messages
 
@@ -629,7 +743,6 @@ async def send_message(message_data: MessageCreate, current_user: User = Depends
     )
     
     doc = message.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.messages.insert_one(doc)
     return message
@@ -650,7 +763,7 @@ async def place_bid(bid_data: BidCreate, current_user: User = Depends(get_curren
         
     # 2. Verify Time
     if listing.get('auction_end_time'):
-        end_time = listing['auction_end_time'].replace(tzinfo=timezone.utc)
+        end_time = parse_datetime(listing['auction_end_time'])
         if datetime.now(timezone.utc) > end_time:
             raise HTTPException(status_code=400, detail="Auction has ended")
             
@@ -668,7 +781,6 @@ async def place_bid(bid_data: BidCreate, current_user: User = Depends(get_curren
     )
     
     doc = bid.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     await db.bids.insert_one(doc)
     
     # 5. Update Listing
@@ -680,6 +792,8 @@ async def place_bid(bid_data: BidCreate, current_user: User = Depends(get_curren
             "bid_count": (listing.get('bid_count') or 0) + 1
         }}
     )
+    await invalidate_listing(bid_data.listing_id)
+    listing_trending_index.record(bid_data.listing_id, "bid")
     
     
     return bid
@@ -707,10 +821,6 @@ async def update_listing(listing_id: str, update_data: ListingUpdate, current_us
     if 'price_usd' in update_dict:
         update_dict['price_inr'] = update_dict['price_usd'] * 83
         
-    if 'auction_end_time' in update_dict and update_dict['auction_end_time']:
-         # Ensure it's stored as ISO string if needed, currently incoming is str
-         pass
-
     # 4. Update Database
     await db.listings.update_one(
         {"id": listing_id},
@@ -718,11 +828,6 @@ async def update_listing(listing_id: str, update_data: ListingUpdate, current_us
     )
     
     updated_listing = await db.listings.find_one({"id": listing_id}, {"_id": 0})
-    
-    # Fix dates for response model
-    if isinstance(updated_listing.get('created_at'), str):
-        updated_listing['created_at'] = datetime.fromisoformat(updated_listing['created_at'])
-    if updated_listing.get('auction_end_time') and isinstance(updated_listing['auction_end_time'], str):
-        updated_listing['auction_end_time'] = datetime.fromisoformat(updated_listing['auction_end_time'])
+    await listing_saved(listing_id, updated_listing)
         
     return updated_listing
\ No newline at end of file
@@ -0,0 +1,262 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+
+from pymongo import UpdateOne
+
+from database import db
+import backend_email
+from backend_indexes import register_index, register_hot_query
+
+logger = logging.getLogger(__name__)
+
+# Durable email outbox. Request handlers call enqueue_email() /
+# enqueue_emails(), which only insert into db.email_outbox; a background
+# worker claims due messages in batches under a lease, sends them through
+# backend_email with bounded concurrency and retries failures with
+# exponential backoff. A worker that dies mid-batch leaves its claims to
+# expire, after which another worker picks them up.
+#
+# Message: {id, template, params, status (pending|sending|sent|failed),
+#           attempts, next_attempt_at, lease_until, claim, last_error,
+#           created_at, sent_at}
+
+SENT_RETENTION_DAYS = 7
+
+register_index("email_outbox", [("id", 1)], unique=True)
+register_index("email_outbox", [("status", 1), ("next_attempt_at", 1)])
+register_index("email_outbox", [("status", 1), ("lease_until", 1)])
+register_index("email_outbox", [("claim", 1)])
+register_index("email_outbox", [("sent_at", 1)], expireAfterSeconds=SENT_RETENTION_DAYS * 86400)
+register_hot_query(
+    "due emails", "email_outbox",
+    {"status": "pending", "next_attempt_at": {"$lte": datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+    [("next_attempt_at", 1)]
+)
+
+# Template name -> backend_email.send_<template>; a template whose client
+# also has send_<template>_batch(params_list) sends a whole group in one
+# provider call
+TEMPLATES = (
+    "order_confirmation",
+    "sale_notification",
+    "refund_notification",
+    "submission_confirmation",
+    "submission_status_update",
+)
+
+
+def email_message(template: str, **params) -> dict:
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown email template {template!r}")
+    now = datetime.now(timezone.utc)
+    return {
+        "id": str(uuid.uuid4()),
+        "template": template,
+        "params": params,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    }
+
+
+async def enqueue_emails(messages: List[dict]):
+    """
+    Store messages built with email_message() in one write and wake the
+    local worker.
+    """
+    if not messages:
+        return
+    await db.email_outbox.insert_many(messages, ordered=False)
+    email_outbox_worker.wake()
+
+
+async def enqueue_email(template: str, **params):
+    await enqueue_emails([email_message(template, **params)])
+
+
+class EmailOutboxWorker:
+    def __init__(
+        self,
+        collection,
+        batch_size: int,
+        concurrency: int,
+        poll_interval: float,
+        lease: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+
+    def wake(self):
+        self._wake.set()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def claim(self) -> List[dict]:
+        """
+        Lease up to `batch_size` due messages to this worker.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "sending", "lease_until": {"$lte": now}},
+        ]}
+        candidates = await self.collection.find(claimable, {"_id": 0, "id": 1}).sort(
+            "next_attempt_at", 1
+        ).to_list(self.batch_size)
+        if not candidates:
+            return []
+
+        claim = str(uuid.uuid4())
+        await self.collection.update_many(
+            {"id": {"$in": [c["id"] for c in candidates]}, **claimable},
+            {"$set": {"status": "sending", "claim": claim, "lease_until": now + timedelta(seconds=self.lease)}},
+        )
+        # Messages another worker claimed in between are not ours
+        return await self.collection.find({"claim": claim}, {"_id": 0}).to_list(self.batch_size)
+
+    async def _send(self, message: dict, semaphore: asyncio.Semaphore) -> Optional[str]:
+        async with semaphore:
+            try:
+                await getattr(backend_email, f"send_{message['template']}")(**message["params"])
+                return None
+            except Exception as e:
+                return str(e) or e.__class__.__name__
+
+    async def _send_group(self, template: str, group: List[dict], semaphore: asyncio.Semaphore) -> List[Optional[str]]:
+        send_batch = getattr(backend_email, f"send_{template}_batch", None)
+        if send_batch is None:
+            return await asyncio.gather(*(self._send(m, semaphore) for m in group))
+        async with semaphore:
+            try:
+                await send_batch([m["params"] for m in group])
+                return [None] * len(group)
+            except Exception as e:
+                return [str(e) or e.__class__.__name__] * len(group)
+
+    async def process_batch(self) -> int:
+        """
+        Claim and send one batch. Returns the number of messages claimed.
+        """
+        messages = await self.claim()
+        if not messages:
+            return 0
+
+        started = time.perf_counter()
+        # Same-template messages go out together
+        by_template: Dict[str, List[dict]] = {}
+        for message in messages:
+            by_template.setdefault(message["template"], []).append(message)
+
+        # Every group at once, under one concurrency limit for the batch
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(
+            self._send_group(template, group, semaphore) for template, group in by_template.items()
+        ))
+        now = datetime.now(timezone.utc)
+        ops = []
+        for (template, group), errors in zip(by_template.items(), results):
+            for message, error in zip(group, errors):
+                attempts = message["attempts"] + 1
+                if error is None:
+                    self.sent += 1
+                    update = {"status": "sent", "sent_at": now, "attempts": attempts}
+                elif attempts >= self.max_attempts:
+                    self.failed += 1
+                    logger.error(f"Giving up on {template} email {message['id']} after {attempts} attempts: {error}")
+                    update = {"status": "failed", "attempts": attempts, "last_error": error}
+                else:
+                    self.retried += 1
+                    update = {
+                        "status": "pending",
+                        "attempts": attempts,
+                        "last_error": error,
+                        "next_attempt_at": now + timedelta(seconds=self.backoff(attempts)),
+                    }
+                ops.append(UpdateOne(
+                    {"id": message["id"], "claim": message["claim"]},
+                    {"$set": update, "$unset": {"claim": "", "lease_until": ""}},
+                ))
+        await self.collection.bulk_write(ops, ordered=False)
+
+        self.batches += 1
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+        return len(messages)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                claimed = await self.process_batch()
+            except Exception as e:
+                logger.error(f"Email outbox batch failed: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                # Idle: sleep until the poll interval passes or a local enqueue
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop claiming new batches. Unsent messages stay in the outbox.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "batches": self.batches,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+        }
+
+
+email_outbox_worker = EmailOutboxWorker(
+    db.email_outbox,
+    batch_size=int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", "50")),
+    concurrency=int(os.environ.get("EMAIL_OUTBOX_CONCURRENCY", "5")),
+    poll_interval=float(os.environ.get("EMAIL_OUTBOX_POLL_SECONDS", "2")),
+    lease=float(os.environ.get("EMAIL_OUTBOX_LEASE_SECONDS", "120")),
+    max_attempts=int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", "6")),
+    backoff_base=float(os.environ.get("EMAIL_OUTBOX_BACKOFF_SECONDS", "10")),
+    backoff_max=float(os.environ.get("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", "3600")),
+)
@@ -0,0 +1,131 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException
+
+# Sort specs are lists of (field, direction) pairs, e.g. [("created_at", -1)].
+# "id" is always appended as the final tie-breaker so every row has a unique
+# position in the ordering and a cursor never skips or repeats documents.
+SortSpec = List[Tuple[str, int]]
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+STREAM_BATCH_SIZE = 500
+
+
+def _with_tiebreaker(sort: SortSpec) -> SortSpec:
+    if sort and sort[-1][0] == "id":
+        return list(sort)
+    direction = sort[-1][1] if sort else -1
+    return list(sort) + [("id", direction)]
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+    """
+    raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor. Raises 400 on tampered input.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_filter(sort: SortSpec, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the range predicate selecting rows strictly after `values` in the
+    given sort order, e.g. for [(a, -1), (b, -1)]:
+        {a < va} OR {a == va AND b < vb}
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        if field not in values:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        clause = {prev: values[prev] for prev, _ in sort[:i]}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[field]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort: SortSpec,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page of `collection` using keyset pagination.
+
+    Returns the raw documents and the cursor for the next page (None when
+    this is the last page). Each call is a bounded range scan over the
+    index backing `sort` instead of a skip over everything before it.
+    """
+    sort = _with_tiebreaker(sort)
+    if cursor:
+        after = keyset_filter(sort, decode_cursor(cursor))
+        query = {"$and": [query, after]} if query else after
+
+    docs = await collection.find(query, projection if projection is not None else {"_id": 0})\
+        .sort(sort)\
+        .limit(limit + 1)\
+        .to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor({field: last.get(field) for field, _ in sort})
+
+    return docs, next_cursor
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        # BSON dates come back naive but are always UTC
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    return str(value)
+
+
+async def stream_ndjson(
+    collection,
+    query: Dict[str, Any],
+    sort: SortSpec,
+    projection: Optional[Dict[str, Any]] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+    serialize: Optional[Callable[[dict], str]] = None,
+) -> AsyncIterator[str]:
+    """
+    Yield every matching document as newline-delimited JSON, one chunk per
+    cursor batch, so memory stays bounded by the batch size however many
+    rows match. `serialize` turns a document into its JSON line, e.g.
+    through the response model, so streamed rows match the paged ones.
+    """
+    cursor = collection.find(query, projection if projection is not None else {"_id": 0})\
+        .sort(_with_tiebreaker(sort))\
+        .batch_size(batch_size)
+
+    lines = []
+    async for doc in cursor:
+        lines.append(serialize(doc) if serialize else json.dumps(doc, default=_json_default))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
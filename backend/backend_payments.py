@@ -0,0 +1,248 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import asyncio
+import functools
+import logging
+import os
+import random
+import time
+import uuid
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Async facade over the payment providers. Their SDKs are synchronous, so
+# every call runs on a small dedicated thread pool with a timeout, behind a
+# circuit breaker that fails fast while the provider is down. The SDK clients
+# are module-level singletons, so their HTTP connection pools (and keep-alive
+# connections) are shared by every call.
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. After that one trial call is let through;
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+
+    def release(self):
+        """
+        End a call that finished without an outcome (e.g. it was cancelled),
+        so a half-open circuit lets the next trial through.
+        """
+        self._trial_in_flight = False
+
+
+class PaymentGateway:
+    """
+    Base gateway: subclasses implement the blocking `_create_checkout`,
+    `_checkout_succeeded`, `_verify_payment` and `_refund`; callers use the
+    async methods.
+
+    A timed-out call stops being awaited but its thread runs on, so the pool
+    size also caps how many stuck provider calls can pile up.
+    """
+
+    name = "base"
+
+    def __init__(self, max_workers: int, timeout: float, breaker: CircuitBreaker):
+        self.timeout = timeout
+        self.breaker = breaker
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="payments")
+        self.max_workers = max_workers
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    async def _call(self, fn: Callable, *args, **kwargs):
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Payment provider unavailable, please retry shortly")
+
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs)),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.failures += 1
+            self.breaker.record_failure()
+            logger.error(f"{self.name} {fn.__name__} timed out after {self.timeout}s")
+            raise HTTPException(status_code=504, detail="Payment provider timed out")
+        except Exception as e:
+            self.failures += 1
+            self.breaker.record_failure()
+            logger.error(f"{self.name} {fn.__name__} failed: {e}")
+            raise HTTPException(status_code=502, detail="Payment provider error")
+        except BaseException:
+            # Cancelled: neither a success nor a failure of the provider
+            self.breaker.release()
+            raise
+
+        self.breaker.record_success()
+        return result
+
+    async def create_checkout_session(
+        self, amount: int, currency: str, customer: dict, product_name: str, listing_ids: List[str]
+    ) -> dict:
+        """
+        Returns {"checkout_url", "id"}. Amount is in the smallest currency unit.
+        """
+        return await self._call(self._create_checkout, amount, currency, customer, product_name, listing_ids)
+
+    async def checkout_succeeded(self, checkout_id: str) -> bool:
+        return await self._call(self._checkout_succeeded, checkout_id)
+
+    async def verify_payment(self, payment_id: str) -> bool:
+        return await self._call(self._verify_payment, payment_id)
+
+    async def refund(self, payment_id: str, reason: str):
+        return await self._call(self._refund, payment_id, reason)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "gateway": self.name,
+            "max_workers": self.max_workers,
+            "timeout_seconds": self.timeout,
+            "circuit": self.breaker.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+        }
+
+
+class DodoPaymentGateway(PaymentGateway):
+    """
+    Dodo Payments for checkouts, with the Stripe integration for legacy
+    payment intents and refunds. The SDK modules are imported on first use
+    so the fake gateway runs without them installed.
+    """
+
+    name = "dodo"
+
+    def _create_checkout(self, amount, currency, customer, product_name, listing_ids):
+        from dodopayments_integration import create_dodo_checkout_session
+        return create_dodo_checkout_session(amount, currency, customer, product_name, listing_ids)
+
+    def _checkout_succeeded(self, checkout_id):
+        from dodopayments_integration import verify_dodo_payment
+        return verify_dodo_payment(checkout_id)
+
+    def _verify_payment(self, payment_id):
+        from stripe_integration import verify_payment
+        return verify_payment(payment_id)
+
+    def _refund(self, payment_id, reason):
+        from stripe_integration import refund_payment
+        return refund_payment(payment_id, reason=reason)
+
+
+class FakePaymentGateway(PaymentGateway):
+    """
+    Local stand-in for tests and benchmarks. Every call sleeps `latency`
+    seconds on the pool thread, like a blocking SDK call would, and fails
+    with probability `failure_rate`.
+    """
+
+    name = "fake"
+
+    def __init__(self, max_workers: int, timeout: float, breaker: CircuitBreaker,
+                 latency: float = 0.05, failure_rate: float = 0.0):
+        super().__init__(max_workers, timeout, breaker)
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def _simulate(self):
+        time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("Simulated provider failure")
+
+    def _create_checkout(self, amount, currency, customer, product_name, listing_ids):
+        self._simulate()
+        checkout_id = f"fake_{uuid.uuid4().hex}"
+        frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:3000")
+        return {"checkout_url": f"{frontend_url}/purchases?checkout_id={checkout_id}", "id": checkout_id}
+
+    def _checkout_succeeded(self, checkout_id):
+        self._simulate()
+        return True
+
+    def _verify_payment(self, payment_id):
+        self._simulate()
+        return True
+
+    def _refund(self, payment_id, reason):
+        self._simulate()
+        return {"id": f"fake_refund_{uuid.uuid4().hex}", "payment_id": payment_id, "reason": reason}
+
+
+def build_gateway() -> PaymentGateway:
+    """
+    Gateway selected by PAYMENT_GATEWAY ("dodo" or "fake").
+    """
+    options = dict(
+        max_workers=int(os.environ.get("PAYMENT_MAX_WORKERS", "8")),
+        timeout=float(os.environ.get("PAYMENT_TIMEOUT_SECONDS", "10")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.environ.get("PAYMENT_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.environ.get("PAYMENT_BREAKER_RESET_SECONDS", "30")),
+        ),
+    )
+    kind = os.environ.get("PAYMENT_GATEWAY", "dodo")
+    if kind == "fake":
+        return FakePaymentGateway(
+            latency=float(os.environ.get("FAKE_PAYMENT_LATENCY_MS", "50")) / 1000,
+            failure_rate=float(os.environ.get("FAKE_PAYMENT_FAILURE_RATE", "0")),
+            **options,
+        )
+    if kind != "dodo":
+        raise ValueError(f"Unknown PAYMENT_GATEWAY {kind!r}")
+    return DodoPaymentGateway(**options)
+
+
+payment_gateway = build_gateway()
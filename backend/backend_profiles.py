@@ -0,0 +1,99 @@
+from typing import List, Optional
+import asyncio
+
+from database import db
+from backend_models_order_review import StatusEnum
+from backend_seller_stats import calculate_seller_rank, get_seller_stats, average_rating
+from backend_codecs import parse_datetime
+
+RECENT_REVIEWS_LIMIT = 20
+
+
+def recent_reviews_pipeline(listing_ids: List[str], limit: int = RECENT_REVIEWS_LIMIT) -> list:
+    """
+    The latest reviews of `listing_ids`, each joined with its listing and
+    reviewer. Matching and sorting use the (listing_id, created_at) index,
+    so only the `limit` reviews kept are joined.
+    """
+    return [
+        {"$match": {"listing_id": {"$in": listing_ids}}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": limit},
+        {"$lookup": {"from": "listings", "localField": "listing_id", "foreignField": "id", "as": "listing"}},
+        {"$lookup": {
+            "from": "users", "localField": "reviewer_email", "foreignField": "email", "as": "reviewer"
+        }},
+        {"$set": {
+            "listing": {
+                "title": {"$arrayElemAt": ["$listing.title", 0]},
+                "price": {"$arrayElemAt": ["$listing.price", 0]},
+                "images": {"$arrayElemAt": ["$listing.images", 0]},
+            },
+            "reviewer": {"$cond": [
+                {"$gt": [{"$size": "$reviewer"}, 0]},
+                {
+                    "name": {"$arrayElemAt": ["$reviewer.name", 0]},
+                    "picture": {"$arrayElemAt": ["$reviewer.picture", 0]},
+                    "created_at": {"$arrayElemAt": ["$reviewer.created_at", 0]},
+                },
+                None,
+            ]},
+        }},
+        {"$project": {"_id": 0}},
+    ]
+
+
+async def fetch_recent_reviews(seller_email: str) -> list:
+    listing_ids = await db.listings.distinct("id", {"seller_email": seller_email})
+    if not listing_ids:
+        return []
+    reviews = await db.reviews.aggregate(recent_reviews_pipeline(listing_ids)).to_list(RECENT_REVIEWS_LIMIT)
+    for r in reviews:
+        # Mock data for "Duration" or "Country" if not in DB yet
+        r["duration"] = "3 days" # Placeholder
+        r['created_at'] = parse_datetime(r.get('created_at'))
+    return reviews
+
+
+async def build_user_profile(user_id: str) -> Optional[dict]:
+    """
+    Assemble a public profile: one user lookup, then the listings, stats and
+    reviews reads concurrently. Returns None when the user does not exist.
+    """
+    # 1. Fetch User (private fields never leave this function)
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "role": 0, "password_hash": 0})
+    if not user:
+        return None
+    user_email = user.pop("email")
+
+    # 2-4. Active listings, stats and reviews are independent
+    listings, stats, reviews = await asyncio.gather(
+        db.listings.find(
+            {"seller_email": user_email, "status": StatusEnum.ACTIVE},
+            {"_id": 0}
+        ).sort("created_at", -1).to_list(100),
+        get_seller_stats(user_email),
+        fetch_recent_reviews(user_email),
+    )
+
+    # 5. Calculate Rank
+    rating = average_rating(stats)
+    gamification = calculate_seller_rank(stats["total_sales"], rating)
+
+    # Format dates and return
+    user['created_at'] = parse_datetime(user.get('created_at'))
+    for l in listings:
+        l['created_at'] = parse_datetime(l.get('created_at'))
+
+    return {
+        "user": user,
+        "listings": listings,
+        "stats": {
+            "total_sales": stats["total_sales"],
+            "average_rating": rating,
+            "total_reviews": stats["review_count"],
+            "member_since": user.get('created_at')
+        },
+        "gamification": gamification,
+        "recent_reviews": reviews
+    }
@@ -0,0 +1,61 @@
+from collections import Counter
+from typing import Awaitable, Callable, List, Optional
+import uuid
+
+from database import db
+from backend_seller_stats import record_sales
+from backend_trending import listing_trending_index
+from backend_rollups import record_purchase_rollups
+from backend_indexes import register_index
+
+# Derived data that follows completed purchases. Every path that records a
+# completed purchase (direct checkout, cart checkout, payment webhook)
+# stores it with stats_applied: False and then calls apply_purchase_stats(),
+# which claims the purchases whose stats are still owed and runs
+# purchases_completed() for exactly those. A retry after a failure picks up
+# whatever is still owed; concurrent runs never apply the same purchase twice.
+#
+# stats_applied: False (owed) | "<claim>" (being applied) | True (applied).
+# Purchases stored before the flag existed have no stats_applied and are
+# never claimed.
+
+register_index("purchases", [("stats_applied", 1)])
+
+
+async def purchases_completed(purchases: List[dict]):
+    if not purchases:
+        return
+    await record_sales(Counter(p.get("seller_email") for p in purchases))
+    await record_purchase_rollups(purchases)
+    for p in purchases:
+        listing_trending_index.record(p["listing_id"], "purchase")
+
+
+async def apply_purchase_stats(
+    query: dict,
+    notify: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+) -> List[dict]:
+    """
+    Run purchases_completed() for the completed purchases matching `query`
+    whose stats are still owed, and `notify` (e.g. queue emails) for the
+    same purchases first. Returns the purchases this call applied. On
+    failure the claim is released so a retry applies them again.
+    """
+    claim = str(uuid.uuid4())
+    await db.purchases.update_many(
+        {**query, "status": "completed", "stats_applied": False},
+        {"$set": {"stats_applied": claim}},
+    )
+    claimed = await db.purchases.find({"stats_applied": claim}, {"_id": 0}).to_list(None)
+    if not claimed:
+        return []
+
+    try:
+        if notify is not None:
+            await notify(claimed)
+        await purchases_completed(claimed)
+    except BaseException:
+        await db.purchases.update_many({"stats_applied": claim}, {"$set": {"stats_applied": False}})
+        raise
+    await db.purchases.update_many({"stats_applied": claim}, {"$set": {"stats_applied": True}})
+    return claimed
@@ -0,0 +1,220 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+
+from bson import Binary
+from pymongo import UpdateOne
+
+from database import db
+from backend_codecs import parse_datetime
+from backend_hll import HyperLogLog
+from backend_indexes import register_index, register_hot_query
+from backend_visitors import VisitorSketches, day_start
+
+logger = logging.getLogger(__name__)
+
+# Materialized daily analytics. db.daily_rollups holds one document per
+# (day, currency, seller_email) with order count and revenue/fee totals,
+# incremented with $inc whenever purchases complete. db.daily_active_users
+# holds one HyperLogLog sketch per (kind, day): "buyers" for buyers of
+# completed purchases, "users" for buyers plus sellers who created a
+# listing. Analytics read these instead of scanning purchases, so a year
+# costs at most 365 grouped rows plus 730 sketches. Existing data is
+# backfilled with `python manage.py rebuild-rollups`, once, from one host.
+
+register_index("daily_rollups", [("day", 1), ("currency", 1), ("seller_email", 1)], unique=True)
+register_index("daily_rollups", [("updated_at", 1)])
+register_index("daily_active_users", [("kind", 1), ("day", 1)], unique=True)
+register_hot_query(
+    "daily rollups in range", "daily_rollups",
+    {"day": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}}
+)
+register_hot_query(
+    "active user sketches in range", "daily_active_users",
+    {"kind": "users", "day": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}}
+)
+
+ROLLUP_FIELDS = ("orders", "gross", "platform_fee", "dodo_fee")
+REBUILD_BATCH = 1000
+
+daily_active_users = VisitorSketches(
+    db.daily_active_users,
+    flush_interval=int(os.environ.get("ACTIVE_USERS_FLUSH_INTERVAL_MS", "10000")) / 1000,
+    key_field="kind",
+)
+
+RollupKey = Tuple[datetime, str, str]
+
+
+def record_active_user(email: Optional[str], at: Optional[datetime], buyer: bool = False):
+    if not email:
+        return
+    daily_active_users.record("users", email, at)
+    if buyer:
+        daily_active_users.record("buyers", email, at)
+
+
+def _purchase_day(purchase: dict) -> datetime:
+    return day_start(parse_datetime(purchase.get("purchase_date")) or datetime.now(timezone.utc))
+
+
+def window_days(days: int, now: datetime) -> Tuple[datetime, datetime]:
+    """
+    The first and last day of the `days` days ending today.
+    """
+    today = day_start(now)
+    return today - timedelta(days=days - 1), today
+
+
+def _day_expr(field: str) -> dict:
+    # UTC midnight of a date field, as day_start() computes it
+    return {"$dateFromParts": {"year": {"$year": field}, "month": {"$month": field}, "day": {"$dayOfMonth": field}}}
+
+
+async def record_purchase_rollups(purchases: List[dict]):
+    """
+    Add newly completed purchases to their days' rollups and sketches.
+    """
+    totals: Dict[RollupKey, Dict[str, float]] = {}
+    for p in purchases:
+        day = _purchase_day(p)
+        row = totals.setdefault(
+            (day, p.get("currency") or "USD", p.get("seller_email") or ""), dict.fromkeys(ROLLUP_FIELDS, 0)
+        )
+        row["orders"] += 1
+        row["gross"] += p.get("price_paid") or 0
+        row["platform_fee"] += p.get("platform_fee") or 0
+        row["dodo_fee"] += p.get("dodo_fee") or 0
+        record_active_user(p.get("buyer_email"), day, buyer=True)
+
+    if not totals:
+        return
+    now = datetime.now(timezone.utc)
+    await db.daily_rollups.bulk_write([
+        UpdateOne(
+            {"day": day, "currency": currency, "seller_email": seller_email},
+            {"$inc": inc, "$set": {"updated_at": now}},
+            upsert=True,
+        ) for (day, currency, seller_email), inc in totals.items()
+    ], ordered=False)
+
+
+async def revenue_by_day(start: datetime, end: datetime) -> List[dict]:
+    """
+    Per-day, per-currency totals over all sellers for start <= day < end:
+    [{day, currency, orders, gross, platform_fee, dodo_fee}], oldest first.
+    """
+    rows = db.daily_rollups.aggregate([
+        {"$match": {"day": {"$gte": day_start(start), "$lt": end}}},
+        {"$group": {
+            "_id": {"day": "$day", "currency": "$currency"},
+            **{field: {"$sum": f"${field}"} for field in ROLLUP_FIELDS},
+        }},
+        {"$sort": {"_id.day": 1}},
+    ])
+    return [{**row.pop("_id"), **row} async for row in rows]
+
+
+async def active_users(start: datetime, end: datetime) -> Dict[str, int]:
+    """
+    Estimated distinct {"users", "buyers"} between two days, inclusive.
+    """
+    return {
+        kind: await daily_active_users.unique_visitors(kind, start, end)
+        for kind in ("users", "buyers")
+    }
+
+
+async def unmigrated_dates() -> Dict[str, int]:
+    """
+    Completed purchases and listings whose timestamp is still an ISO
+    string, which the rollup pipeline cannot bucket by day.
+    """
+    return {
+        "purchases.purchase_date": await db.purchases.count_documents(
+            {"status": "completed", "purchase_date": {"$type": "string"}}
+        ),
+        "listings.created_at": await db.listings.count_documents({"created_at": {"$type": "string"}}),
+    }
+
+
+async def rebuild_daily_rollups() -> Dict[str, int]:
+    """
+    Recompute every rollup and active user sketch from purchases and
+    listings. Purchases completed while it runs may be counted twice or not
+    at all, so run it when the site is quiet. Refuses (ValueError) while
+    string timestamps remain; run `manage.py migrate-dates` first.
+    """
+    pending = {field: count for field, count in (await unmigrated_dates()).items() if count}
+    if pending:
+        found = ", ".join(f"{count} {field}" for field, count in pending.items())
+        raise ValueError(f"Found ISO-string timestamps ({found}); run `manage.py migrate-dates` first")
+
+    now = datetime.now(timezone.utc)
+
+    # 1. Rollups, grouped server-side
+    rows = db.purchases.aggregate([
+        {"$match": {"status": "completed", "purchase_date": {"$type": "date"}}},
+        {"$group": {
+            "_id": {
+                "day": _day_expr("$purchase_date"),
+                "currency": {"$ifNull": ["$currency", "USD"]},
+                "seller_email": {"$ifNull": ["$seller_email", ""]},
+            },
+            "orders": {"$sum": 1},
+            "gross": {"$sum": {"$ifNull": ["$price_paid", 0]}},
+            "platform_fee": {"$sum": {"$ifNull": ["$platform_fee", 0]}},
+            "dodo_fee": {"$sum": {"$ifNull": ["$dodo_fee", 0]}},
+        }},
+    ], allowDiskUse=True)
+    ops = []
+    rollups = 0
+    async for row in rows:
+        key = row.pop("_id")
+        ops.append(UpdateOne(key, {"$set": {**row, "updated_at": now}}, upsert=True))
+        if len(ops) >= REBUILD_BATCH:
+            await db.daily_rollups.bulk_write(ops, ordered=False)
+            rollups += len(ops)
+            ops = []
+    if ops:
+        await db.daily_rollups.bulk_write(ops, ordered=False)
+        rollups += len(ops)
+    await db.daily_rollups.delete_many({"updated_at": {"$lt": now}})
+
+    # 2. Active user sketches
+    sketches: Dict[Tuple[str, datetime], HyperLogLog] = {}
+
+    def add(kind: str, email: str, day: datetime):
+        sketch = sketches.get((kind, day))
+        if sketch is None:
+            sketch = sketches[(kind, day)] = HyperLogLog()
+        sketch.add(email)
+
+    async for p in db.purchases.find(
+        {"status": "completed"}, {"_id": 0, "buyer_email": 1, "purchase_date": 1}
+    ).batch_size(REBUILD_BATCH):
+        if p.get("buyer_email") and p.get("purchase_date"):
+            day = _purchase_day(p)
+            add("users", p["buyer_email"], day)
+            add("buyers", p["buyer_email"], day)
+    async for l in db.listings.find(
+        {"created_at": {"$ne": None}}, {"_id": 0, "seller_email": 1, "created_at": 1}
+    ).batch_size(REBUILD_BATCH):
+        if l.get("seller_email"):
+            add("users", l["seller_email"], day_start(parse_datetime(l["created_at"])))
+
+    # Replaced in place; bumping version makes a worker's concurrent
+    # compare-and-swap flush re-read and merge into the rebuilt sketch
+    ops = [
+        UpdateOne(
+            {"kind": kind, "day": day},
+            {"$set": {"registers": Binary(sketch.to_bytes())}, "$inc": {"version": 1}},
+            upsert=True,
+        ) for (kind, day), sketch in sketches.items()
+    ]
+    for i in range(0, len(ops), REBUILD_BATCH):
+        await db.daily_active_users.bulk_write(ops[i:i + REBUILD_BATCH], ordered=False)
+
+    logger.info(f"Rebuilt {rollups} daily rollups and {len(sketches)} active user sketches")
+    return {"rollups": rollups, "sketches": len(sketches)}
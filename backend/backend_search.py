@@ -0,0 +1,152 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Field weights for the BM25F-style term frequency. A hit in the title counts
+# three times as much as one in the description.
+SEARCH_FIELDS = {
+    "title": 3.0,
+    "platform_tags": 2.0,
+    "tech_stack_tags": 2.0,
+    "use_case_tags": 2.0,
+    "features": 1.5,
+    "description": 1.0,
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "with", "your", "you",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[+#.][a-z0-9+#]*)?")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase and split text into index terms. Keeps tech names such as
+    "c++", "c#" and "next.js" intact.
+    """
+    return [
+        t.rstrip(".") for t in _TOKEN_RE.findall(text.lower())
+        if t not in STOPWORDS
+    ]
+
+
+def _field_text(value) -> str:
+    if not value:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value)
+
+
+class SearchIndex:
+    """
+    In-memory inverted index with BM25 ranking.
+
+    Postings map term -> {doc_id: weighted term frequency}. A query only
+    touches the postings of its own terms, so latency depends on how many
+    documents match rather than on the size of the catalog.
+    """
+
+    def __init__(self, fields: Dict[str, float] = SEARCH_FIELDS, k1: float = 1.2, b: float = 0.75):
+        self.fields = fields
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._total_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_len
+
+    def clear(self):
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_len.clear()
+        self._total_len = 0.0
+
+    def add(self, doc: dict):
+        """
+        Index (or re-index) a listing document.
+        """
+        doc_id = doc["id"]
+        self.remove(doc_id)
+
+        freqs: Dict[str, float] = defaultdict(float)
+        for field, weight in self.fields.items():
+            for term in tokenize(_field_text(doc.get(field))):
+                freqs[term] += weight
+
+        for term, tf in freqs.items():
+            self._postings[term][doc_id] = tf
+        length = sum(freqs.values())
+        self._doc_terms[doc_id] = list(freqs)
+        self._doc_len[doc_id] = length
+        self._total_len += length
+
+    def remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    def matching(self, query: str) -> set:
+        """
+        Ids of every document containing at least one query term.
+        """
+        found = set()
+        for term in set(tokenize(query)):
+            found.update(self._postings.get(term, ()))
+        return found
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        where: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Return up to `limit` (doc_id, score) pairs ranked by BM25, skipping
+        the first `offset` hits. `where` optionally restricts the candidates.
+        """
+        n = len(self._doc_len)
+        terms = set(tokenize(query))
+        if not n or not terms:
+            return []
+
+        avgdl = self._total_len / n or 1.0
+        scores: Dict[str, float] = defaultdict(float)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        candidates = scores.items()
+        if where is not None:
+            candidates = [(doc_id, s) for doc_id, s in candidates if where(doc_id)]
+
+        # Ties are broken on doc_id so pages are stable across requests.
+        top = heapq.nsmallest(offset + limit, candidates, key=lambda item: (-item[1], item[0]))
+        return top[offset:]
+
+
+listing_search_index = SearchIndex()
@@ -0,0 +1,160 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import logging
+
+from pymongo import ReturnDocument, UpdateOne
+
+from database import db
+from backend_models_order_review import StatusEnum
+from backend_indexes import register_index, register_hot_query
+
+logger = logging.getLogger(__name__)
+
+# One document per seller in db.seller_stats, maintained with $inc from the
+# write paths (purchases, reviews, listing status changes) so a profile view
+# reads a single indexed document instead of re-aggregating the seller's
+# whole history.
+
+register_index("seller_stats", [("seller_email", 1)], unique=True)
+register_hot_query("seller stats", "seller_stats", {"seller_email": "seller@example.com"})
+
+EMPTY_STATS = {
+    "total_sales": 0,
+    "rating_sum": 0,
+    "review_count": 0,
+    "active_listing_count": 0,
+    "rank": "Hello World",
+}
+
+
+# Gamification / Rank Logic
+def calculate_seller_rank(total_sales: int, avg_rating: float) -> dict:
+    # Ranks:
+    # 1. Hello World (Start)
+    # 2. Junior Dev (1 Sale)
+    # 3. Senior Dev (10 Sales, 4.0+ Rating)
+    # 4. Tech Lead (50 Sales, 4.5+ Rating)
+    # 5. 10x Engineer (100 Sales, 4.8+ Rating)
+
+    if total_sales >= 100 and avg_rating >= 4.8:
+        return {"rank": "10x Engineer", "badge": "🚀", "next_rank": None, "progress": 100}
+    elif total_sales >= 50 and avg_rating >= 4.5:
+        return {"rank": "Tech Lead", "badge": "🌐", "next_rank": "10x Engineer", "progress": int((total_sales / 100) * 100)}
+    elif total_sales >= 10 and avg_rating >= 4.0:
+        return {"rank": "Senior Dev", "badge": "💻", "next_rank": "Tech Lead", "progress": int((total_sales / 50) * 100)}
+    elif total_sales >= 1:
+        return {"rank": "Junior Dev", "badge": "🐛", "next_rank": "Senior Dev", "progress": int((total_sales / 10) * 100)}
+    else:
+        return {"rank": "Hello World", "badge": "🖥️", "next_rank": "Junior Dev", "progress": int((total_sales / 1) * 100)} # 0/1
+
+
+def average_rating(stats: dict) -> float:
+    if not stats.get("review_count"):
+        return 0.0
+    return round(stats["rating_sum"] / stats["review_count"], 1)
+
+
+def rank_for(stats: dict) -> dict:
+    return calculate_seller_rank(stats.get("total_sales", 0), average_rating(stats))
+
+
+async def get_seller_stats(seller_email: str) -> dict:
+    stats = await db.seller_stats.find_one({"seller_email": seller_email}, {"_id": 0})
+    return {**EMPTY_STATS, "seller_email": seller_email, **(stats or {})}
+
+
+async def _apply(seller_email: str, inc: Optional[Dict[str, int]] = None, set_: Optional[dict] = None):
+    update = {"$set": {**(set_ or {}), "updated_at": datetime.now(timezone.utc)}}
+    if inc:
+        update["$inc"] = inc
+    stats = await db.seller_stats.find_one_and_update(
+        {"seller_email": seller_email},
+        update,
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+    # Rank only moves when the counters cross a threshold
+    rank = rank_for(stats)["rank"]
+    if stats.get("rank") != rank:
+        await db.seller_stats.update_one({"seller_email": seller_email}, {"$set": {"rank": rank}})
+
+
+async def record_sales(sales_by_seller: Dict[str, int]):
+    """
+    Count newly completed sales, e.g. {"seller@example.com": 2}.
+    """
+    for seller_email, count in sales_by_seller.items():
+        if seller_email and count:
+            await _apply(seller_email, inc={"total_sales": count})
+
+
+async def record_review(seller_email: Optional[str], rating: int):
+    if seller_email:
+        await _apply(seller_email, inc={"rating_sum": rating, "review_count": 1})
+
+
+async def refresh_active_listing_count(seller_email: Optional[str]):
+    """
+    Re-count the seller's active listings after one of them changed status.
+    """
+    if not seller_email:
+        return
+    count = await db.listings.count_documents({"seller_email": seller_email, "status": StatusEnum.ACTIVE})
+    await _apply(seller_email, set_={"active_listing_count": count})
+
+
+async def rebuild_seller_stats() -> int:
+    """
+    Recompute every seller's stats from purchases, reviews and listings.
+    """
+    stats: Dict[str, dict] = {}
+
+    def entry(seller_email):
+        return stats.setdefault(seller_email, {**EMPTY_STATS, "seller_email": seller_email})
+
+    # Credited to the purchase's own seller_email, as record_sales() does
+    sales = db.purchases.aggregate([
+        {"$match": {"status": "completed"}},
+        {"$group": {"_id": "$seller_email", "total_sales": {"$sum": 1}}},
+    ])
+    async for row in sales:
+        entry(row["_id"])["total_sales"] = row["total_sales"]
+
+    ratings = db.reviews.aggregate([
+        {"$group": {"_id": "$listing_id", "rating_sum": {"$sum": "$rating"}, "review_count": {"$sum": 1}}},
+        {"$lookup": {"from": "listings", "localField": "_id", "foreignField": "id", "as": "listing"}},
+        {"$unwind": "$listing"},
+        {"$group": {
+            "_id": "$listing.seller_email",
+            "rating_sum": {"$sum": "$rating_sum"},
+            "review_count": {"$sum": "$review_count"},
+        }},
+    ])
+    async for row in ratings:
+        seller = entry(row["_id"])
+        seller["rating_sum"] = row["rating_sum"]
+        seller["review_count"] = row["review_count"]
+
+    active = db.listings.aggregate([
+        {"$match": {"status": StatusEnum.ACTIVE.value}},
+        {"$group": {"_id": "$seller_email", "count": {"$sum": 1}}},
+    ])
+    async for row in active:
+        entry(row["_id"])["active_listing_count"] = row["count"]
+
+    now = datetime.now(timezone.utc)
+    ops = []
+    for seller_email, seller in stats.items():
+        if not seller_email:
+            continue
+        seller["rank"] = rank_for(seller)["rank"]
+        seller["updated_at"] = now
+        ops.append(UpdateOne({"seller_email": seller_email}, {"$set": seller}, upsert=True))
+
+    for start in range(0, len(ops), 1000):
+        await db.seller_stats.bulk_write(ops[start:start + 1000], ordered=False)
+    # Sellers with no remaining activity
+    await db.seller_stats.delete_many({"updated_at": {"$lt": now}})
+    logger.info(f"Rebuilt seller stats for {len(ops)} sellers")
+    return len(ops)
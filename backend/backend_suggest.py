@@ -0,0 +1,157 @@
+import bisect
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Listing fields offered as tag-style suggestions next to listing titles.
+SUGGEST_TAG_FIELDS = ("platform_tags", "tech_stack_tags", "use_case_tags", "tech_stack")
+
+# A sale weighs as much as this many views when ranking suggestions.
+SALE_WEIGHT = 10
+
+_KEY_END = "\uffff"
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def popularity(doc: dict) -> float:
+    return (doc.get("views") or 0) + SALE_WEIGHT * (doc.get("sales_count") or 0)
+
+
+def _word_suffixes(text: str) -> List[str]:
+    """
+    "ai logo generator" -> ["ai logo generator", "logo generator", "generator"]
+    so a prefix can match at the start of any word.
+    """
+    words = text.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over listing titles and tags.
+
+    Keys are kept in one sorted list of (normalized key, suggestion id), so a
+    prefix lookup is two bisects plus a scan of the matching range. Results
+    for very short prefixes, whose ranges are the widest, are memoized until
+    the next write. build() loads many listings with one sort; add() and
+    remove() keep the list sorted for single-listing updates.
+    """
+
+    def __init__(self, memo_prefix_len: int = 2):
+        self.memo_prefix_len = memo_prefix_len
+        self.clear()
+
+    def clear(self):
+        self._keys: List[Tuple[str, str]] = []
+        self._suggestions: Dict[str, dict] = {}
+        self._tag_refs: Dict[str, int] = {}
+        self._doc_tags: Dict[str, List[Tuple[str, float]]] = {}
+        self._memo: Dict[Tuple[str, int], List[dict]] = {}
+        self._unsorted: Optional[List[Tuple[str, str]]] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _insert_keys(self, text: str, sid: str):
+        if self._unsorted is not None:
+            self._unsorted.extend((key, sid) for key in _word_suffixes(text))
+            return
+        for key in _word_suffixes(text):
+            bisect.insort(self._keys, (key, sid))
+
+    def build(self, docs: Iterable[dict]):
+        """
+        Replace the index with `docs`, collecting every key and sorting once
+        (O(K log K) rather than one O(K) insort per key).
+        """
+        self.clear()
+        # Last copy wins, as with add(); keys are only removable once sorted
+        unique = {doc["id"]: doc for doc in docs}
+        self._unsorted = []
+        try:
+            for doc in unique.values():
+                self.add(doc)
+        finally:
+            self._keys = sorted(self._unsorted)
+            self._unsorted = None
+
+    def _delete_keys(self, text: str, sid: str):
+        for key in _word_suffixes(text):
+            i = bisect.bisect_left(self._keys, (key, sid))
+            if i < len(self._keys) and self._keys[i] == (key, sid):
+                del self._keys[i]
+
+    def add(self, doc: dict):
+        doc_id = doc["id"]
+        self.remove(doc_id)
+        score = popularity(doc)
+
+        title = normalize(doc.get("title") or "")
+        if title:
+            sid = f"listing:{doc_id}"
+            self._suggestions[sid] = {
+                "text": doc["title"], "type": "listing", "listing_id": doc_id, "score": score,
+            }
+            self._insert_keys(title, sid)
+
+        tags = {}
+        for field in SUGGEST_TAG_FIELDS:
+            for tag in doc.get(field) or []:
+                key = normalize(str(tag))
+                if key:
+                    tags.setdefault(key, str(tag))
+
+        contributions = []
+        for key, text in tags.items():
+            sid = f"tag:{key}"
+            if sid not in self._suggestions:
+                self._suggestions[sid] = {"text": text, "type": "tag", "listing_id": None, "score": 0.0}
+                self._tag_refs[sid] = 0
+                self._insert_keys(key, sid)
+            self._suggestions[sid]["score"] += score
+            self._tag_refs[sid] += 1
+            contributions.append((sid, score))
+        self._doc_tags[doc_id] = contributions
+        self._memo.clear()
+
+    def remove(self, doc_id: str):
+        sid = f"listing:{doc_id}"
+        suggestion = self._suggestions.pop(sid, None)
+        if suggestion is not None:
+            self._delete_keys(normalize(suggestion["text"]), sid)
+
+        for tag_sid, score in self._doc_tags.pop(doc_id, []):
+            self._suggestions[tag_sid]["score"] -= score
+            self._tag_refs[tag_sid] -= 1
+            if not self._tag_refs[tag_sid]:
+                del self._tag_refs[tag_sid]
+                self._suggestions.pop(tag_sid)
+                self._delete_keys(tag_sid[len("tag:"):], tag_sid)
+        self._memo.clear()
+
+    def suggest(self, query: str, limit: int = 8) -> List[dict]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        memo_key = (prefix, limit)
+        if len(prefix) <= self.memo_prefix_len and memo_key in self._memo:
+            return self._memo[memo_key]
+
+        lo = bisect.bisect_left(self._keys, (prefix,))
+        hi = bisect.bisect_left(self._keys, (prefix + _KEY_END,), lo)
+        sids = {sid for _, sid in self._keys[lo:hi]}
+        top = heapq.nlargest(limit, sids, key=lambda sid: (self._suggestions[sid]["score"], sid))
+        result = [
+            {k: self._suggestions[sid][k] for k in ("text", "type", "listing_id")}
+            for sid in top
+        ]
+
+        if len(prefix) <= self.memo_prefix_len:
+            self._memo[memo_key] = result
+        return result
+
+
+listing_suggest_index = PrefixIndex()
@@ -0,0 +1,163 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import logging
+import math
+import os
+import time
+
+from database import db
+from backend_search import listing_search_index
+from backend_codecs import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+EVENT_WEIGHTS = {
+    "view": 1.0,
+    "bid": 5.0,
+    "purchase": 20.0,
+}
+
+# Rebase before exp() gets anywhere near float overflow
+_MAX_EXPONENT = 50.0
+
+
+class TrendingIndex:
+    """
+    Exponentially time-decayed listing scores with a maintained top-K.
+
+    Uses forward decay: an event at time t adds weight * e^(rate * (t - L))
+    for a fixed landmark L, so existing scores never need rewriting and
+    comparing two raw scores compares their decayed values. When the
+    exponent grows large every score is rescaled to a new landmark.
+
+    The top `top_k` listings are kept in a sorted list updated on every
+    event. Readers get `ranking()`, a snapshot of that list refreshed at most
+    every `refresh_interval` seconds, so pages stay stable between refreshes.
+    """
+
+    def __init__(
+        self,
+        half_life: float,
+        top_k: int,
+        refresh_interval: float,
+        eligible: Callable[[str], bool] = lambda listing_id: True,
+        clock=time.time,
+    ):
+        self.rate = math.log(2) / half_life
+        self.top_k = top_k
+        self.refresh_interval = refresh_interval
+        self._eligible = eligible
+        self._clock = clock
+        self.clear()
+
+    def clear(self):
+        self._landmark = self._clock()
+        self._scores: Dict[str, float] = {}
+        # (-score, id), best first
+        self._top: List[Tuple[float, str]] = []
+        self._top_ids: Set[str] = set()
+        self._snapshot: List[str] = []
+        self._snapshot_at = float("-inf")
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _rebase(self, now: float):
+        factor = math.exp(-self.rate * (now - self._landmark))
+        self._scores = {listing_id: score * factor for listing_id, score in self._scores.items()}
+        self._top = [(score * factor, listing_id) for score, listing_id in self._top]
+        self._landmark = now
+
+    def _drop_from_top(self, listing_id: str, score: float):
+        i = bisect_left(self._top, (-score, listing_id))
+        if i < len(self._top) and self._top[i][1] == listing_id:
+            del self._top[i]
+        self._top_ids.discard(listing_id)
+
+    def record(self, listing_id: str, event: str, at: Optional[float] = None):
+        if not self._eligible(listing_id):
+            return
+        at = self._clock() if at is None else at
+        if self.rate * (at - self._landmark) > _MAX_EXPONENT:
+            self._rebase(at)
+
+        old = self._scores.get(listing_id, 0.0)
+        new = old + EVENT_WEIGHTS[event] * math.exp(self.rate * (at - self._landmark))
+        self._scores[listing_id] = new
+
+        if listing_id in self._top_ids:
+            self._drop_from_top(listing_id, old)
+        entry = (-new, listing_id)
+        if len(self._top) < self.top_k or entry < self._top[-1]:
+            insort(self._top, entry)
+            self._top_ids.add(listing_id)
+            if len(self._top) > self.top_k:
+                _, evicted = self._top.pop()
+                self._top_ids.discard(evicted)
+
+    def remove(self, listing_id: str):
+        score = self._scores.pop(listing_id, None)
+        if score is None or listing_id not in self._top_ids:
+            return
+        self._drop_from_top(listing_id, score)
+        # Promote the best listing that was just outside the top-K
+        outside = ((s, i) for i, s in self._scores.items() if i not in self._top_ids)
+        best = max(outside, default=None)
+        if best is not None:
+            insort(self._top, (-best[0], best[1]))
+            self._top_ids.add(best[1])
+
+    def score(self, listing_id: str) -> float:
+        """
+        The listing's decayed score as of now.
+        """
+        decay = math.exp(-self.rate * (self._clock() - self._landmark))
+        return self._scores.get(listing_id, 0.0) * decay
+
+    def ranking(self) -> List[str]:
+        now = self._clock()
+        if now - self._snapshot_at >= self.refresh_interval:
+            self._snapshot = [listing_id for _, listing_id in self._top]
+            self._snapshot_at = now
+            self.version += 1
+        return self._snapshot
+
+    def stats(self) -> dict:
+        return {
+            "tracked_listings": len(self._scores),
+            "top_k": len(self._top),
+            "ranking_version": self.version,
+        }
+
+
+HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", "24"))
+
+# Only active listings (those in the search index) can trend
+listing_trending_index = TrendingIndex(
+    half_life=HALF_LIFE_HOURS * 3600,
+    top_k=int(os.environ.get("TRENDING_TOP_K", "1000")),
+    refresh_interval=float(os.environ.get("TRENDING_REFRESH_SECONDS", "30")),
+    eligible=listing_search_index.__contains__,
+)
+
+
+async def rebuild_trending_index(half_lives: int = 7):
+    """
+    Re-seed the index from recent purchases and bids. View counts carry no
+    timestamps, so views only count from the moment the process starts.
+    """
+    listing_trending_index.clear()
+    since = datetime.now(timezone.utc) - timedelta(hours=HALF_LIFE_HOURS * half_lives)
+    events = []
+    async for p in db.purchases.find(
+        {"status": "completed", "purchase_date": {"$gte": since}}, {"_id": 0, "listing_id": 1, "purchase_date": 1}
+    ):
+        events.append((parse_datetime(p["purchase_date"]).timestamp(), p["listing_id"], "purchase"))
+    async for b in db.bids.find({"timestamp": {"$gte": since}}, {"_id": 0, "listing_id": 1, "timestamp": 1}):
+        events.append((parse_datetime(b["timestamp"]).timestamp(), b["listing_id"], "bid"))
+
+    for at, listing_id, event in sorted(events):
+        listing_trending_index.record(listing_id, event, at)
+    logger.info(f"Seeded trending scores for {len(listing_trending_index)} listings from {len(events)} events")
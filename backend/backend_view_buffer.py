@@ -0,0 +1,148 @@
+from typing import Dict, Iterable, Optional, Set
+import asyncio
+import logging
+import os
+import time
+
+from pymongo import UpdateOne
+
+from database import db
+from backend_etag import bump_versions
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    """
+    Write-coalescing listing view counter.
+
+    Views are added to an in-process map and flushed every `flush_interval`
+    seconds as one unordered bulk_write of $inc operations, so a burst of
+    views on a hot listing costs one update instead of one per request.
+    A flush that fails puts its counts back to be retried on the next one.
+    Each flush moves the ETags of the listings it counted (and of the
+    listings collection) on, so validated responses show the new counts.
+
+    Listing ids seen in the database are kept in a set, so checking that a
+    listing exists is a set lookup rather than a write round trip. Ids this
+    worker has not seen (e.g. created by another worker) fall back to a read.
+    """
+
+    def __init__(self, collection, flush_interval: float):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, int] = {}
+        self._known: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.flushes = 0
+        self.flushed_views = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # --- Known listing ids ---
+
+    def reset_known(self, listing_ids: Iterable[str]):
+        self._known = set(listing_ids)
+
+    def add_known(self, listing_id: str):
+        self._known.add(listing_id)
+
+    def discard_known(self, listing_id: str):
+        self._known.discard(listing_id)
+
+    async def exists(self, listing_id: str) -> bool:
+        if listing_id in self._known:
+            return True
+        if await self.collection.find_one({"id": listing_id}, {"_id": 1}):
+            self._known.add(listing_id)
+            return True
+        return False
+
+    # --- Counting ---
+
+    def record(self, listing_id: str, count: int = 1):
+        self._pending[listing_id] = self._pending.get(listing_id, 0) + count
+
+    async def flush(self) -> int:
+        """
+        Write every pending count. Returns the number of views written.
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+
+            started = time.perf_counter()
+            try:
+                await self.collection.bulk_write(
+                    [UpdateOne({"id": listing_id}, {"$inc": {"views": count}})
+                     for listing_id, count in pending.items()],
+                    ordered=False,
+                )
+            except Exception as e:
+                self.failed_flushes += 1
+                for listing_id, count in pending.items():
+                    self.record(listing_id, count)
+                logger.error(f"View flush of {len(pending)} listings failed: {e}")
+                return 0
+            try:
+                await bump_versions("listings", *(f"listing:{listing_id}" for listing_id in pending))
+            except Exception as e:
+                # The counts are written; ETags catch up on the next write
+                logger.error(f"Version bump after view flush failed: {e}")
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            views = sum(pending.values())
+            self.flushes += 1
+            self.flushed_views += views
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            return views
+
+    # --- Lifecycle ---
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the periodic flush and write whatever is still pending.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_listings": len(self._pending),
+            "pending_views": sum(self._pending.values()),
+            "known_listings": len(self._known),
+            "flush_interval_ms": self.flush_interval * 1000,
+            "flushes": self.flushes,
+            "flushed_views": self.flushed_views,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+
+listing_view_buffer = ViewBuffer(
+    db.listings,
+    flush_interval=int(os.environ.get("VIEW_FLUSH_INTERVAL_MS", "1000")) / 1000,
+)
@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+
+from bson import Binary
+from fastapi import Request
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from backend_hll import HyperLogLog
+from backend_indexes import register_index, register_hot_query
+
+logger = logging.getLogger(__name__)
+
+# Unique visitors per listing per day. Each worker keeps HyperLogLog
+# sketches for the days it served and periodically merges them into
+# db.listing_visitors ({listing_id, day, registers, version}) with a
+# compare-and-swap on `version`, so concurrent workers never lose each
+# other's registers.
+
+register_index("listing_visitors", [("listing_id", 1), ("day", 1)], unique=True)
+register_hot_query(
+    "listing visitors by day", "listing_visitors",
+    {"listing_id": "sample", "day": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}}
+)
+
+CAS_ATTEMPTS = 5
+MAX_RANGE = timedelta(days=366)
+
+Key = Tuple[str, datetime]
+
+
+def day_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day, tzinfo=timezone.utc)
+
+
+def visitor_key(request: Request, user_id: Optional[str] = None) -> str:
+    """
+    The visitor's identity: the signed-in user's id, otherwise the client
+    IP. The IP is uvicorn's resolved client address, which honours
+    X-Forwarded-For only from proxies in --forwarded-allow-ips; headers the
+    client sets itself are never trusted. Only its hash ends up in a sketch.
+    """
+    if user_id:
+        return f"id:{user_id}"
+    return f"ip:{request.client.host if request.client else ''}"
+
+
+class VisitorSketches:
+    """
+    Per-key, per-day visitor sketches buffered in memory and merged into
+    the store every `flush_interval` seconds. Memory per (key, day) is
+    fixed at one sketch regardless of traffic. Stored documents hold the key
+    in `key_field` (a listing id by default).
+    """
+
+    def __init__(self, collection, flush_interval: float, key_field: str = "listing_id"):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.key_field = key_field
+        self._pending: Dict[Key, HyperLogLog] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.flushes = 0
+        self.cas_conflicts = 0
+        self.failed_writes = 0
+
+    def record(self, key_id: str, visitor: str, now: Optional[datetime] = None):
+        key = (key_id, day_start(now or datetime.now(timezone.utc)))
+        sketch = self._pending.get(key)
+        if sketch is None:
+            sketch = self._pending[key] = HyperLogLog()
+        sketch.add(visitor)
+
+    async def _merge_into_store(self, key_id: str, day: datetime, sketch: HyperLogLog) -> bool:
+        for _ in range(CAS_ATTEMPTS):
+            doc = await self.collection.find_one(
+                {self.key_field: key_id, "day": day}, {"registers": 1, "version": 1}
+            )
+            if doc is None:
+                try:
+                    await self.collection.insert_one({
+                        self.key_field: key_id,
+                        "day": day,
+                        "registers": Binary(sketch.to_bytes()),
+                        "version": 1,
+                    })
+                    return True
+                except DuplicateKeyError:
+                    # Another worker created it first; merge into theirs
+                    self.cas_conflicts += 1
+                    continue
+
+            stored = HyperLogLog.from_bytes(doc["registers"])
+            merged = HyperLogLog(stored.precision, stored.registers).merge(sketch)
+            if merged == stored:
+                return True
+            result = await self.collection.update_one(
+                {"_id": doc["_id"], "version": doc["version"]},
+                {"$set": {"registers": Binary(merged.to_bytes())}, "$inc": {"version": 1}},
+            )
+            if result.modified_count:
+                return True
+            self.cas_conflicts += 1
+        return False
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            for (key_id, day), sketch in pending.items():
+                try:
+                    written = await self._merge_into_store(key_id, day, sketch)
+                except Exception as e:
+                    logger.error(f"Visitor sketch write for {key_id} failed: {e}")
+                    written = False
+                if not written:
+                    # Keep it for the next flush
+                    self.failed_writes += 1
+                    key = (key_id, day)
+                    if key in self._pending:
+                        self._pending[key].merge(sketch)
+                    else:
+                        self._pending[key] = sketch
+            self.flushes += 1
+
+    async def unique_visitors(self, key_id: str, start: datetime, end: datetime) -> int:
+        """
+        Estimated distinct visitors to a key between two days, inclusive.
+        """
+        start, end = day_start(start), day_start(end)
+        total = HyperLogLog()
+        async for doc in self.collection.find(
+            {self.key_field: key_id, "day": {"$gte": start, "$lte": end}}, {"registers": 1}
+        ):
+            total.merge(HyperLogLog.from_bytes(doc["registers"]))
+        # Plus what this worker has not flushed yet
+        for (pending_id, day), sketch in self._pending.items():
+            if pending_id == key_id and start <= day <= end:
+                total.merge(sketch)
+        return total.count()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_sketches": len(self._pending),
+            "flush_interval_ms": self.flush_interval * 1000,
+            "flushes": self.flushes,
+            "cas_conflicts": self.cas_conflicts,
+            "failed_writes": self.failed_writes,
+        }
+
+
+listing_visitors = VisitorSketches(
+    db.listing_visitors,
+    flush_interval=int(os.environ.get("VISITOR_FLUSH_INTERVAL_MS", "10000")) / 1000,
+)
@@ -0,0 +1,433 @@
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import time
+import uuid
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from backend_etag import bump_versions
+from backend_purchase_events import apply_purchase_stats
+from backend_outbox import email_message, enqueue_emails
+from backend_checkout_sessions import forget_checkout_sessions
+from backend_indexes import register_index, register_hot_query
+
+logger = logging.getLogger(__name__)
+
+# Payment webhook ingestion. The webhook handler only stores the raw event in
+# db.webhook_events, keyed by the provider's event id, and acknowledges; a
+# provider retry of an event already stored hits the unique _id and is
+# acknowledged without being stored again. A background consumer claims
+# received events in batches under a lease (like the email outbox) and
+# applies a whole batch with a handful of queries: one $in for the
+# listings, one for the pending purchases, one bulk_write of conditional
+# completions.
+#
+# Event: {_id: <provider event id>, type, payload, status (pending|processing|
+#         processed|failed), attempts, next_attempt_at, lease_until, claim,
+#         last_error, received_at, processed_at}
+
+PROCESSED_RETENTION_DAYS = int(os.environ.get("WEBHOOK_EVENT_RETENTION_DAYS", "30"))
+
+register_index("webhook_events", [("status", 1), ("next_attempt_at", 1)])
+register_index("webhook_events", [("status", 1), ("lease_until", 1)])
+register_index("webhook_events", [("claim", 1)])
+register_index("webhook_events", [("processed_at", 1)], expireAfterSeconds=PROCESSED_RETENTION_DAYS * 86400)
+register_hot_query(
+    "due webhook events", "webhook_events",
+    {"status": "pending", "next_attempt_at": {"$lte": datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+    [("next_attempt_at", 1)]
+)
+
+PLATFORM_FEE_RATE = 0.15
+DODO_FEE_RATE = 0.035
+
+
+def webhook_event_id(header_id: Optional[str], body: bytes) -> str:
+    """
+    The provider's event id, or a hash of the raw body for events sent
+    without one (retries resend the same body).
+    """
+    if header_id:
+        return header_id
+    return "sha256:" + hashlib.sha256(body).hexdigest()
+
+
+async def store_webhook_event(event_id: str, data: dict) -> bool:
+    """
+    Persist a verified event for the consumer. Returns False for an event
+    that was already received.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        await db.webhook_events.insert_one({
+            "_id": event_id,
+            "type": data.get("type"),
+            "payload": data,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "received_at": now,
+        })
+    except DuplicateKeyError:
+        return False
+    webhook_event_consumer.wake()
+    return True
+
+
+class InvalidWebhookEvent(ValueError):
+    """
+    A payload that can never be applied; its event fails without retries.
+    """
+
+
+def _payment_details(payload: dict) -> Tuple[Optional[str], Optional[str], str, List[str]]:
+    payment_data = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(payment_data, dict):
+        raise InvalidWebhookEvent("payload has no data object")
+    metadata = payment_data.get("metadata") or {}
+    customer = payment_data.get("customer") or {}
+    if not isinstance(metadata, dict) or not isinstance(customer, dict):
+        raise InvalidWebhookEvent("metadata and customer must be objects")
+    listing_ids_str = metadata.get("listing_ids") or ""
+    if not isinstance(listing_ids_str, str):
+        raise InvalidWebhookEvent("metadata.listing_ids must be a string")
+    listing_ids = [lid for lid in listing_ids_str.split(",") if lid]
+    checkout_id = payment_data.get("id")
+    buyer_email = customer.get("email")
+    if listing_ids and not (isinstance(checkout_id, str) and checkout_id):
+        raise InvalidWebhookEvent("payment has no id")
+    if listing_ids and not (isinstance(buyer_email, str) and buyer_email):
+        raise InvalidWebhookEvent("payment has no customer email")
+    buyer_name = customer.get("name")
+    return (
+        checkout_id,
+        buyer_email,
+        buyer_name if isinstance(buyer_name, str) and buyer_name else "Valued Customer",
+        listing_ids,
+    )
+
+
+async def apply_payment_events(payloads: List[dict], dry_run: bool = False, notify: bool = True) -> int:
+    """
+    Complete the pending purchases for a batch of payment.succeeded payloads
+    and apply their derived stats and emails. Idempotent: a purchase is only
+    completed while still pending, and its stats and emails go out once,
+    from whichever run claims them (see apply_purchase_stats), so retried,
+    reclaimed and replayed batches do not count anything twice. With
+    `dry_run` nothing is written. Returns the number of purchases this call
+    applied (or would complete).
+    """
+    payments = [_payment_details(p) for p in payloads]
+    payments = [p for p in payments if p[3]]
+    if not payments:
+        return 0
+
+    # 1. Every listing and pending purchase the batch touches
+    listing_ids = list({lid for _, _, _, ids in payments for lid in ids})
+    buyer_emails = list({buyer_email for _, buyer_email, _, _ in payments})
+    listings = {
+        l["id"]: l for l in await db.listings.find(
+            {"id": {"$in": listing_ids}},
+            {"_id": 0, "id": 1, "title": 1, "price_usd": 1, "seller_email": 1}
+        ).to_list(None)
+    }
+    pending: Dict[Tuple[str, str], List[dict]] = {}
+    async for p in db.purchases.find(
+        {"listing_id": {"$in": listing_ids}, "buyer_email": {"$in": buyer_emails}, "status": "pending"},
+        {"_id": 0, "id": 1, "listing_id": 1, "buyer_email": 1}
+    ):
+        pending.setdefault((p["listing_id"], p["buyer_email"]), []).append(p)
+
+    # 2. Completions
+    completions = []
+    for checkout_id, buyer_email, _, ids in payments:
+        for lid in ids:
+            listing = listings.get(lid)
+            if not listing:
+                continue
+            price_paid = listing.get('price_usd', 0)
+            completion = {
+                "status": "completed",
+                "dodo_checkout_id": checkout_id,
+                "platform_fee": price_paid * PLATFORM_FEE_RATE,
+                "dodo_fee": price_paid * DODO_FEE_RATE,
+                "stats_applied": False,
+            }
+            for p in pending.pop((lid, buyer_email), []):
+                completions.append((p["id"], completion))
+
+    if dry_run:
+        return len(completions)
+
+    checkout_ids = [checkout_id for checkout_id, _, _, _ in payments if checkout_id]
+    await forget_checkout_sessions(checkout_ids)
+    # Each update is conditional on the purchase still being pending, so
+    # concurrent runs complete each one once
+    modified = 0
+    if completions:
+        result = await db.purchases.bulk_write([
+            UpdateOne({"id": purchase_id, "status": "pending"}, {"$set": completion})
+            for purchase_id, completion in completions
+        ], ordered=False)
+        modified = result.modified_count
+
+    # 3. Stats and emails for every purchase of these checkouts still owed
+    # them, including ones a failed earlier attempt completed
+    buyer_names = {checkout_id: buyer_name for checkout_id, _, buyer_name, _ in payments}
+
+    async def send_emails(purchases: List[dict]):
+        emails = []
+        for p in purchases:
+            listing = listings.get(p["listing_id"], {})
+            title = listing.get('title') or p.get('listing_title')
+            emails.append(email_message(
+                "order_confirmation",
+                to_email=p["buyer_email"],
+                order_id=p["dodo_checkout_id"],
+                listing_title=title
+            ))
+            seller_email = listing.get('seller_email') or p.get('seller_email')
+            if seller_email:
+                emails.append(email_message(
+                    "sale_notification",
+                    to_email=seller_email,
+                    buyer_name=buyer_names.get(p["dodo_checkout_id"], "Valued Customer"),
+                    item_title=title,
+                    amount=listing.get('price_usd', 0),
+                    currency="USD"
+                ))
+        await enqueue_emails(emails)
+
+    applied = await apply_purchase_stats(
+        {"dodo_checkout_id": {"$in": checkout_ids}}, notify=send_emails if notify else None
+    )
+    # After the stats, so new ETags never cover purchases without them
+    if modified or applied:
+        await bump_versions("purchases")
+    return len(applied)
+
+
+class EventHandler(NamedTuple):
+    validate: Callable[[dict], object]
+    apply: Callable[..., Awaitable[int]]
+
+
+# Event type -> (payload validator raising InvalidWebhookEvent, batch handler)
+HANDLERS = {
+    "payment.succeeded": EventHandler(_payment_details, apply_payment_events),
+}
+
+EventErrors = List[Tuple[dict, str]]
+
+
+async def apply_events(handler: EventHandler, events: List[dict], **options) -> Tuple[int, EventErrors, EventErrors]:
+    """
+    Apply `events` of one type without letting one bad event fail the rest.
+    Events whose payload does not validate are set aside; if the handler
+    raises for a batch, each half is retried on its own (handlers are
+    idempotent) down to single events. Returns (purchases completed,
+    [(invalid event, error)], [(failed event, error)]).
+    """
+    invalid: EventErrors = []
+    failed: EventErrors = []
+    valid = []
+    for event in events:
+        try:
+            handler.validate(event["payload"])
+        except InvalidWebhookEvent as e:
+            invalid.append((event, str(e)))
+        else:
+            valid.append(event)
+
+    async def run(group: List[dict]) -> int:
+        try:
+            return await handler.apply([e["payload"] for e in group], **options)
+        except Exception as e:
+            if len(group) == 1:
+                failed.append((group[0], str(e) or e.__class__.__name__))
+                return 0
+            middle = len(group) // 2
+            return await run(group[:middle]) + await run(group[middle:])
+
+    completed = await run(valid) if valid else 0
+    return completed, invalid, failed
+
+
+class WebhookEventConsumer:
+    def __init__(
+        self,
+        collection,
+        batch_size: int,
+        poll_interval: float,
+        lease: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+
+    def wake(self):
+        self._wake.set()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def claim(self) -> List[dict]:
+        """
+        Lease up to `batch_size` received events to this consumer.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "processing", "lease_until": {"$lte": now}},
+        ]}
+        candidates = await self.collection.find(claimable, {"_id": 1}).sort(
+            "next_attempt_at", 1
+        ).to_list(self.batch_size)
+        if not candidates:
+            return []
+        return await self.lease_events([c["_id"] for c in candidates], claimable)
+
+    async def lease_events(self, ids: List[str], claimable: dict) -> List[dict]:
+        """
+        Lease the events among `ids` that still match `claimable`, with a
+        fresh claim token. Returns the leased events.
+        """
+        claim = str(uuid.uuid4())
+        now = datetime.now(timezone.utc)
+        await self.collection.update_many(
+            {"_id": {"$in": ids}, **claimable},
+            {"$set": {"status": "processing", "claim": claim, "lease_until": now + timedelta(seconds=self.lease)}},
+        )
+        return await self.collection.find({"claim": claim}).to_list(None)
+
+    async def _finish(self, events: List[dict], error: Optional[str], retry: bool = True):
+        now = datetime.now(timezone.utc)
+        ops = []
+        for event in events:
+            attempts = event["attempts"] + 1
+            if error is None:
+                self.processed += 1
+                update = {"status": "processed", "processed_at": now, "attempts": attempts}
+            elif not retry or attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error(f"Giving up on webhook event {event['_id']} after {attempts} attempts: {error}")
+                update = {"status": "failed", "attempts": attempts, "last_error": error}
+            else:
+                self.retried += 1
+                update = {
+                    "status": "pending",
+                    "attempts": attempts,
+                    "last_error": error,
+                    "next_attempt_at": now + timedelta(seconds=self.backoff(attempts)),
+                }
+            ops.append(UpdateOne(
+                {"_id": event["_id"], "claim": event["claim"]},
+                {"$set": update, "$unset": {"claim": "", "lease_until": ""}},
+            ))
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+
+    async def process_batch(self) -> int:
+        """
+        Claim and apply one batch. Returns the number of events claimed.
+        """
+        events = await self.claim()
+        if not events:
+            return 0
+
+        started = time.perf_counter()
+        by_type: Dict[str, List[dict]] = {}
+        for event in events:
+            by_type.setdefault(event.get("type"), []).append(event)
+
+        for event_type, group in by_type.items():
+            handler = HANDLERS.get(event_type)
+            if handler is None:
+                # Acknowledged and kept, nothing to apply
+                await self._finish(group, None)
+                continue
+            _, invalid, failed = await apply_events(handler, group)
+            for event, error in invalid:
+                await self._finish([event], f"invalid payload: {error}", retry=False)
+            for event, error in failed:
+                logger.error(f"Applying {event_type} webhook event {event['_id']} failed: {error}")
+                await self._finish([event], error)
+            errored = {event["_id"] for event, _ in invalid + failed}
+            await self._finish([e for e in group if e["_id"] not in errored], None)
+
+        self.batches += 1
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+        return len(events)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                claimed = await self.process_batch()
+            except Exception as e:
+                logger.error(f"Webhook event batch failed: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop claiming new batches. Unprocessed events stay stored.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "batches": self.batches,
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+        }
+
+
+webhook_event_consumer = WebhookEventConsumer(
+    db.webhook_events,
+    batch_size=int(os.environ.get("WEBHOOK_BATCH_SIZE", "100")),
+    poll_interval=float(os.environ.get("WEBHOOK_POLL_SECONDS", "1")),
+    lease=float(os.environ.get("WEBHOOK_LEASE_SECONDS", "120")),
+    max_attempts=int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", "8")),
+    backoff_base=float(os.environ.get("WEBHOOK_BACKOFF_SECONDS", "5")),
+    backoff_max=float(os.environ.get("WEBHOOK_BACKOFF_MAX_SECONDS", "1800")),
+)
@@ -0,0 +1,377 @@
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from pymongo import UpdateOne
+
+from database import db
+from backend_indexes import register_index
+from backend_webhook_events import HANDLERS, apply_events, webhook_event_consumer
+
+logger = logging.getLogger(__name__)
+
+# Replay of payment webhook events, for when the handler was down or
+# applied events wrongly. Events come from db.webhook_events or from a
+# JSON / NDJSON dump and go through the consumer's batch handlers
+# (backend_webhook_events.HANDLERS), `concurrency` batches at a time and
+# optionally paced to `rate` events per second. Each batch is leased the
+# way the live consumer leases events (WebhookEventConsumer.lease_events),
+# so the two never apply an event at the same time, and only events in a
+# replayable status are taken: pending and processing events are left to
+# the consumer unless asked for explicitly. Dump events are stored first
+# (status "imported" when new) and marked processed or failed like stored
+# ones. Handlers are idempotent, so replaying an applied event completes
+# nothing twice.
+
+register_index("webhook_events", [("received_at", 1)])
+
+MAX_REPORTED_ERRORS = 20
+MAX_REPLAY_JOBS = 50
+REPLAYABLE_STATUSES = ["processed", "failed", "imported"]
+
+
+class RateLimiter:
+    """
+    Paces callers to `rate` events per second on average.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+
+    async def acquire(self, n: int):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(self._next, now)
+        self._next = start + n * self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class ReplayProgress:
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.read = 0
+        self.applied = 0
+        self.skipped = 0
+        self.failed = 0
+        self.purchases_completed = 0
+        self.errors: List[str] = []
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def stats(self) -> dict:
+        elapsed = self.elapsed
+        done = self.applied + self.skipped + self.failed
+        return {
+            "dry_run": self.dry_run,
+            "read": self.read,
+            "applied": self.applied,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "purchases_completed": self.purchases_completed,
+            "elapsed_seconds": round(elapsed, 2),
+            "events_per_second": round(done / elapsed, 1) if elapsed else 0.0,
+            "errors": self.errors,
+        }
+
+
+def stored_event_query(
+    statuses: Optional[List[str]] = None,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> dict:
+    query = {"status": {"$in": statuses or REPLAYABLE_STATUSES}}
+    if event_type:
+        query["type"] = event_type
+    if since or until:
+        query["received_at"] = {}
+        if since:
+            query["received_at"]["$gte"] = since
+        if until:
+            query["received_at"]["$lt"] = until
+    return query
+
+
+async def stored_events(query: dict, batch_size: int) -> AsyncIterator[List[dict]]:
+    batch = []
+    cursor = db.webhook_events.find(query, {"_id": 1, "type": 1, "payload": 1}).sort("received_at", 1)
+    async for event in cursor.batch_size(batch_size):
+        batch.append(event)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _claimable(statuses: List[str]) -> dict:
+    # Events in `statuses`; processing ones only once their lease expired
+    now = datetime.now(timezone.utc)
+    return {"$or": [
+        {"status": {"$in": [s for s in statuses if s != "processing"]}},
+        *([{"status": "processing", "lease_until": {"$lte": now}}] if "processing" in statuses else []),
+    ]}
+
+
+def _dump_event(record: dict, where: str) -> dict:
+    # Stored events only: a bare provider payload carries no event id (it
+    # is a request header), so it cannot be matched to its stored copy
+    if not isinstance(record, dict) or "_id" not in record or not isinstance(record.get("payload"), dict):
+        raise ValueError(f"{where}: expected a stored webhook event with _id and payload")
+    return {"_id": record["_id"], "type": record.get("type") or record["payload"].get("type"), "payload": record["payload"]}
+
+
+async def dump_events(path: str, batch_size: int) -> AsyncIterator[List[dict]]:
+    """
+    Stored events ({_id, type, payload}, as exported from
+    db.webhook_events) from a JSON array or NDJSON file.
+    """
+    with open(path, "rb") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == b"[":
+            records = ((r, f"{path}: item {i}") for i, r in enumerate(json.load(f)))
+        else:
+            records = ((json.loads(line), f"{path}:{n}") for n, line in enumerate(f, 1) if line.strip())
+
+        batch = []
+        for record, where in records:
+            batch.append(_dump_event(record, where))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+                # Let the replay workers run while the file is parsed
+                await asyncio.sleep(0)
+        if batch:
+            yield batch
+
+
+async def _import_events(events: List[dict]):
+    # Store dump events not stored yet; stored ones keep their status
+    now = datetime.now(timezone.utc)
+    await db.webhook_events.bulk_write([
+        UpdateOne(
+            {"_id": e["_id"]},
+            {"$setOnInsert": {
+                "type": e["type"], "payload": e["payload"], "status": "imported",
+                "attempts": 0, "next_attempt_at": now, "received_at": now,
+            }},
+            upsert=True,
+        ) for e in events
+    ], ordered=False)
+
+
+async def _finish(events: List[dict], errors: Dict[str, str]):
+    now = datetime.now(timezone.utc)
+    await db.webhook_events.bulk_write([
+        UpdateOne(
+            {"_id": e["_id"], "claim": e["claim"]},
+            {
+                "$set": (
+                    {"status": "failed", "last_error": errors[e["_id"]]} if e["_id"] in errors
+                    else {"status": "processed", "processed_at": now}
+                ),
+                "$unset": {"claim": "", "lease_until": ""},
+            },
+        ) for e in events
+    ], ordered=False)
+
+
+async def _leased(events: List[dict], statuses: List[str], imported: bool, dry_run: bool) -> List[dict]:
+    # The events of a batch this replay may apply, leased unless dry run
+    ids = [e["_id"] for e in events]
+    if dry_run:
+        stored = {
+            e["_id"] for e in await db.webhook_events.find(
+                {"_id": {"$in": ids}, "$nor": [_claimable(statuses)]}, {"_id": 1}
+            ).to_list(None)
+        }
+        return [e for e in events if e["_id"] not in stored]
+    if imported:
+        await _import_events(events)
+    return await webhook_event_consumer.lease_events(ids, _claimable(statuses))
+
+
+async def _replay_batch(
+    events: List[dict], progress: ReplayProgress, notify: bool, statuses: List[str], imported: bool
+):
+    leased = await _leased(events, statuses, imported, progress.dry_run)
+    progress.skipped += len(events) - len(leased)
+
+    by_type: Dict[str, List[dict]] = {}
+    for event in leased:
+        by_type.setdefault(event["type"], []).append(event)
+
+    for event_type, group in by_type.items():
+        handler = HANDLERS.get(event_type)
+        if handler is None:
+            progress.skipped += len(group)
+            if not progress.dry_run:
+                await _finish(group, {})
+            continue
+        try:
+            completed, invalid, failed = await apply_events(handler, group, dry_run=progress.dry_run, notify=notify)
+        except Exception as e:
+            completed, invalid, failed = 0, [], [(event, str(e)) for event in group]
+        errors = {event["_id"]: error for event, error in invalid + failed}
+        if not progress.dry_run:
+            await _finish(group, errors)
+        for event, error in invalid + failed:
+            logger.error(f"Replaying {event_type} webhook event {event['_id']} failed: {error}")
+            if len(progress.errors) < MAX_REPORTED_ERRORS:
+                progress.errors.append(f"{event['_id']}: {error}")
+        progress.failed += len(errors)
+        progress.applied += len(group) - len(errors)
+        progress.purchases_completed += completed
+
+
+async def replay_webhook_events(
+    batches: AsyncIterator[List[dict]],
+    statuses: Optional[List[str]] = None,
+    imported: bool = False,
+    concurrency: int = 4,
+    rate: Optional[float] = None,
+    dry_run: bool = False,
+    notify: bool = True,
+    progress: Optional[ReplayProgress] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    progress_interval: float = 1.0,
+) -> dict:
+    """
+    Apply every batch from `batches` with up to `concurrency` batches in
+    flight, calling `on_progress` with the running stats every
+    `progress_interval` seconds. Events whose stored status is not in
+    `statuses` (default REPLAYABLE_STATUSES) are skipped; `imported` stores
+    the events first, for dumps. `notify` off skips the order and sale
+    emails of purchases the replay completes.
+    """
+    statuses = statuses or REPLAYABLE_STATUSES
+    progress = progress or ReplayProgress(dry_run)
+    limiter = RateLimiter(rate) if rate else None
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker():
+        while True:
+            events = await queue.get()
+            try:
+                if events is None:
+                    return
+                if limiter:
+                    await limiter.acquire(len(events))
+                done = progress.applied + progress.skipped + progress.failed
+                try:
+                    await _replay_batch(events, progress, notify, statuses, imported)
+                except Exception as e:
+                    # e.g. a transient Mongo error leasing or finishing; the
+                    # batch's unfinished events count as failed (leased ones
+                    # are released when their lease expires) and the worker
+                    # moves on, so the producer never blocks on a dead queue
+                    settled = progress.applied + progress.skipped + progress.failed - done
+                    progress.failed += len(events) - settled
+                    logger.error(f"Replaying a batch of {len(events)} webhook events failed: {e}")
+                    if len(progress.errors) < MAX_REPORTED_ERRORS:
+                        progress.errors.append(f"{events[0]['_id']}..({len(events)}): {e}")
+            finally:
+                queue.task_done()
+
+    async def report():
+        while True:
+            await asyncio.sleep(progress_interval)
+            on_progress(progress.stats())
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    reporter = asyncio.create_task(report()) if on_progress else None
+    try:
+        async for events in batches:
+            progress.read += len(events)
+            await queue.put(events)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        if reporter:
+            reporter.cancel()
+        progress.finished = time.perf_counter()
+    return progress.stats()
+
+
+class ReplayJob:
+    """
+    A replay started from the admin API, running in the background.
+    """
+
+    def __init__(self, params: dict):
+        self.id = str(uuid.uuid4())
+        self.params = params
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.progress = ReplayProgress(params["dry_run"])
+        self.task: Optional[asyncio.Task] = None
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "params": self.params,
+            "created_at": self.created_at,
+            **self.progress.stats(),
+        }
+
+
+# Jobs started on this worker, by id; the oldest finished ones are dropped
+# beyond MAX_REPLAY_JOBS
+replay_jobs: Dict[str, ReplayJob] = {}
+
+
+def _evict_finished_jobs():
+    finished = [job_id for job_id, job in replay_jobs.items() if job.status != "running"]
+    for job_id in finished[:max(0, len(replay_jobs) - MAX_REPLAY_JOBS + 1)]:
+        del replay_jobs[job_id]
+
+
+def start_replay_job(
+    query: dict,
+    statuses: Optional[List[str]],
+    concurrency: int,
+    rate: Optional[float],
+    batch_size: int,
+    dry_run: bool,
+    notify: bool,
+) -> ReplayJob:
+    job = ReplayJob({
+        "query": query, "statuses": statuses, "concurrency": concurrency, "rate": rate,
+        "batch_size": batch_size, "dry_run": dry_run, "notify": notify,
+    })
+
+    async def run():
+        try:
+            await replay_webhook_events(
+                stored_events(query, batch_size), statuses=statuses, concurrency=concurrency, rate=rate,
+                dry_run=dry_run, notify=notify, progress=job.progress,
+            )
+            job.status = "done"
+        except Exception as e:
+            logger.error(f"Webhook replay {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+
+    job.task = asyncio.create_task(run())
+    _evict_finished_jobs()
+    replay_jobs[job.id] = job
+    return job
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Request, HTTPException, Header
-from typing import Optional
+from fastapi import APIRouter, Depends, Request, HTTPException, Header
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
 import logging
 import os
-from database import db
+import json
 from dodopayments_integration import client
-from datetime import datetime
-from backend_email import send_order_confirmation, send_sale_notification
+from backend_webhook_events import store_webhook_event, webhook_event_id
+from backend_webhook_replay import replay_jobs, start_replay_job, stored_event_query
+from backend_auth_service import get_current_admin
+from backend_models_user import User
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -15,7 +19,8 @@ DODO_WEBHOOK_KEY = os.environ.get("DODO_PAYMENTS_WEBHOOK_KEY")
 @router.post("/dodopayments")
 async def dodo_webhook(
     request: Request,
-    x_dodo_signature: Optional[str] = Header(None)
+    x_dodo_signature: Optional[str] = Header(None),
+    webhook_id: Optional[str] = Header(None)
 ):
     """
     Webhook handler for Dodo Payments events.
@@ -38,67 +43,59 @@ async def dodo_webhook(
             raise HTTPException(status_code=400, detail="Invalid signature")
 
     try:
-        data = await request.json()
-        event_type = data.get("type")
-        
-        logger.info(f"Received Dodo Webhook: {event_type}")
+        data = json.loads(payload)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    event_type = data.get("type")
 
-        if event_type == "payment.succeeded":
-            payment_data = data.get("data", {})
-            checkout_id = payment_data.get("id")
-            metadata = payment_data.get("metadata", {})
-            listing_ids_str = metadata.get("listing_ids", "")
-            listing_ids = listing_ids_str.split(",") if listing_ids_str else []
-            buyer_email = payment_data.get("customer", {}).get("email")
-            buyer_name = payment_data.get("customer", {}).get("name", "Valued Customer")
-            
-            # Update orders in DB
-            for lid in listing_ids:
-                # Fetch listing for price and seller info
-                listing = await db.listings.find_one({"id": lid})
-                
-                if listing:
-                    price_paid = listing.get('price_usd', 0)
-                    platform_fee = price_paid * 0.15
-                    dodo_fee = price_paid * 0.035
+    # Stored and acknowledged; the event consumer applies it
+    event_id = webhook_event_id(webhook_id, payload)
+    try:
+        stored = await store_webhook_event(event_id, data)
+    except Exception as e:
+        logger.error(f"Error storing webhook {event_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-                    # Find the pending purchase or create a completed one
-                    await db.purchases.update_many(
-                        {"listing_id": lid, "buyer_email": buyer_email, "status": "pending"},
-                        {"$set": {
-                            "status": "completed", 
-                            "dodo_checkout_id": checkout_id,
-                            "platform_fee": platform_fee,
-                            "dodo_fee": dodo_fee
-                        }}
-                    )
+    if not stored:
+        logger.info(f"Duplicate Dodo Webhook {event_id} ({event_type})")
+        return {"status": "duplicate"}
+    logger.info(f"Received Dodo Webhook {event_id}: {event_type}")
+    return {"status": "success"}
 
-                    # Notify Buyer
-                    try:
-                        await send_order_confirmation(
-                            to_email=buyer_email,
-                            order_id=checkout_id,
-                            listing_title=listing['title']
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to send webhook success email to buyer: {e}")
 
-                    # Notify Seller
-                    seller_email = listing.get('seller_email')
-                    if seller_email:
-                        try:
-                            await send_sale_notification(
-                                to_email=seller_email,
-                                buyer_name=buyer_name,
-                                item_title=listing['title'],
-                                amount=listing.get('price_usd', 0),
-                                currency="USD"
-                            )
-                        except Exception as e:
-                            logger.error(f"Failed to send webhook sale notification to seller: {e}")
+class WebhookReplayRequest(BaseModel):
+    statuses: Optional[List[str]] = None
+    type: Optional[str] = "payment.succeeded"
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    concurrency: int = Field(4, ge=1, le=32)
+    rate: Optional[float] = Field(None, gt=0)
+    batch_size: int = Field(500, ge=1, le=5000)
+    dry_run: bool = True
+    notify: bool = False
 
-        return {"status": "success"}
 
-    except Exception as e:
-        logger.error(f"Error processing webhook: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+@router.post("/replay")
+async def replay_webhooks(body: WebhookReplayRequest, current_user: User = Depends(get_current_admin)):
+    """
+    Replay stored webhook events in the background. Poll the returned job
+    for progress. Dry run by default.
+    """
+    job = start_replay_job(
+        stored_event_query(body.statuses, body.type, body.since, body.until),
+        statuses=body.statuses,
+        concurrency=body.concurrency,
+        rate=body.rate,
+        batch_size=body.batch_size,
+        dry_run=body.dry_run,
+        notify=body.notify,
+    )
+    return job.stats()
+
+
+@router.get("/replay/{job_id}")
+async def get_webhook_replay(job_id: str, current_user: User = Depends(get_current_admin)):
+    job = replay_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Replay job not found")
+    return job.stats()
@@ -0,0 +1,187 @@
+"""
+Profile endpoint latency: the original per-review lookup implementation
+against build_user_profile().
+
+Seeds a throwaway database (BENCH_DB_NAME, default "profile_bench") on the
+MONGO_URL from backend/.env, then times both implementations for the same
+seller.
+
+    cd backend && python -m benchmarks.bench_profile --listings 200 --reviews 2000
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Point the shared database module at the benchmark database before it loads
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "profile_bench")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import typer
+
+from database import db
+from backend_indexes import apply_indexes
+from backend_models_order_review import StatusEnum
+from backend_profiles import build_user_profile
+from backend_seller_stats import calculate_seller_rank, rebuild_seller_stats
+import server  # noqa: F401  (loads every module's index declarations)
+
+app = typer.Typer()
+
+
+async def legacy_user_profile(user_id: str):
+    """
+    The profile handler as it was before the rewrite (reviewers resolved by
+    email so it runs against current review documents).
+    """
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "email": 0, "role": 0})
+    user_internal = await db.users.find_one({"id": user_id})
+    user_email = user_internal["email"]
+
+    listings = await db.listings.find(
+        {"seller_email": user_email, "status": StatusEnum.ACTIVE},
+        {"_id": 0}
+    ).sort("created_at", -1).to_list(100)
+
+    all_seller_listings = await db.listings.find({"seller_email": user_email}, {"id": 1}).to_list(None)
+    all_listing_ids = [l["id"] for l in all_seller_listings]
+
+    total_sales = 0
+    if all_listing_ids:
+        total_sales = await db.purchases.count_documents({"listing_id": {"$in": all_listing_ids}})
+
+    reviews = []
+    average_rating = 0.0
+    if all_listing_ids:
+        raw_reviews = await db.reviews.find(
+            {"listing_id": {"$in": all_listing_ids}},
+            {"_id": 0}
+        ).sort("created_at", -1).to_list(20)
+        for r in raw_reviews:
+            r["reviewer"] = await db.users.find_one(
+                {"email": r["reviewer_email"]}, {"name": 1, "picture": 1, "created_at": 1, "_id": 0}
+            )
+            r["listing"] = await db.listings.find_one(
+                {"id": r["listing_id"]}, {"title": 1, "price": 1, "images": 1, "_id": 0}
+            )
+        reviews = raw_reviews
+
+        rating_result = await db.reviews.aggregate([
+            {"$match": {"listing_id": {"$in": all_listing_ids}}},
+            {"$group": {"_id": None, "avg_rating": {"$avg": "$rating"}}}
+        ]).to_list(1)
+        if rating_result:
+            average_rating = round(rating_result[0]["avg_rating"], 1)
+
+    return {
+        "user": user,
+        "listings": listings,
+        "stats": {"total_sales": total_sales, "average_rating": average_rating, "total_reviews": len(reviews)},
+        "gamification": calculate_seller_rank(total_sales, average_rating),
+        "recent_reviews": reviews,
+    }
+
+
+async def seed(listings: int, reviews: int, purchases: int, reviewers: int) -> str:
+    for name in ("users", "listings", "reviews", "purchases", "seller_stats"):
+        await db[name].drop()
+    await apply_indexes()
+
+    now = datetime.now(timezone.utc)
+    seller_id = str(uuid.uuid4())
+    users = [{
+        "id": seller_id, "email": "seller@bench.test", "name": "Bench Seller",
+        "role": "user", "password_hash": "x", "created_at": now - timedelta(days=400),
+    }]
+    users += [{
+        "id": str(uuid.uuid4()), "email": f"buyer{i}@bench.test", "name": f"Buyer {i}",
+        "picture": None, "created_at": now - timedelta(days=i % 365),
+    } for i in range(reviewers)]
+    await db.users.insert_many(users)
+
+    listing_docs = [{
+        "id": str(uuid.uuid4()), "title": f"Listing {i}", "description": "Benchmark listing",
+        "price": 10 + i % 90, "price_usd": 10 + i % 90, "images": [], "category": "Web App",
+        "status": StatusEnum.ACTIVE.value if i % 5 else StatusEnum.SOLD.value,
+        "seller_email": "seller@bench.test", "seller_id": seller_id,
+        "created_at": now - timedelta(hours=i),
+    } for i in range(listings)]
+    await db.listings.insert_many(listing_docs)
+
+    rng = random.Random(42)
+    await db.reviews.insert_many([{
+        "id": str(uuid.uuid4()), "listing_id": rng.choice(listing_docs)["id"],
+        "reviewer_email": f"buyer{rng.randrange(reviewers)}@bench.test",
+        "rating": rng.randint(3, 5), "comment": "Solid code",
+        "created_at": now - timedelta(minutes=i),
+    } for i in range(reviews)])
+    await db.purchases.insert_many([{
+        "id": str(uuid.uuid4()), "listing_id": rng.choice(listing_docs)["id"],
+        "buyer_email": f"buyer{rng.randrange(reviewers)}@bench.test", "seller_email": "seller@bench.test",
+        "status": "completed", "purchase_date": now - timedelta(minutes=i),
+    } for i in range(purchases)])
+    await rebuild_seller_stats()
+    return seller_id
+
+
+async def measure(fn, user_id: str, iterations: int, concurrency: int):
+    for _ in range(5):
+        await fn(user_id)
+    timings = []
+
+    async def one():
+        start = time.perf_counter()
+        await fn(user_id)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    wall = time.perf_counter()
+    for start in range(0, iterations, concurrency):
+        await asyncio.gather(*(one() for _ in range(min(concurrency, iterations - start))))
+    wall = time.perf_counter() - wall
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+        "mean": statistics.fmean(timings),
+        "rps": iterations / wall,
+    }
+
+
+@app.command()
+def main(
+    listings: int = typer.Option(200, help="Listings owned by the benchmarked seller."),
+    reviews: int = typer.Option(2000, help="Reviews spread over those listings."),
+    purchases: int = typer.Option(5000, help="Completed purchases of those listings."),
+    reviewers: int = typer.Option(500, help="Distinct reviewing users."),
+    iterations: int = typer.Option(200, help="Profile reads per implementation."),
+    concurrency: int = typer.Option(1, help="Profile reads in flight at once."),
+    keep: bool = typer.Option(False, help="Keep the seeded database afterwards."),
+):
+    async def run():
+        user_id = await seed(listings, reviews, purchases, reviewers)
+        new = await build_user_profile(user_id)
+        old = await legacy_user_profile(user_id)
+        assert [r["id"] for r in new["recent_reviews"]] == [r["id"] for r in old["recent_reviews"]]
+        assert new["stats"]["total_sales"] == old["stats"]["total_sales"]
+
+        results = {
+            "legacy": await measure(legacy_user_profile, user_id, iterations, concurrency),
+            "pipeline": await measure(build_user_profile, user_id, iterations, concurrency),
+        }
+        if not keep:
+            await db.client.drop_database(db.name)
+        return results
+
+    results = asyncio.run(run())
+    typer.echo(f"{'impl':10} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9} {'req/s':>9}")
+    for name, r in results.items():
+        typer.echo(f"{name:10} {r['p50']:9.2f} {r['p95']:9.2f} {r['mean']:9.2f} {r['rps']:9.1f}")
+    typer.echo(f"p50 speedup: {results['legacy']['p50'] / results['pipeline']['p50']:.1f}x")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,106 @@
+"""
+Trend bucketing: the original per-purchase loop (ISO parsing, strftime
+keys, quadratic week fill) against bucket_series() on columnar arrays, for
+the same synthetic purchases, and bucket_series() on the daily rollup
+rows the endpoint actually reads.
+
+Runs in memory; no database needed.
+
+    cd backend && python -m benchmarks.bench_trend --purchases 1000000
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import typer
+
+from backend_trends import bucket_series
+
+app = typer.Typer()
+
+INR_PER_USD = 83
+
+
+def generate(purchases: int, days: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    seconds = rng.integers(0, days * 86400, purchases)
+    stamps = np.datetime64(end.replace(tzinfo=None), "s") - seconds.astype("timedelta64[s]")
+    prices = rng.uniform(5, 500, purchases).round(2)
+    inr = rng.random(purchases) < 0.3
+    return stamps, np.where(inr, prices * INR_PER_USD, prices), inr, end.date()
+
+
+def legacy_weekly(docs, now):
+    """
+    The weekly trend loop as it was, over purchase documents.
+    """
+    revenue_by_period = {}
+    for p in docs:
+        p_date = datetime.fromisoformat(p["purchase_date"].replace("Z", "+00:00"))
+        week_num = p_date.isocalendar()[1]
+        key = f"{p_date.year}-W{week_num:02d}"
+        if key not in revenue_by_period:
+            revenue_by_period[key] = {"label": f"Week {week_num}", "amount": 0}
+        amount = p.get("price_paid", 0)
+        if p.get("currency") == "INR":
+            amount = amount / 83
+        revenue_by_period[key]["amount"] += amount
+
+    trend_data = [
+        {"period": revenue_by_period[key]["label"], "revenue": round(revenue_by_period[key]["amount"], 2)}
+        for key in sorted(revenue_by_period)
+    ]
+    all_weeks = []
+    for i in range(11, -1, -1):
+        week_num = (now - timedelta(weeks=i)).isocalendar()[1]
+        all_weeks.append({"period": f"Week {week_num}", "revenue": 0})
+    for item in trend_data:
+        for week in all_weeks:
+            if week["period"] == item["period"]:
+                week["revenue"] = item["revenue"]
+    return all_weeks
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+@app.command()
+def main(
+    purchases: int = typer.Option(1_000_000, help="Synthetic completed purchases."),
+    days: int = typer.Option(84, help="Days the purchases are spread over."),
+    granularity: str = typer.Option("week", help="day, week or month."),
+):
+    stamps, prices, inr, end = generate(purchases, days)
+    start = end - timedelta(days=days - 1)
+    day_array = stamps.astype("datetime64[D]")
+    values = {"revenue": np.where(inr, prices / INR_PER_USD, prices), "orders": np.ones(purchases, dtype=np.int64)}
+
+    typer.echo(f"{purchases} purchases over {days} days")
+    docs = [
+        {"purchase_date": f"{s}Z", "price_paid": float(p), "currency": "INR" if i else "USD"}
+        for s, p, i in zip(stamps.astype(str), prices, inr)
+    ]
+    _, legacy_ms = timed(legacy_weekly, docs, datetime.now(timezone.utc))
+    typer.echo(f"legacy loop (weekly):         {legacy_ms:10.1f} ms")
+
+    buckets, vector_ms = timed(bucket_series, day_array, values, start, end, granularity)
+    typer.echo(f"bucket_series ({granularity}):       {vector_ms:10.1f} ms  ({len(buckets)} buckets)")
+    typer.echo(f"speedup:                      {legacy_ms / vector_ms:10.1f}x")
+
+    # Daily rollup rows, as the endpoint reads them
+    rollup_days, index = np.unique(day_array, return_inverse=True)
+    rollup_values = {name: np.bincount(index, weights=column, minlength=len(rollup_days)) for name, column in values.items()}
+    _, rollup_ms = timed(bucket_series, rollup_days, rollup_values, start, end, granularity)
+    typer.echo(f"bucket_series on {len(rollup_days)} rollup rows: {rollup_ms:7.1f} ms")
+
+
+if __name__ == "__main__":
+    app()
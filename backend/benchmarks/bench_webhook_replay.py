@@ -0,0 +1,104 @@
+"""
+Webhook replay throughput: stores `events` payment.succeeded events, each
+paying for one pending purchase, and replays them all.
+
+Seeds a throwaway database (BENCH_DB_NAME, default "replay_bench") on the
+MONGO_URL from backend/.env.
+
+    cd backend && python -m benchmarks.bench_webhook_replay --events 100000 --concurrency 8
+"""
+import asyncio
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Point the shared database module at the benchmark database before it loads
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "replay_bench")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import typer
+
+from database import db
+from backend_indexes import apply_indexes
+from backend_webhook_replay import replay_webhook_events, stored_event_query, stored_events
+import server  # noqa: F401  (loads every module's index declarations)
+
+app = typer.Typer()
+
+
+async def seed(events: int, listings: int, buyers: int):
+    for name in ("listings", "purchases", "webhook_events", "email_outbox", "seller_stats", "checkout_sessions"):
+        await db[name].drop()
+    await apply_indexes()
+
+    now = datetime.now(timezone.utc)
+    listing_docs = [{
+        "id": str(uuid.uuid4()), "title": f"Listing {i}", "price_usd": 10 + i % 90,
+        "seller_email": f"seller{i % 50}@bench.test", "status": "active",
+    } for i in range(listings)]
+    await db.listings.insert_many(listing_docs)
+
+    rng = random.Random(42)
+    chunk = 10000
+    for start in range(0, events, chunk):
+        purchases, stored = [], []
+        for i in range(start, min(events, start + chunk)):
+            listing = rng.choice(listing_docs)
+            buyer = f"buyer{i % buyers}@bench.test"
+            checkout_id = f"chk_{i}"
+            purchases.append({
+                "id": str(uuid.uuid4()), "listing_id": listing["id"], "buyer_email": buyer,
+                "seller_email": listing["seller_email"], "status": "pending",
+                "purchase_date": now - timedelta(seconds=i),
+            })
+            stored.append({
+                "_id": f"evt_{i}", "type": "payment.succeeded", "status": "failed", "attempts": 8,
+                "received_at": now - timedelta(seconds=events - i), "next_attempt_at": now,
+                "payload": {"type": "payment.succeeded", "data": {
+                    "id": checkout_id,
+                    "customer": {"email": buyer, "name": f"Buyer {i}"},
+                    "metadata": {"listing_ids": listing["id"]},
+                }},
+            })
+        await db.purchases.insert_many(purchases, ordered=False)
+        await db.webhook_events.insert_many(stored, ordered=False)
+
+
+@app.command()
+def main(
+    events: int = typer.Option(100000, help="Stored events to replay."),
+    listings: int = typer.Option(1000, help="Listings the events pay for."),
+    buyers: int = typer.Option(20000, help="Distinct buyers."),
+    concurrency: int = typer.Option(8, help="Batches applied at once."),
+    batch_size: int = typer.Option(500, help="Events per batch."),
+    notify: bool = typer.Option(False, help="Queue emails as well."),
+    keep: bool = typer.Option(False, help="Keep the seeded database afterwards."),
+):
+    async def run():
+        await seed(events, listings, buyers)
+        query = stored_event_query(["failed"], "payment.succeeded")
+        dry = await replay_webhook_events(
+            stored_events(query, batch_size), concurrency=concurrency, dry_run=True, notify=notify
+        )
+        stats = await replay_webhook_events(
+            stored_events(query, batch_size), concurrency=concurrency, notify=notify,
+            on_progress=lambda s: typer.echo(f"  {s['applied']} applied, {s['events_per_second']} events/s"),
+        )
+        remaining = await db.purchases.count_documents({"status": "pending"})
+        if not keep:
+            await db.client.drop_database(db.name)
+        return dry, stats, remaining
+
+    dry, stats, remaining = asyncio.run(run())
+    typer.echo(f"dry run: {dry['read']} events in {dry['elapsed_seconds']}s ({dry['events_per_second']} events/s)")
+    typer.echo(
+        f"replay:  {stats['applied']} events, {stats['purchases_completed']} purchases in "
+        f"{stats['elapsed_seconds']}s ({stats['events_per_second']} events/s), {stats['failed']} failed"
+    )
+    typer.echo(f"purchases still pending: {remaining}")
+
+
+if __name__ == "__main__":
+    app()
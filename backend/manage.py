@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+import typer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import backend_migrations
+import backend_rollups
+import backend_seller_stats
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+app = typer.Typer(help="Avocado Marketplace maintenance commands.")
+
+
+@app.command("backfill-seller-ids")
+def backfill_seller_ids(batch_size: int = typer.Option(500, help="Seller emails resolved per query.")):
+    """
+    Write seller_id into legacy listings that only have seller_email.
+    """
+    updated = asyncio.run(backend_migrations.backfill_seller_ids(batch_size))
+    typer.echo(f"Backfilled seller_id on {updated} listings")
+
+
+@app.command("migrate-dates")
+def migrate_dates(batch_size: int = typer.Option(1000, help="Documents per bulk write.")):
+    """
+    Convert ISO-string timestamps to native BSON dates.
+    """
+    converted = asyncio.run(backend_migrations.migrate_datetimes(batch_size))
+    for key, count in converted.items():
+        typer.echo(f"{key}: {count}")
+
+
+@app.command("rebuild-seller-stats")
+def rebuild_seller_stats():
+    """
+    Recompute every seller_stats document from purchases, reviews and listings.
+    """
+    count = asyncio.run(backend_seller_stats.rebuild_seller_stats())
+    typer.echo(f"Rebuilt stats for {count} sellers")
+
+
+@app.command("rebuild-rollups")
+def rebuild_rollups():
+    """
+    Recompute the daily revenue rollups and active user sketches from purchases and listings.
+    Refuses to run while ISO-string timestamps remain (they would be left out of the
+    rollups); run migrate-dates first.
+    """
+    try:
+        counts = asyncio.run(backend_rollups.rebuild_daily_rollups())
+    except ValueError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"Rebuilt {counts['rollups']} daily rollups and {counts['sketches']} active user sketches")
+
+
+@app.command("indexes")
+def indexes(check: bool = typer.Option(False, "--check", help="Explain hot queries and fail on any COLLSCAN.")):
+    """
+    Apply every registered index, optionally verifying hot query plans.
+    """
+    import server  # noqa: F401  (importing the app loads every module's index declarations)
+    import backend_indexes
+
+    async def run():
+        created = await backend_indexes.apply_indexes()
+        typer.echo(f"Ensured {len(created)} indexes")
+        if not check:
+            return []
+        return await backend_indexes.check_hot_queries()
+
+    results = asyncio.run(run())
+    failed = [r for r in results if r["collscan"]]
+    for r in results:
+        status = "COLLSCAN" if r["collscan"] else "ok"
+        typer.echo(f"{status:9} {r['collection']:18} {r['name']}: {' <- '.join(r['stages'])}")
+    if failed:
+        typer.echo(f"{len(failed)} hot queries scan a whole collection", err=True)
+        raise typer.Exit(code=1)
+
+
+@app.command("replay-webhooks")
+def replay_webhooks(
+    dump: Optional[str] = typer.Option(
+        None, help="JSON or NDJSON file of stored events ({_id, type, payload}); default is db.webhook_events."
+    ),
+    status: Optional[List[str]] = typer.Option(
+        None, help="Only events with this status (repeatable); default processed, failed and imported."
+    ),
+    event_type: Optional[str] = typer.Option(None, "--type", help="Only stored events of this type."),
+    since: Optional[datetime] = typer.Option(None, help="Only stored events received at or after this time."),
+    until: Optional[datetime] = typer.Option(None, help="Only stored events received before this time."),
+    concurrency: int = typer.Option(4, min=1, help="Batches applied at once."),
+    rate: Optional[float] = typer.Option(None, help="Maximum events per second."),
+    batch_size: int = typer.Option(500, min=1, help="Events per batch."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Read and match everything, write nothing."),
+    notify: bool = typer.Option(False, "--notify", help="Queue order and sale emails again."),
+):
+    """
+    Re-apply payment webhook events through the webhook consumer's handlers.
+    """
+    import backend_webhook_replay
+
+    if dump:
+        batches = backend_webhook_replay.dump_events(dump, batch_size)
+    else:
+        query = backend_webhook_replay.stored_event_query(status, event_type, since, until)
+        batches = backend_webhook_replay.stored_events(query, batch_size)
+
+    def report(stats):
+        typer.echo(
+            f"read {stats['read']}  applied {stats['applied']}  skipped {stats['skipped']}  "
+            f"failed {stats['failed']}  {stats['events_per_second']} events/s"
+        )
+
+    stats = asyncio.run(backend_webhook_replay.replay_webhook_events(
+        batches, statuses=status, imported=bool(dump), concurrency=concurrency, rate=rate, dry_run=dry_run, notify=notify, on_progress=report,
+    ))
+    report(stats)
+    prefix = "Would complete" if dry_run else "Completed"
+    typer.echo(f"{prefix} {stats['purchases_completed']} purchases in {stats['elapsed_seconds']}s")
+    for error in stats["errors"]:
+        typer.echo(error, err=True)
+    if stats["failed"]:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
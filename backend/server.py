@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends, Request, Response
 from pydantic import BaseModel
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.cors import CORSMiddleware
@@ -9,7 +9,7 @@ load_dotenv()
 
 import logging
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 import uuid
 
 # Import shared database
@@ -18,14 +18,32 @@ from database import db, client
 # Import models
 from backend_models_user import User
 from backend_models_order_review import (
-    Listing, ListingCreate, ProjectRequest, ProjectRequestCreate, 
-    Proposal, ProposalCreate, CategoryEnum, StatusEnum
+    Listing, ListingCreate, ListingPage, ProjectRequest, ProjectRequestCreate, 
+    ProjectRequestPage, Proposal, ProposalCreate, CategoryEnum, StatusEnum
 )
+from backend_pagination import paginate, encode_cursor, decode_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from backend_search import listing_search_index
+from backend_facets import listing_facet_index
+from backend_suggest import listing_suggest_index
+from backend_cache import listing_cache, browse_cache
+from backend_view_buffer import listing_view_buffer
+from backend_visitors import listing_visitors, visitor_key, MAX_RANGE
+from backend_trending import listing_trending_index, rebuild_trending_index
+from backend_payments import payment_gateway
+from backend_outbox import email_outbox_worker
+from backend_webhook_events import webhook_event_consumer
+from backend_etag import bump_versions, conditional_response
+from backend_codecs import parse_datetime
+from backend_indexes import register_index, register_hot_query, apply_indexes
+from backend_profiles import build_user_profile
+from backend_listing_events import browse_key, listing_created, listing_saved, rebuild_listing_indexes
+from backend_rollups import daily_active_users
+from backend_loaders import DocumentLoader, attach_seller_ids, get_users_by_email
 
 # Import routers
 from backend_auth_routes import router as auth_router
 from backend_orders_reviews import router as orders_reviews_router
-from backend_auth_service import get_current_user
+from backend_auth_service import get_current_user, get_current_admin
 from fastapi import Depends
 
 from fastapi.staticfiles import StaticFiles
@@ -52,6 +70,7 @@ app.add_middleware(
     allow_origins=origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 from backend_newsletter import router as newsletter_router
@@ -77,90 +96,214 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# --- Indexes for the queries below ---
+
+register_index("listings", [("id", 1)], unique=True)
+register_index("listings", [("status", 1), ("is_featured", -1), ("created_at", -1), ("id", -1)])
+register_index("listings", [("seller_email", 1), ("created_at", -1), ("id", -1)])
+register_index("listings", [("seller_email", 1), ("status", 1)])
+register_index("project_requests", [("id", 1)], unique=True)
+register_index("project_requests", [("status", 1), ("created_at", -1), ("id", -1)])
+register_index("proposals", [("id", 1)], unique=True)
+register_index("proposals", [("project_id", 1), ("submitted_at", -1)])
+register_index("users", [("email", 1)], unique=True)
+register_index("users", [("id", 1)], unique=True)
+
+register_hot_query("browse listings", "listings", {"status": "active"},
+                   [("is_featured", -1), ("created_at", -1), ("id", -1)])
+register_hot_query("listing detail", "listings", {"id": "sample"})
+register_hot_query("seller listings", "listings", {"seller_email": "seller@example.com"},
+                   [("created_at", -1), ("id", -1)])
+register_hot_query("active projects", "project_requests", {"status": "active"},
+                   [("created_at", -1), ("id", -1)])
+register_hot_query("project proposals", "proposals", {"project_id": "sample"}, [("submitted_at", -1)])
+register_hot_query("user by email", "users", {"email": "user@example.com"})
+register_hot_query("user by id", "users", {"id": "sample"})
+
 # --- Remaining Endpoints (Listings, Projects, Seed) ---
 
 @api_router.get("/")
 async def root():
     return {"message": "Avocado Marketplace API"}
 
-@api_router.get("/listings", response_model=List[Listing])
-async def get_listings(category: Optional[str] = None, search: Optional[str] = None):
-    query = {"status": StatusEnum.ACTIVE}
-    if category:
-        query["category"] = category
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
-    
-    listings = await db.listings.find(query, {"_id": 0}).sort([("is_featured", -1), ("created_at", -1)]).to_list(1000)
+def decode_offset_cursor(cursor: Optional[str]) -> int:
+    offset = decode_cursor(cursor).get("offset", 0) if cursor else 0
+    if not isinstance(offset, int) or offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+async def load_ranked_listings(ids: List[str]) -> List[dict]:
+    docs = await db.listings.find(
+        {"status": StatusEnum.ACTIVE, "id": {"$in": ids}}, {"_id": 0}
+    ).to_list(len(ids))
+    by_id = {doc["id"]: doc for doc in docs}
+    return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+
+async def search_listings(search: str, filters: dict, limit: int, cursor: Optional[str]):
+    """
+    Rank active listings with the in-process BM25 index and load one page.
+    Search cursors carry the offset into the ranking.
+    """
+    offset = decode_offset_cursor(cursor)
+    
+    where = None
+    if filters:
+        allowed = listing_facet_index.ids(listing_facet_index.match(filters))
+        where = allowed.__contains__
+    
+    hits = listing_search_index.search(search, limit + 1, offset, where)
+    ids = [doc_id for doc_id, _ in hits[:limit]]
+    next_cursor = encode_cursor({"offset": offset + limit}) if len(hits) > limit else None
+    return await load_ranked_listings(ids), next_cursor
+
+async def trending_listings(filters: dict, limit: int, cursor: Optional[str]):
+    """
+    Page through the precomputed trending ranking. Like search, the cursor
+    carries the offset; listings without recent activity are not ranked.
+    """
+    offset = decode_offset_cursor(cursor)
+    
+    ranking = listing_trending_index.ranking()
+    if filters:
+        allowed = listing_facet_index.ids(listing_facet_index.match(filters))
+        ranking = [doc_id for doc_id in ranking if doc_id in allowed]
+    
+    ids = ranking[offset:offset + limit]
+    next_cursor = encode_cursor({"offset": offset + limit}) if len(ranking) > offset + limit else None
+    return await load_ranked_listings(ids), next_cursor
+
+@api_router.get("/listings", response_model=ListingPage)
+async def get_listings(
+    request: Request,
+    response: Response,
+    category: Optional[List[str]] = Query(None),
+    search: Optional[str] = None,
+    platform_tags: Optional[List[str]] = Query(None),
+    tech_stack_tags: Optional[List[str]] = Query(None),
+    use_case_tags: Optional[List[str]] = Query(None),
+    difficulty: Optional[List[str]] = Query(None),
+    license_type: Optional[List[str]] = Query(None),
+    facets: bool = False,
+    sort: Optional[str] = Query(None, pattern="^trending$"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    users: DocumentLoader = Depends(get_users_by_email)
+):
+    # Multi-select filters: OR within a facet, AND across facets
+    filters = {
+        "category": category,
+        "platform_tags": platform_tags,
+        "tech_stack_tags": tech_stack_tags,
+        "use_case_tags": use_case_tags,
+        "difficulty": difficulty,
+        "license_type": license_type,
+    }
+    filters = {field: values for field, values in filters.items() if values}
+    
+    # Trending pages follow this worker's in-memory ranking, so they differ
+    # between workers and get no ETag; the worker-local browse cache keys
+    # them by ranking snapshot instead
+    trending = sort == "trending" and not search
+    ranking_version = None
+    if trending:
+        listing_trending_index.ranking()
+        ranking_version = listing_trending_index.version
+    else:
+        not_modified = await conditional_response(request, response, ["listings"])
+        if not_modified:
+            return not_modified
+    
+    # Browse pages (no free-text search) are served from the read-through
+    # cache, only while cached under the ETag just computed
+    etag = response.headers.get("etag")
+    cache_key = None
+    if not search:
+        cache_key = browse_key(filters, facets, limit, cursor, ranking_version)
+        cached = browse_cache.get(cache_key, etag)
+        if cached is not None:
+            return cached
     
-    # Enrich with seller_id
-    for listing in listings:
-        if isinstance(listing.get('created_at'), str):
-            listing['created_at'] = datetime.fromisoformat(listing['created_at'])
-        
-        # Fetch seller_id if missing
-        if not listing.get('seller_id') and listing.get('seller_email'):
-            seller = await db.users.find_one({"email": listing['seller_email']}, {"id": 1})
-            if seller:
-                listing['seller_id'] = seller['id']
+    query = {"status": StatusEnum.ACTIVE}
+    for field, values in filters.items():
+        query[field] = {"$in": values}
     
-    return listings
-
-@api_router.get("/seller/listings", response_model=List[Listing])
-async def get_seller_listings(current_user: User = Depends(get_current_user)):
-    listings = await db.listings.find({"seller_email": current_user.email}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    if search:
+        listings, next_cursor = await search_listings(search, filters, limit, cursor)
+    elif trending:
+        listings, next_cursor = await trending_listings(filters, limit, cursor)
+    else:
+        listings, next_cursor = await paginate(
+            db.listings, query, [("is_featured", -1), ("created_at", -1)], limit, cursor
+        )
+    
+    # Enrich with seller_id (one batched lookup for legacy listings)
+    await attach_seller_ids(listings, users)
+    
+    # Sidebar counts for the whole result set, not just this page
+    facet_counts = None
+    if facets:
+        base = listing_facet_index.mask_of(listing_search_index.matching(search)) if search else None
+        facet_counts = listing_facet_index.counts(filters, base)
+    
+    page = {"items": listings, "next_cursor": next_cursor, "facets": facet_counts}
+    if cache_key is not None:
+        browse_cache.set(cache_key, page, etag)
+    return page
+
+@api_router.get("/listings/suggest")
+async def suggest_listings(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20)
+):
+    # Served entirely from the in-process prefix index; no database access
+    return {"query": q, "suggestions": listing_suggest_index.suggest(q, limit)}
+
+@api_router.get("/seller/listings", response_model=ListingPage)
+async def get_seller_listings(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    listings, next_cursor = await paginate(
+        db.listings, {"seller_email": current_user.email}, [("created_at", -1)], limit, cursor
+    )
     
     for listing in listings:
-        if isinstance(listing.get('created_at'), str):
-            listing['created_at'] = datetime.fromisoformat(listing['created_at'])
         listing['seller_id'] = current_user.id
             
-    return listings
+    return {"items": listings, "next_cursor": next_cursor}
 
 @api_router.get("/listings/{listing_id}", response_model=Listing)
-async def get_listing(listing_id: str):
+async def get_listing(
+    listing_id: str,
+    request: Request,
+    response: Response,
+    users: DocumentLoader = Depends(get_users_by_email)
+):
+    not_modified = await conditional_response(request, response, [f"listing:{listing_id}"])
+    if not_modified:
+        return not_modified
+    
+    # Cached copies are only served under the ETag they were cached with
+    etag = response.headers.get("etag")
+    cached = listing_cache.get(listing_id, etag)
+    if cached is not None:
+        return cached
+    
     listing = await db.listings.find_one({"id": listing_id}, {"_id": 0})
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
     
-    if isinstance(listing.get('created_at'), str):
-        listing['created_at'] = datetime.fromisoformat(listing['created_at'])
-    
     # Fetch seller_id
-    if not listing.get('seller_id') and listing.get('seller_email'):
-        seller = await db.users.find_one({"email": listing['seller_email']}, {"id": 1})
-        if seller:
-            listing['seller_id'] = seller['id']
+    await attach_seller_ids([listing], users)
     
     # If it's a bundle, we might want to fetch details of items in it.
     # For now, we trust the frontend to fetch them if needed or we could enrich here.
     # Let's keep it simple for MVP and just return the IDs in 'bundle_items'.
     
+    listing_cache.set(listing_id, listing, etag)
     return listing
 
-# Gamification / Rank Logic
-def calculate_seller_rank(total_sales: int, avg_rating: float) -> dict:
-    # Ranks:
-    # 1. Hello World (Start)
-    # 2. Junior Dev (1 Sale)
-    # 3. Senior Dev (10 Sales, 4.0+ Rating)
-    # 4. Tech Lead (50 Sales, 4.5+ Rating)
-    # 5. 10x Engineer (100 Sales, 4.8+ Rating)
-    
-    if total_sales >= 100 and avg_rating >= 4.8:
-        return {"rank": "10x Engineer", "badge": "🚀", "next_rank": None, "progress": 100}
-    elif total_sales >= 50 and avg_rating >= 4.5:
-        return {"rank": "Tech Lead", "badge": "🌐", "next_rank": "10x Engineer", "progress": int((total_sales / 100) * 100)}
-    elif total_sales >= 10 and avg_rating >= 4.0:
-        return {"rank": "Senior Dev", "badge": "💻", "next_rank": "Tech Lead", "progress": int((total_sales / 50) * 100)}
-    elif total_sales >= 1:
-        return {"rank": "Junior Dev", "badge": "🐛", "next_rank": "Senior Dev", "progress": int((total_sales / 10) * 100)}
-    else:
-        return {"rank": "Hello World", "badge": "🖥️", "next_rank": "Junior Dev", "progress": int((total_sales / 1) * 100)} # 0/1
-
 class ProfileUpdate(BaseModel):
     name: Optional[str] = None
     bio: Optional[str] = None
@@ -173,87 +316,18 @@ class ProfileUpdate(BaseModel):
     pincode: Optional[str] = None
 
 @api_router.get("/users/{user_id}/profile")
-async def get_user_profile(user_id: str):
-    # 1. Fetch User
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "email": 0, "role": 0})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    user_internal = await db.users.find_one({"id": user_id})
-    user_email = user_internal["email"]
-
-    # 2. Fetch Active Listings
-    listings = await db.listings.find(
-        {"seller_email": user_email, "status": StatusEnum.ACTIVE}, 
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    
-    # 3. Calculate Stats
-    all_seller_listings = await db.listings.find(
-        {"seller_email": user_email},
-        {"id": 1}
-    ).to_list(None)
-    all_listing_ids = [l["id"] for l in all_seller_listings]
-    
-    total_sales = 0
-    if all_listing_ids:
-        total_sales = await db.purchases.count_documents({"listing_id": {"$in": all_listing_ids}})
-
-    # 4. Fetch Reviews & Rating
-    reviews = []
-    average_rating = 0.0
-    if all_listing_ids:
-        raw_reviews = await db.reviews.find(
-            {"listing_id": {"$in": all_listing_ids}},
-            {"_id": 0}
-        ).sort("created_at", -1).to_list(20)
-        
-        # Enrich reviews with Reviewer and Listing metadata
-        for r in raw_reviews:
-            reviewer = await db.users.find_one({"id": r["reviewer_id"]}, {"name": 1, "picture": 1, "created_at": 1, "_id": 0})
-            listing = await db.listings.find_one({"id": r["listing_id"]}, {"title": 1, "price": 1, "images": 1, "_id": 0})
-            
-            r["reviewer"] = reviewer
-            r["listing"] = listing
-            # Mock data for "Duration" or "Country" if not in DB yet
-            r["duration"] = "3 days" # Placeholder
-            
-            if isinstance(r.get('created_at'), str) == False and r.get('created_at'):
-                r['created_at'] = r['created_at'].isoformat()
-            
-        reviews = raw_reviews
-
-        pipeline = [
-            {"$match": {"listing_id": {"$in": all_listing_ids}}},
-            {"$group": {"_id": None, "avg_rating": {"$avg": "$rating"}}}
-        ]
-        rating_result = await db.reviews.aggregate(pipeline).to_list(1)
-        if rating_result:
-            average_rating = round(rating_result[0]["avg_rating"], 1)
-
-    # 5. Calculate Rank
-    gamification = calculate_seller_rank(total_sales, average_rating)
-
-    # Format dates and return
-    if isinstance(user.get('created_at'), str) == False and user.get('created_at'):
-        user['created_at'] = user['created_at'].isoformat()
-        
-    for l in listings:
-        if isinstance(l.get('created_at'), str) == False and l.get('created_at'):
-            l['created_at'] = l['created_at'].isoformat()
+async def get_user_profile(user_id: str, request: Request, response: Response):
+    # Profiles aggregate the user, their listings, sales and reviews
+    not_modified = await conditional_response(
+        request, response, [f"user:{user_id}", "listings", "purchases", "reviews"]
+    )
+    if not_modified:
+        return not_modified
 
-    return {
-        "user": user,
-        "listings": listings,
-        "stats": {
-            "total_sales": total_sales,
-            "average_rating": average_rating,
-            "total_reviews": len(reviews),
-            "member_since": user.get('created_at')
-        },
-        "gamification": gamification,
-        "recent_reviews": reviews
-    }
+    profile = await build_user_profile(user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
+    return profile
 
 @api_router.put("/users/profile")
 async def update_profile(profile_data: ProfileUpdate, current_user: User = Depends(get_current_user)):
@@ -275,10 +349,10 @@ async def update_profile(profile_data: ProfileUpdate, current_user: User = Depen
         {"email": current_user.email},
         {"$set": update_data}
     )
+    await bump_versions(f"user:{current_user.id}")
     
     updated_user = await db.users.find_one({"email": current_user.email}, {"_id": 0})
-    if isinstance(updated_user.get('created_at'), str) == False and updated_user.get('created_at'):
-        updated_user['created_at'] = updated_user['created_at'].isoformat()
+    updated_user['created_at'] = parse_datetime(updated_user.get('created_at'))
 
     return updated_user
 
@@ -320,16 +394,15 @@ async def create_listing(listing_data: ListingCreate, current_user: User = Depen
     listing = Listing(
         **listing_data.model_dump(),
         seller_email=current_user.email,
+        seller_id=current_user.id,
         seller_name=current_user.name,
         status=initial_status
     )
     
     doc = listing.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    if doc.get('featured_until'):
-        doc['featured_until'] = doc['featured_until'].isoformat()
     
     await db.listings.insert_one(doc)
+    await listing_created(doc)
     return listing
 
 @api_router.put("/admin/listings/{listing_id}/feature")
@@ -343,6 +416,7 @@ async def toggle_featured(listing_id: str):
         {"id": listing_id},
         {"$set": {"is_featured": new_featured_status}}
     )
+    await listing_saved(listing_id)
     
     return {"message": "Featured status updated", "is_featured": new_featured_status}
 
@@ -353,51 +427,115 @@ async def promote_listing(listing_id: str):
         raise HTTPException(status_code=404, detail="Listing not found")
     
     # In a real app, verify payment here
-    featured_until = datetime.now(timezone.utc).isoformat() # Logic to add 7 days would go here
+    featured_until = datetime.now(timezone.utc) # Logic to add 7 days would go here
     
     await db.listings.update_one(
         {"id": listing_id},
         {"$set": {"is_featured": True, "featured_until": featured_until}}
     )
+    await listing_saved(listing_id)
     
     return {"message": "Listing promoted successfully", "is_featured": True}
 
+@api_router.get("/admin/metrics")
+async def get_admin_metrics(current_user: User = Depends(get_current_admin)):
+    return {
+        "listing_cache": listing_cache.stats(),
+        "browse_cache": browse_cache.stats(),
+        "view_buffer": listing_view_buffer.stats(),
+        "visitor_sketches": listing_visitors.stats(),
+        "trending": listing_trending_index.stats(),
+        "payments": payment_gateway.stats(),
+        "email_outbox": email_outbox_worker.stats(),
+        "webhook_events": webhook_event_consumer.stats(),
+        "active_user_sketches": daily_active_users.stats()
+    }
+
+async def get_optional_user(request: Request) -> Optional[User]:
+    # Views are public; a signed-in viewer is counted by user id
+    try:
+        return await get_current_user(request)
+    except HTTPException:
+        return None
+
 @api_router.post("/listings/{listing_id}/view")
-async def increment_listing_view(listing_id: str):
-    result = await db.listings.update_one(
-        {"id": listing_id},
-        {"$inc": {"views": 1}}
-    )
-    if result.matched_count == 0:
+async def increment_listing_view(
+    listing_id: str,
+    request: Request,
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    # Buffered; written by the periodic flush
+    if not await listing_view_buffer.exists(listing_id):
         raise HTTPException(status_code=404, detail="Listing not found")
+    listing_view_buffer.record(listing_id)
+    listing_trending_index.record(listing_id, "view")
+    listing_visitors.record(listing_id, visitor_key(request, current_user.id if current_user else None))
     return {"message": "View incremented"}
 
+@api_router.get("/listings/{listing_id}/unique-views")
+async def get_listing_unique_views(
+    listing_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user)
+):
+    # 1. Only the seller and admins see visitor numbers
+    listing = await db.listings.find_one({"id": listing_id}, {"_id": 0, "seller_email": 1})
+    if not listing:
+        raise HTTPException(status_code=404, detail="Listing not found")
+    if listing.get("seller_email") != current_user.email and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view these stats")
+
+    # 2. Default to the last 30 days, inclusive
+    end_day = datetime.combine(end or datetime.now(timezone.utc).date(), datetime.min.time(), timezone.utc)
+    start_day = datetime.combine(start, datetime.min.time(), timezone.utc) if start else end_day - timedelta(days=29)
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if end_day - start_day > MAX_RANGE:
+        raise HTTPException(status_code=400, detail="Date range too long")
+
+    return {
+        "listing_id": listing_id,
+        "start": start_day.date(),
+        "end": end_day.date(),
+        "unique_views": await listing_visitors.unique_visitors(listing_id, start_day, end_day)
+    }
+
 # --- Projects & Proposals ---
 
 @api_router.post("/projects", response_model=ProjectRequest)
 async def create_project_request(project_data: ProjectRequestCreate):
     project = ProjectRequest(**project_data.model_dump())
     doc = project.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.project_requests.insert_one(doc)
+    await bump_versions("project_requests")
     return project
 
-@api_router.get("/projects", response_model=List[ProjectRequest])
-async def get_projects(budget: Optional[str] = None, website_type: Optional[str] = None):
+@api_router.get("/projects", response_model=ProjectRequestPage)
+async def get_projects(
+    request: Request,
+    response: Response,
+    budget: Optional[str] = None,
+    website_type: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    not_modified = await conditional_response(request, response, ["project_requests"])
+    if not_modified:
+        return not_modified
+    
     query = {"status": "active"}
     if budget:
         query["budget_range"] = budget
     if website_type:
         query["website_type"] = website_type
     
-    projects = await db.project_requests.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    
-    for project in projects:
-        if isinstance(project.get('created_at'), str):
-            project['created_at'] = datetime.fromisoformat(project['created_at'])
+    projects, next_cursor = await paginate(
+        db.project_requests, query, [("created_at", -1)], limit, cursor
+    )
     
-    return projects
+    return {"items": projects, "next_cursor": next_cursor}
 
 @api_router.get("/projects/{project_id}", response_model=ProjectRequest)
 async def get_project(project_id: str):
@@ -405,16 +543,12 @@ async def get_project(project_id: str):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    if isinstance(project.get('created_at'), str):
-        project['created_at'] = datetime.fromisoformat(project['created_at'])
-    
     return project
 
 @api_router.post("/proposals", response_model=Proposal)
 async def create_proposal(proposal_data: ProposalCreate):
     proposal = Proposal(**proposal_data.model_dump())
     doc = proposal.model_dump()
-    doc['submitted_at'] = doc['submitted_at'].isoformat()
     
     await db.proposals.insert_one(doc)
     return proposal
@@ -423,10 +557,6 @@ async def create_proposal(proposal_data: ProposalCreate):
 async def get_project_proposals(project_id: str):
     proposals = await db.proposals.find({"project_id": project_id}, {"_id": 0}).sort("submitted_at", -1).to_list(1000)
     
-    for proposal in proposals:
-        if isinstance(proposal.get('submitted_at'), str):
-            proposal['submitted_at'] = datetime.fromisoformat(proposal['submitted_at'])
-    
     return proposals
 
 @api_router.get("/seed")
@@ -445,6 +575,8 @@ async def seed_data():
             sample_listings = json.load(f)
         
         await db.listings.insert_many(sample_listings)
+        await rebuild_listing_indexes()
+        await rebuild_trending_index()
         return {"message": f"Seeded {len(sample_listings)} AI tools successfully"}
     except FileNotFoundError:
         raise HTTPException(status_code=500, detail="Seed data file not found. Run generate_ai_tools_seed.py first.")
@@ -453,8 +585,25 @@ async def seed_data():
 
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def warm_listing_indexes():
+    await apply_indexes()
+    await rebuild_listing_indexes()
+    await rebuild_trending_index()
+    listing_view_buffer.start()
+    listing_visitors.start()
+    email_outbox_worker.start()
+    webhook_event_consumer.start()
+    daily_active_users.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await listing_view_buffer.stop()
+    await listing_visitors.stop()
+    await email_outbox_worker.stop()
+    await webhook_event_consumer.stop()
+    await daily_active_users.stop()
+    payment_gateway.close()
     client.close()
 
 
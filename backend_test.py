@@ -68,7 +68,7 @@ class AvocadoAPITester:
             details = f"Status: {response.status_code}"
             
             if success:
-                data = response.json()
+                data = response.json()["items"]
                 listings_count = len(data)
                 details += f", Found {listings_count} listings"
                 
@@ -117,7 +117,7 @@ class AvocadoAPITester:
             details = f"Search Status: {response.status_code}"
             
             if success:
-                data = response.json()
+                data = response.json()["items"]
                 details += f", Found {len(data)} results for 'AI'"
                 
             self.log_test("Search Listings", success, details)
@@ -135,7 +135,7 @@ class AvocadoAPITester:
             details = f"Filter Status: {response.status_code}"
             
             if success:
-                data = response.json()
+                data = response.json()["items"]
                 details += f", Found {len(data)} Marketing listings"
                 
             self.log_test("Filter by Category", success, details)
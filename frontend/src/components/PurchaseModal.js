@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useMemo, useState } from 'react';
 import { X, Mail, Check } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -16,6 +16,8 @@ export const PurchaseModal = ({ listing, isOpen, onClose }) => {
   const [loading, setLoading] = useState(false);
   const [success, setSuccess] = useState(false);
   const { currency, formatPrice } = useCurrency();
+  // Retries of the same purchase reuse the key so it is recorded once
+  const idempotencyKey = useMemo(() => crypto.randomUUID(), [email, listing?.id, currency]);
 
   const handlePurchase = async (e) => {
     e.preventDefault();
@@ -26,7 +28,7 @@ export const PurchaseModal = ({ listing, isOpen, onClose }) => {
         buyer_email: email,
         listing_id: listing.id,
         currency: currency
-      });
+      }, { headers: { 'Idempotency-Key': idempotencyKey } });
 
       setSuccess(true);
       toast.success('Purchase confirmed!');
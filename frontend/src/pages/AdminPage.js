@@ -20,6 +20,8 @@ const API = `${BACKEND_URL}/api`;
 export const AdminPage = () => {
   const [submissions, setSubmissions] = useState([]);
   const [purchases, setPurchases] = useState([]);
+  const [purchasesCursor, setPurchasesCursor] = useState(null);
+  const [loadingMorePurchases, setLoadingMorePurchases] = useState(false);
   const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState('pending');
 
@@ -31,7 +33,8 @@ export const AdminPage = () => {
           axios.get(`${API}/admin/purchases`)
         ]);
         setSubmissions(submissionsRes.data);
-        setPurchases(purchasesRes.data);
+        setPurchases(purchasesRes.data.items);
+        setPurchasesCursor(purchasesRes.data.next_cursor);
       } catch (error) {
         console.error('Error fetching data:', error);
         toast.error('Failed to fetch data');
@@ -43,6 +46,20 @@ export const AdminPage = () => {
     fetchData();
   }, []);
 
+  const loadMorePurchases = async () => {
+    setLoadingMorePurchases(true);
+    try {
+      const response = await axios.get(`${API}/admin/purchases`, { params: { cursor: purchasesCursor } });
+      setPurchases((prev) => [...prev, ...response.data.items]);
+      setPurchasesCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching purchases:', error);
+      toast.error('Failed to fetch purchases');
+    } finally {
+      setLoadingMorePurchases(false);
+    }
+  };
+
   const updateSubmissionStatus = async (id, status) => {
     try {
       await axios.put(`${API}/admin/submissions/${id}`, { status });
@@ -322,6 +339,14 @@ export const AdminPage = () => {
                     ))}
                   </div>
                 )}
+
+                {!loading && purchasesCursor && (
+                  <div className="text-center mt-6">
+                    <Button variant="outline" onClick={loadMorePurchases} disabled={loadingMorePurchases} data-testid="load-more-purchases">
+                      {loadingMorePurchases ? 'Loading...' : 'Load More'}
+                    </Button>
+                  </div>
+                )}
               </CardContent>
             </Card>
           </TabsContent>
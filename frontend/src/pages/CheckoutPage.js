@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useMemo, useState } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
 import { ArrowLeft, CheckCircle, Star, ShieldCheck, Lock, Info, Globe, Server, Key, Paperclip, X } from 'lucide-react';
 import { Button } from '@/components/ui/button';
@@ -164,6 +164,8 @@ export const CheckoutPage = () => {
   const [currency, setCurrency] = useState('USD');
   const [loading, setLoading] = useState(true);
   const [selectedItem, setSelectedItem] = useState(null); // For modal
+  // Retries of the same order reuse the key so the server creates one session
+  const idempotencyKey = useMemo(() => crypto.randomUUID(), [items, currency]);
 
   const isSingleItem = !!params.id;
   const listingId = params.id;
@@ -245,7 +247,7 @@ export const CheckoutPage = () => {
         const response = await axios.post(orderUrl, {
           listing_id: items[0].id,
           currency: currency
-        });
+        }, { headers: { 'Idempotency-Key': idempotencyKey } });
         order = response.data;
       } else {
         // Cart Checkout Endpoint
@@ -253,7 +255,7 @@ export const CheckoutPage = () => {
         const response = await axios.post(orderUrl, {
           listing_ids: items.map(i => i.id),
           currency: currency
-        });
+        }, { headers: { 'Idempotency-Key': idempotencyKey } });
         order = response.data;
       }
 
@@ -32,14 +32,17 @@ export const MarketplacePage = () => {
   const [selectedCategory, setSelectedCategory] = useState('All');
   const [searchQuery, setSearchQuery] = useState('');
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { formatPrice } = useCurrency();
 
   useEffect(() => {
     const fetchListings = async () => {
       try {
         const response = await axios.get(`${API}/listings`);
-        setListings(response.data);
-        setFilteredListings(response.data);
+        setListings(response.data.items);
+        setFilteredListings(response.data.items);
+        setNextCursor(response.data.next_cursor);
       } catch (error) {
         console.error('Error fetching listings:', error);
       } finally {
@@ -50,6 +53,20 @@ export const MarketplacePage = () => {
     fetchListings();
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API}/listings`, { params: { cursor: nextCursor } });
+      setListings((prev) => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching more listings:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     const filterListings = () => {
       let filtered = listings;
@@ -176,6 +193,14 @@ export const MarketplacePage = () => {
             ))}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="text-center mt-8">
+            <Button variant="outline" onClick={loadMore} disabled={loadingMore} data-testid="load-more">
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </Button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -39,8 +39,8 @@ export const PremiumHomePage = () => {
   useEffect(() => {
     const fetchFeaturedListings = async () => {
       try {
-        const response = await axios.get(`${API}/listings`);
-        setFeaturedListings(response.data.slice(0, 3));
+        const response = await axios.get(`${API}/listings`, { params: { limit: 3 } });
+        setFeaturedListings(response.data.items);
       } catch (error) {
         console.error('Error fetching featured listings:', error);
       }
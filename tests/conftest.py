@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from backend_facets import FacetIndex
+from backend_search import SearchIndex
+
+
+@pytest.fixture
+def search_index():
+    """
+    An empty search index over titles (weight 3) and descriptions.
+    """
+    return SearchIndex(fields={"title": 3.0, "description": 1.0})
+
+
+@pytest.fixture
+def facet_index():
+    """
+    A category/platform facet index over four listings: two Design (a, b)
+    and two Coding (c, d), tagged web+ios, web, ios and nothing.
+    """
+    index = FacetIndex(fields=("category", "platform_tags"))
+    for doc in [
+        {"id": "a", "category": "Design", "platform_tags": ["web", "ios"]},
+        {"id": "b", "category": "Design", "platform_tags": ["web"]},
+        {"id": "c", "category": "Coding", "platform_tags": ["ios"]},
+        {"id": "d", "category": "Coding", "platform_tags": []},
+    ]:
+        index.add(doc)
+    return index
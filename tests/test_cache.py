@@ -0,0 +1,32 @@
+from backend_cache import LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_are_served_only_under_their_version():
+    cache = LRUCache(maxsize=10, ttl=30, clock=Clock())
+    cache.set("page", {"items": []}, '"v1"')
+    assert cache.get("page", '"v1"') == {"items": []}
+    # Another worker's write moved the version on
+    assert cache.get("page", '"v2"') is None
+    assert cache.get("page", '"v1"') is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_ttl_and_lru_eviction():
+    clock = Clock()
+    cache = LRUCache(maxsize=2, ttl=30, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    clock.now = 30
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,48 @@
+from enum import Enum
+
+from backend_facets import facet_values, filters_match
+
+
+class Category(str, Enum):
+    DESIGN = "Design"
+
+
+def test_counts_without_filters(facet_index):
+    assert facet_index.counts({}) == {
+        "category": {"Coding": 2, "Design": 2},
+        "platform_tags": {"ios": 2, "web": 2},
+    }
+
+
+def test_facet_counts_ignore_their_own_filter(facet_index):
+    counts = facet_index.counts({"category": ["Design"]})
+    # Other categories still show what selecting them would add
+    assert counts["category"] == {"Coding": 2, "Design": 2}
+    assert counts["platform_tags"] == {"web": 2, "ios": 1}
+
+
+def test_or_within_and_across_facets(facet_index):
+    assert facet_index.ids(facet_index.match({"platform_tags": ["web", "ios"]})) == {"a", "b", "c"}
+    assert facet_index.ids(facet_index.match({"category": ["Coding"], "platform_tags": ["web", "ios"]})) == {"c"}
+
+
+def test_counts_within_base_mask(facet_index):
+    counts = facet_index.counts({}, base=facet_index.mask_of(["a", "c", "missing"]))
+    assert counts["category"] == {"Coding": 1, "Design": 1}
+
+
+def test_removed_bits_are_reused_without_stale_postings(facet_index):
+    facet_index.remove("a")
+    facet_index.add({"id": "e", "category": "Audio", "platform_tags": ["mac"]})
+    assert len(facet_index) == 4
+    assert facet_index.counts({})["platform_tags"] == {"ios": 1, "mac": 1, "web": 1}
+    assert facet_index.ids(facet_index.match({"category": ["Audio"]})) == {"e"}
+
+
+def test_filters_match_allows_misses():
+    values = facet_values({"category": Category.DESIGN, "platform_tags": ["web"]}, ("category", "platform_tags"))
+    assert values == {"category": ["Design"], "platform_tags": ["web"]}
+    assert filters_match({}, values)
+    assert not filters_match({"category": ["Coding"]}, values)
+    assert filters_match({"category": ["Coding"]}, values, misses=1)
+    assert not filters_match({"category": ["Coding"], "platform_tags": ["ios"]}, values, misses=1)
@@ -0,0 +1,50 @@
+import pytest
+
+from backend_hll import HyperLogLog
+
+
+def sketch_of(values, precision=12):
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_empty_sketch_counts_zero():
+    assert HyperLogLog().count() == 0
+
+
+@pytest.mark.parametrize("n", [10, 1000, 50000])
+def test_count_within_error(n):
+    estimate = sketch_of(f"visitor-{i}" for i in range(n)).count()
+    # 1.6% standard error at precision 12; allow four of them
+    assert abs(estimate - n) <= max(1, 0.065 * n)
+
+
+def test_duplicates_do_not_change_count():
+    once = sketch_of(f"v{i}" for i in range(500))
+    twice = sketch_of([f"v{i}" for i in range(500)] * 2)
+    assert once == twice
+
+
+def test_merge_counts_the_union():
+    monday = sketch_of(f"v{i}" for i in range(0, 6000))
+    tuesday = sketch_of(f"v{i}" for i in range(4000, 10000))
+    union = sketch_of(f"v{i}" for i in range(10000))
+    merged = HyperLogLog().merge(monday).merge(tuesday)
+    assert merged == union
+    assert abs(merged.count() - 10000) <= 650
+
+
+def test_merge_rejects_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+
+def test_bytes_round_trip():
+    sketch = sketch_of(f"v{i}" for i in range(300))
+    data = sketch.to_bytes()
+    assert len(data) < sketch.size
+    assert HyperLogLog.from_bytes(data) == sketch
+    with pytest.raises(ValueError):
+        HyperLogLog(10, bytes(4096))
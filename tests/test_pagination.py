@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from backend_pagination import _with_tiebreaker, decode_cursor, encode_cursor, keyset_filter
+
+
+def test_cursor_round_trips_dates_and_ids():
+    values = {"created_at": datetime(2024, 5, 1, 12, 30), "id": "abc"}
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == values
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24", encode_cursor([1, 2])])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_tiebreaker_follows_last_direction():
+    assert _with_tiebreaker([("created_at", -1)]) == [("created_at", -1), ("id", -1)]
+    assert _with_tiebreaker([("price", 1)]) == [("price", 1), ("id", 1)]
+    assert _with_tiebreaker([("created_at", -1), ("id", -1)]) == [("created_at", -1), ("id", -1)]
+    assert _with_tiebreaker([]) == [("id", -1)]
+
+
+def test_keyset_filter_selects_rows_after_cursor():
+    sort = [("is_featured", -1), ("created_at", -1), ("id", 1)]
+    values = {"is_featured": True, "created_at": 5, "id": "m"}
+    assert keyset_filter(sort, values) == {"$or": [
+        {"is_featured": {"$lt": True}},
+        {"is_featured": True, "created_at": {"$lt": 5}},
+        {"is_featured": True, "created_at": 5, "id": {"$gt": "m"}},
+    ]}
+
+
+def test_keyset_filter_requires_every_sort_field():
+    with pytest.raises(HTTPException) as exc:
+        keyset_filter([("created_at", -1), ("id", -1)], {"created_at": 5})
+    assert exc.value.status_code == 400
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend_payments import CircuitBreaker, FakePaymentGateway
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def open_breaker(clock, threshold=3, reset_timeout=30):
+    breaker = CircuitBreaker(threshold, reset_timeout, clock=clock)
+    for _ in range(threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    clock = Clock()
+    breaker = CircuitBreaker(3, 30, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker = open_breaker(clock)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_trial_through():
+    clock = Clock()
+    breaker = open_breaker(clock)
+    clock.now = 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_trial_success_closes():
+    clock = Clock()
+    breaker = open_breaker(clock)
+    clock.now = 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_trial_failure_reopens():
+    clock = Clock()
+    breaker = open_breaker(clock)
+    clock.now = 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 59
+    assert not breaker.allow()
+    clock.now = 60
+    assert breaker.allow()
+
+
+def test_gateway_rejects_while_open():
+    gateway = FakePaymentGateway(1, timeout=1, breaker=open_breaker(Clock()), latency=0)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(gateway.verify_payment("pi_1"))
+    assert exc.value.status_code == 503
+    assert gateway.rejected == 1
+    gateway.close()
+
+
+def test_cancelled_trial_releases_the_circuit():
+    clock = Clock()
+    gateway = FakePaymentGateway(1, timeout=5, breaker=open_breaker(clock), latency=0.2)
+    clock.now = 30
+
+    async def cancel_trial():
+        trial = asyncio.create_task(gateway.verify_payment("pi_1"))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    asyncio.run(cancel_trial())
+    assert gateway.breaker.state == "half_open"
+    assert gateway.breaker.allow()
+    gateway.close()
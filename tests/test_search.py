@@ -0,0 +1,51 @@
+import math
+
+import pytest
+
+from backend_search import tokenize
+
+
+def test_tokenize_keeps_tech_names_and_drops_stopwords():
+    assert tokenize("The C++ and C# tools for Next.js.") == ["c++", "c#", "tools", "next.js"]
+
+
+def test_single_term_score_matches_bm25(search_index):
+    search_index.add({"id": "a", "title": "logo", "description": "generator"})
+    search_index.add({"id": "b", "title": "chat", "description": "bot"})
+    # a: tf 3 (title), length 4; avgdl 4; df 1 of 2 documents
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    expected = idf * 3 * (1.2 + 1) / (3 + 1.2)
+    [(doc_id, score)] = search_index.search("logo", limit=10)
+    assert doc_id == "a"
+    assert score == pytest.approx(expected)
+
+
+def test_title_hits_outrank_description_hits(search_index):
+    search_index.add({"id": "desc", "title": "assistant", "description": "writes code"})
+    search_index.add({"id": "title", "title": "code assistant", "description": "helps"})
+    assert [doc_id for doc_id, _ in search_index.search("code", limit=10)] == ["title", "desc"]
+
+
+def test_ties_break_on_id_and_pages_do_not_overlap(search_index):
+    for i in range(5):
+        search_index.add({"id": f"d{i}", "title": "same words"})
+    first = search_index.search("same", limit=2)
+    second = search_index.search("same", limit=2, offset=2)
+    assert [doc_id for doc_id, _ in first] == ["d0", "d1"]
+    assert [doc_id for doc_id, _ in second] == ["d2", "d3"]
+
+
+def test_where_restricts_candidates(search_index):
+    search_index.add({"id": "a", "title": "video editor"})
+    search_index.add({"id": "b", "title": "video player"})
+    assert [doc_id for doc_id, _ in search_index.search("video", limit=10, where=lambda d: d == "b")] == ["b"]
+
+
+def test_reindex_and_remove_update_postings(search_index):
+    search_index.add({"id": "a", "title": "old name"})
+    search_index.add({"id": "a", "title": "new name"})
+    assert search_index.matching("old") == set()
+    assert search_index.matching("new name") == {"a"}
+    search_index.remove("a")
+    assert len(search_index) == 0
+    assert search_index.search("name", limit=10) == []
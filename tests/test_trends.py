@@ -0,0 +1,68 @@
+from datetime import date
+
+import numpy as np
+
+from backend_trends import bucket_series, bucket_start
+
+
+def series(days, start, end, granularity, revenue=None):
+    day_array = np.array(days, dtype="datetime64[D]")
+    values = {
+        "revenue": np.array(revenue if revenue is not None else [1.0] * len(days)),
+        "orders": np.ones(len(days), dtype=np.int64),
+    }
+    return bucket_series(day_array, values, start, end, granularity)
+
+
+def test_bucket_start():
+    # 2024-05-15 is a Wednesday
+    assert bucket_start(date(2024, 5, 15), "day") == date(2024, 5, 15)
+    assert bucket_start(date(2024, 5, 15), "week") == date(2024, 5, 13)
+    assert bucket_start(date(2024, 5, 13), "week") == date(2024, 5, 13)
+    assert bucket_start(date(2024, 5, 15), "month") == date(2024, 5, 1)
+
+
+def test_weeks_start_on_monday_and_cover_partial_edges():
+    # Wednesday to the following Tuesday week: three Monday-based buckets
+    rows = series(
+        ["2024-05-14", "2024-05-15", "2024-05-19", "2024-05-20", "2024-05-28", "2024-06-04"],
+        date(2024, 5, 15), date(2024, 5, 28), "week",
+    )
+    assert [r["start"] for r in rows] == ["2024-05-13", "2024-05-20", "2024-05-27"]
+    # Days before `start` and after `end` are ignored even inside edge weeks
+    assert [r["orders"] for r in rows] == [2, 1, 1]
+    assert rows[0]["period"] == "Week 20"
+
+
+def test_weeks_across_year_end():
+    rows = series(["2024-12-30", "2025-01-05", "2025-01-06"], date(2024, 12, 28), date(2025, 1, 6), "week")
+    assert [(r["start"], r["period"], r["orders"]) for r in rows] == [
+        ("2024-12-23", "Week 52", 0),
+        ("2024-12-30", "Week 1", 2),
+        ("2025-01-06", "Week 2", 1),
+    ]
+
+
+def test_months_zero_fill_and_edges():
+    rows = series(
+        ["2024-01-31", "2024-02-01", "2024-02-29", "2024-04-10", "2024-04-11"],
+        date(2024, 1, 31), date(2024, 4, 10), "month", revenue=[1.5, 2.0, 3.0, 4.0, 100.0],
+    )
+    assert [(r["start"], r["period"]) for r in rows] == [
+        ("2024-01-01", "Jan 2024"), ("2024-02-01", "Feb 2024"),
+        ("2024-03-01", "Mar 2024"), ("2024-04-01", "Apr 2024"),
+    ]
+    assert [r["revenue"] for r in rows] == [1.5, 5.0, 0.0, 4.0]
+    assert [r["orders"] for r in rows] == [1, 2, 0, 1]
+
+
+def test_days_sum_duplicates_and_keep_types():
+    rows = series(["2024-03-01", "2024-03-01", "2024-03-03"], date(2024, 3, 1), date(2024, 3, 3), "day")
+    assert [(r["period"], r["orders"]) for r in rows] == [("Mar 01", 2), ("Mar 02", 0), ("Mar 03", 1)]
+    assert isinstance(rows[0]["orders"], int)
+    assert isinstance(rows[0]["revenue"], float)
+
+
+def test_empty_input_is_all_zero_buckets():
+    rows = series([], date(2024, 5, 1), date(2024, 5, 3), "day")
+    assert [r["orders"] for r in rows] == [0, 0, 0]